@@ -996,6 +996,126 @@ class DGGRS(Instance):
       self.fn_DGGRS_zoneHasSubZone = value
       lib.Instance_setMethod(self.impl, "zoneHasSubZone".encode('u8'), cb_DGGRS_zoneHasSubZone)
 
+   # Variants of getZoneChildren(), getZoneParents(), getZoneNeighbors(), getSubZones() and getSubZoneWGS84Centroids()
+   # writing into a caller-provided writable buffer (e.g., a NumPy array reused across calls) instead of a new Array,
+   # and returning the number of zones (or centroids) written.
+   # Zones are written as uint64 and centroids as (latitude, longitude) pairs of doubles in radians.
+   def getZoneChildrenInto(self, zone, out):
+      children = _zonesBuffer(out, lib.DGGRS_getMaxChildren(self.impl))
+      return lib.DGGRS_getZoneChildren(self.impl, zone, children)
+
+   def getZoneParentsInto(self, zone, out):
+      parents = _zonesBuffer(out, lib.DGGRS_getMaxParents(self.impl))
+      return lib.DGGRS_getZoneParents(self.impl, zone, parents)
+
+   def getZoneNeighborsInto(self, zone, out, nbTypes = None):
+      maxNeighbors = lib.DGGRS_getMaxNeighbors(self.impl)
+      neighbors = _zonesBuffer(out, maxNeighbors)
+      if nbTypes is not None: nbTypes = _itemsBuffer('int[]', nbTypes, maxNeighbors)
+      return lib.DGGRS_getZoneNeighbors(self.impl, zone, neighbors, ffi.NULL if nbTypes is None else nbTypes)
+
+   def getSubZonesInto(self, parent, relativeDepth, out):
+      # out: room for countSubZones(parent, relativeDepth) zones
+      # (DGGAL still allocates the sub-zones, but they are copied and freed without creating Python objects)
+      return _copyArrayInto(lib.DGGRS_getSubZones(self.impl, parent, relativeDepth),
+         ffi.from_buffer('eC_DGGRSZone[]', out, require_writable=True), ffi.sizeof('eC_DGGRSZone'))
+
+   def getSubZoneWGS84CentroidsInto(self, parent, relativeDepth, out):
+      # out: room for 2 * countSubZones(parent, relativeDepth) doubles
+      return _copyArrayInto(lib.DGGRS_getSubZoneWGS84Centroids(self.impl, parent, relativeDepth),
+         ffi.from_buffer('double[]', out, require_writable=True), ffi.sizeof('eC_GeoPoint'))
+
+   # Bulk variants for many zones, given as a buffer of uint64 zones (e.g., a NumPy array) or a sequence of zones,
+   # writing into caller-provided buffers like the *Into() methods above and returning the number of zones.
+   # DGGAL is called directly in a single loop, without the dispatch and wrapping of the single-zone methods
+   # (methods overridden in Python are therefore not used).
+   def getZonesLevelsInto(self, zones, out):
+      # out: one int per zone
+      zones = _zonesSequence(zones)
+      levels = _itemsBuffer('int[]', out, len(zones))
+      getZoneLevel = lib.DGGRS_getZoneLevel
+      impl = self.impl
+      for i, zone in enumerate(zones):
+         levels[i] = getZoneLevel(impl, zone)
+      return len(zones)
+
+   def getZonesParentsInto(self, zones, out):
+      # out: getMaxParents() zones per zone, padded with nullZone
+      zones = _zonesSequence(zones)
+      maxParents = lib.DGGRS_getMaxParents(self.impl)
+      parents = _itemsBuffer('eC_DGGRSZone[]', out, len(zones) * maxParents)
+      getZoneParents = lib.DGGRS_getZoneParents
+      impl = self.impl
+      for i, zone in enumerate(zones):
+         p = parents + i * maxParents
+         for j in range(getZoneParents(impl, zone, p), maxParents):
+            p[j] = lib.nullZone
+      return len(zones)
+
+   def getZonesWGS84CentroidsInto(self, zones, out):
+      # out: (latitude, longitude) doubles in radians per zone
+      zones = _zonesSequence(zones)
+      centroids = ffi.cast('eC_GeoPoint *', _itemsBuffer('double[]', out, 2 * len(zones)))
+      getZoneWGS84Centroid = lib.DGGRS_getZoneWGS84Centroid
+      impl = self.impl
+      for i, zone in enumerate(zones):
+         getZoneWGS84Centroid(impl, zone, centroids + i)
+      return len(zones)
+
+   def getZonesWGS84ExtentsInto(self, zones, out, approximate = False):
+      # out: (lower-left latitude, longitude, upper-right latitude, longitude) doubles in radians per zone
+      zones = _zonesSequence(zones)
+      extents = ffi.cast('eC_GeoExtent *', _itemsBuffer('double[]', out, 4 * len(zones)))
+      getZoneWGS84Extent = lib.DGGRS_getZoneWGS84ExtentApproximate if approximate else lib.DGGRS_getZoneWGS84Extent
+      impl = self.impl
+      for i, zone in enumerate(zones):
+         getZoneWGS84Extent(impl, zone, extents + i)
+      return len(zones)
+
+   def getZonesTextIDs(self, zones):
+      zid = ffi.new('byte[]', 256)
+      getZoneTextID = lib.DGGRS_getZoneTextID
+      impl = self.impl
+      textIDs = []
+      for zone in _zonesSequence(zones):
+         getZoneTextID(impl, zone, zid)
+         textIDs.append(ffi.string(zid).decode('u8'))
+      return textIDs
+
+   def getZonesFromTextIDsInto(self, textIDs, out):
+      # out: one zone per text ID (nullZone for invalid identifiers)
+      zones = _itemsBuffer('eC_DGGRSZone[]', out, len(textIDs))
+      getZoneFromTextID = lib.DGGRS_getZoneFromTextID
+      impl = self.impl
+      for i, zoneID in enumerate(textIDs):
+         zones[i] = getZoneFromTextID(impl, zoneID.encode('u8'))
+      return len(textIDs)
+
+def _zonesSequence(zones):
+   try:
+      return ffi.from_buffer('eC_DGGRSZone[]', zones)
+   except TypeError:
+      return zones
+
+def _itemsBuffer(cType, out, count):
+   items = ffi.from_buffer(cType, out, require_writable=True)
+   if len(items) < count: raise ValueError(f"buffer too small for {count} items")
+   return items
+
+def _zonesBuffer(out, count):
+   return _itemsBuffer('eC_DGGRSZone[]', out, count)
+
+def _copyArrayInto(arrayImpl, dst, itemSize):
+   if arrayImpl == ffi.NULL: return 0
+   array = pyOrNewObject(Array, arrayImpl)
+   try:
+      count = array.count
+      if count * itemSize > ffi.sizeof(dst): raise ValueError(f"buffer too small for {count} items")
+      ffi.memmove(dst, array.array, count * itemSize)
+   finally:
+      Instance.delete(array)
+   return count
+
 class DGGRSZone(pyBaseClass):pass
 
 class GeoExtent(Struct):
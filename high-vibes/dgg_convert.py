@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# dgg-convert.py
+# Convert an existing DGGS Data Store collection between storage formats.
+#
+# Usage:
+#  python dgg-convert.py data --collection gebco --value-encoding float32
+#  python dgg-convert.py data --collection gebco --quantize int16 --precision 1
+#  python dgg-convert.py data --collection gebco --store-version 2
+#  python dgg-convert.py data --collection gebco --layout packed
+#  python dgg-convert.py data --collection gebco --extra-depths 6-7,9-10
+#  python dgg-convert.py data --collection gebco --rebuild-ancestors
+#  python dgg-convert.py data --collection gebco --overview
+
+import argparse
+import sys
+from dggal import *
+
+if not __package__:
+   from dggsStore.store import DGGSDataStore, VALUE_ENCODINGS, QUANTIZED_DATA_TYPES, STORE_VERSIONS, PACKAGE_LAYOUTS
+   from dggsStore.convert import convert_value_encoding, quantization_for_store, migrate_store_version, repack_store
+   from dggsStore.convert import materialize_extra_depths, rebuild_ancestors, build_overview
+   from dggsStore.customDepths import parse_zone_depths
+else:
+   from .dggsStore.store import DGGSDataStore, VALUE_ENCODINGS, QUANTIZED_DATA_TYPES, STORE_VERSIONS, PACKAGE_LAYOUTS
+   from .dggsStore.convert import convert_value_encoding, quantization_for_store, migrate_store_version, repack_store
+   from .dggsStore.convert import materialize_extra_depths, rebuild_ancestors, build_overview
+   from .dggsStore.customDepths import parse_zone_depths
+
+app = Application(appGlobals=globals()); pydggal_setup(app)
+
+def parse_args():
+   p = argparse.ArgumentParser(prog="dgg-convert")
+   p.add_argument("datastore", help="base datastore directory")
+   p.add_argument("--collection", required=True, help="collection name")
+   p.add_argument("--value-encoding", choices=VALUE_ENCODINGS, default=None,
+      help="re-encode raster field values as DGGS-JSON lists or typed binary arrays")
+   p.add_argument("--quantize", choices=QUANTIZED_DATA_TYPES + ["auto"], default=None,
+      help="store raster values as scaled integers of this type (auto: smallest type fitting --precision)")
+   p.add_argument("--precision", type=float, default=None,
+      help="quantization step for raster values (e.g. 0.01); implies --quantize auto")
+   p.add_argument("--store-version", type=int, choices=STORE_VERSIONS, default=None,
+      help="migrate packages to another store version (2: integer zone id keys)")
+   p.add_argument("--text-ids", action="store_true", help="with --store-version 2, keep textual zone ids as a column")
+   p.add_argument("--layout", choices=PACKAGE_LAYOUTS, default=None,
+      help="move packages to a directory tree of package files (tree), a single archive file (packed)"
+         " or a memory-mapped blob file (mapped)")
+   p.add_argument("--extra-depths", default=None,
+      help="depths to precompute and store in every root zone in addition to the native depth (e.g. 6-7,9-10; none to remove them)")
+   p.add_argument("--rebuild-ancestors", action="store_true",
+      help="re-aggregate the ancestors of zones changed by an interrupted update (see dgg-import --update)")
+   p.add_argument("--overview", action="store_true",
+      help="precompute the global overview of the levels coarser than level-0 root zones")
+   p.add_argument("--rebuild-index", action="store_true", help="rebuild the zone presence index from the packages")
+   p.add_argument("--workers", type=int, default=8)
+   return p.parse_args()
+
+def main():
+   args = parse_args()
+
+   store: DGGSDataStore = DGGSDataStore(args.datastore, args.collection)
+   if not hasattr(store, "group0Size"):
+      return 1
+
+   if args.store_version is not None:
+      migrate_store_version(store, args.store_version, text_ids=args.text_ids, max_workers=args.workers)
+
+   if args.quantize is not None or args.precision is not None:
+      data_type = None if args.quantize in (None, "auto") else args.quantize
+      quantization = quantization_for_store(store, data_type, args.precision, max_workers=args.workers)
+      for fname, q in quantization.items():
+         print(f"[CONVERT] quantizing {fname}: {q}", flush=True)
+      convert_value_encoding(store, args.value_encoding or store.value_encoding,
+         max_workers=args.workers, quantization=quantization)
+   elif args.value_encoding is not None:
+      convert_value_encoding(store, args.value_encoding, max_workers=args.workers)
+
+   if args.layout is not None:
+      repack_store(store, args.layout)
+
+   if args.overview:
+      build_overview(store, max_workers=args.workers)
+
+   if args.extra_depths is not None:
+      depths = [] if args.extra_depths == "none" else parse_zone_depths(args.extra_depths)
+      materialize_extra_depths(store, depths, max_workers=args.workers)
+
+   if args.rebuild_ancestors:
+      rebuild_ancestors(store, max_workers=args.workers)
+
+   if args.rebuild_index:
+      store.build_presence_index()
+   return 0
+
+if __name__ == "__main__":
+   sys.exit(main())
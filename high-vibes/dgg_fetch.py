@@ -4,13 +4,14 @@ from dggal import *
 from typing import List, Any, Dict, Iterator, Iterable, Optional, Tuple
 import os, logging, argparse, json, sys
 from itertools import islice
+import numpy as np
 
 if not __package__:
    from ogcapi.dggs import client as dggs_client
-   from dggsStore.store import DGGSDataStore, read_package_root_ids_from_sqlite
+   from dggsStore.store import DGGSDataStore, STORE_VERSION, PACKAGE_LAYOUTS, extent_predicate
 else:
    from .ogcapi.dggs import client as dggs_client
-   from .dggsStore.store import DGGSDataStore, read_package_root_ids_from_sqlite
+   from .dggsStore.store import DGGSDataStore, STORE_VERSION, PACKAGE_LAYOUTS, extent_predicate
 
 app = Application(appGlobals=globals()); pydggal_setup(app)
 
@@ -24,9 +25,14 @@ def parse_args():
    p.add_argument("resource_url", help="Full DGGS resource URL e.g. https://host/.../collections/{collection}/dggs/{dggrsId}")
    p.add_argument("--outdir", default="data", help="Output directory for packages (default data/)")
    p.add_argument("--groupSize", type=int, default=5, help="Levels per package (written to collection.json and passed to store)")
+   p.add_argument("--layout", choices=PACKAGE_LAYOUTS, default="tree",
+      help="store packages as a directory tree of files (default), a single packed archive or a memory-mapped blob file")
    p.add_argument("--depth", type=int, help="data depth (zone-depth) to request (default from DGGRS defaultDepth)")
    p.add_argument("--max-level", type=int, default=None, help="Maximum refinement level (default from server maxRefinementLevel)")
    p.add_argument("--batch-size", type=int, default=32, help="Number of root zones to request per HTTP call (default 32)")
+   p.add_argument("--bbox", default=None,
+      help="only fetch zones overlapping this WGS84 extent: minlon,minlat,maxlon,maxlat (default from the collection's spatial extent)")
+   p.add_argument("--whole-world", action="store_true", help="fetch zones of the whole world regardless of the collection's extent")
    p.add_argument("--no-resume", action="store_true")
    p.add_argument("--resume-verbose", action="store_true", help="Show resume-related info for skipped roots")
    p.add_argument("--dry-run", action="store_true")
@@ -48,20 +54,46 @@ def _extract_props_and_strip(features, feature_props):
          del feat["properties"]
 
 
+def collection_wgs84_extent(coll_meta: Dict[str, Any]) -> Optional[List[float]]:
+   # First spatial bbox of an OGC API collection description as (min lon, min lat, max lon, max lat)
+   bboxes = ((coll_meta.get("extent") or {}).get("spatial") or {}).get("bbox") or []
+   if not bboxes or not isinstance(bboxes[0], list):
+      return None
+   bbox = bboxes[0]
+   if len(bbox) == 6:   # with minimum and maximum elevations
+      bbox = [bbox[0], bbox[1], bbox[3], bbox[4]]
+   return bbox if len(bbox) == 4 else None
+
+
+def present_before_run(store: DGGSDataStore, present: Dict[int, np.ndarray], zone) -> bool:
+   # Whether a root was already stored when this run started (resuming): the presence index of each level is read once
+   # into `present`, rather than reloaded by store.has_zone() after every batch appended to it.
+   # Roots written by this run are not looked up again.
+   level = store.dggrs.getZoneLevel(zone)
+   ids = present.get(level)
+   if ids is None:
+      if not store.ensure_presence_index():
+         return store.has_zone(zone)
+      ids = present[level] = store.presence.zones_at_level(level)
+   i = int(np.searchsorted(ids, np.uint64(int(zone))))
+   return i < ids.size and int(ids[i]) == int(zone)
+
+
 def process_batch(
    store: DGGSDataStore,
    zones: List[int],
    pkg_index: int,
    batch_num: int,
    args,
-   existing_ids: set,
+   resume: bool,
    pkg_path: str,
    bases_stack: List[int],
    per_package_workers: int,
    depth: int,
    landing: str,
    collection: str,
-   dggrs_id: str
+   dggrs_id: str,
+   present: Dict[int, np.ndarray]
 ) -> int:
    dggrs = store.dggrs
 
@@ -71,7 +103,7 @@ def process_batch(
    for zone in zones:
       ztext = dggrs.getZoneTextID(zone)
       zone_by_text[ztext] = zone
-      if ztext not in existing_ids:
+      if not (resume and present_before_run(store, present, zone)):
          to_fetch_texts.append(ztext)
 
    if not to_fetch_texts:
@@ -167,12 +199,24 @@ def main():
       "groupSize": args.groupSize,
       "title": title,
       "description": description,
-      "version": coll_meta.get("version", "1.0")
+      "version": coll_meta.get("version", "1.0"),
+      "storeVersion": STORE_VERSION
    }
+   if args.layout != "tree":
+      coll_info["layout"] = args.layout
 
    base = os.path.join(args.outdir, collection)
    os.makedirs(base, exist_ok=True)
    coll_json_path = os.path.join(base, "collection.json")
+   if os.path.isfile(coll_json_path):
+      # resuming into an existing collection: keep the package format it was created with
+      with open(coll_json_path, "r", encoding="utf-8") as fh:
+         prev_info = json.load(fh)
+      for key in ("storeVersion", "textIDs", "layout"):
+         if key in prev_info:
+            coll_info[key] = prev_info[key]
+         else:
+            coll_info.pop(key, None)
    with open(coll_json_path, "w", encoding="utf-8") as fh:
       json.dump(coll_info, fh, indent=2)
    logger.info("Wrote collection config to %s", coll_json_path)
@@ -190,11 +234,21 @@ def main():
    logger.info("Computed levels: depth=%d max_base_level=%d groupSize=%d fetch_batch_size=%d",
                depth, max_base_level, store.groupSize, fetch_batch_size)
 
+   extent = None
+   if args.bbox:
+      extent = [float(v) for v in args.bbox.split(",")]
+   elif not args.whole_world:
+      extent = collection_wgs84_extent(coll_meta)
+   in_extent = extent_predicate(dggrs, extent)
+   if in_extent is not None:
+      logger.info("Restricted to zones overlapping the WGS84 extent %s", extent)
+
    logger.info("Beginning package iteration (max_base_level=%d)", max_base_level)
 
    pkg_index = 0
+   present: Dict[int, np.ndarray] = {}
 
-   for base_zone, base_ancestors in store.iter_bases(max_base_level, up_to=True):
+   for base_zone, base_ancestors in store.iter_bases(max_base_level, up_to=True, in_extent_cb=in_extent):
       pkg_index += 1
 
       base_text = dggrs.getZoneTextID(base_zone)
@@ -204,37 +258,39 @@ def main():
       base_level = dggrs.getZoneLevel(base_zone)
       package_group_levels = store.group0Size if base_level == 0 else store.groupSize
       max_root_level = base_level + package_group_levels - 1
-      roots_iter = store.iter_roots_for_base(base_zone, max_root_level, up_to=True)
+      roots_iter = store.iter_roots_for_base(base_zone, max_root_level, up_to=True, in_extent_cb=in_extent)
 
 
-      existing_ids = set()
-      if not args.no_resume:
-         existing_ids = set(read_package_root_ids_from_sqlite(pkg_path))
-         if args.resume_verbose:
-            logger.info("PACKAGE #%d: resume existing_ids_count=%d", pkg_index, len(existing_ids))
+      # resuming: roots already stored are found through the store's zone presence index
+      resume = not args.no_resume
+      skipped = 0
 
       batch_num = 0
       batch_zones: List[int] = []
       for zone in roots_iter:
-         ztext = dggrs.getZoneTextID(zone)
-
-         if ztext in existing_ids:
+         if resume and present_before_run(store, present, zone):
+            skipped += 1
             if args.resume_verbose:
-               logger.debug("PACKAGE #%d: skipping already-present root %s", pkg_index, ztext)
+               logger.debug("PACKAGE #%d: skipping already-present root %s", pkg_index, dggrs.getZoneTextID(zone))
             continue
 
          batch_zones.append(zone)
          if len(batch_zones) >= fetch_batch_size:
             batch_num += 1
-            written = process_batch(store, batch_zones, pkg_index, batch_num, args, existing_ids, pkg_path, base_ancestors, per_package_workers, depth, landing, collection, dggrs_id)
+            written = process_batch(store, batch_zones, pkg_index, batch_num, args, resume, pkg_path, base_ancestors, per_package_workers, depth, landing, collection, dggrs_id, present)
             total_written += written
             batch_zones = []
 
       if batch_zones:
          batch_num += 1
-         written = process_batch(store, batch_zones, pkg_index, batch_num, args, existing_ids, pkg_path, base_ancestors, per_package_workers, depth, landing, collection, dggrs_id)
+         written = process_batch(store, batch_zones, pkg_index, batch_num, args, resume, pkg_path, base_ancestors, per_package_workers, depth, landing, collection, dggrs_id, present)
          total_written += written
 
+      if args.resume_verbose:
+         logger.info("PACKAGE #%d: resume skipped %d already-present roots", pkg_index, skipped)
+      store.close_package_writers()
+
+   store.close()
    logger.info("all processing complete; total written=%d; output=%s", total_written, args.outdir)
 
 
@@ -55,6 +55,23 @@ def _parse_bands_and_fields_arg(args, ds_count: int):
 
    return bands, fields, None
 
+def _parse_aggregation_arg(arg: str):
+   # Returns (aggregation: Optional[Union[str, Dict[str, str]]], err: Optional[str]):
+   # a method for all fields, or comma-separated field=method pairs
+   if arg is None:
+      return None, None
+   if "=" not in arg:
+      if arg not in AGGREGATION_METHODS:
+         return None, f"Invalid --aggregation method {arg!r}: must be one of {', '.join(AGGREGATION_METHODS)}."
+      return arg, None
+   aggregation = {}
+   for p in [p.strip() for p in arg.split(",") if p.strip()]:
+      fname, _, method = p.partition("=")
+      if method not in AGGREGATION_METHODS:
+         return None, f"Invalid --aggregation method {method!r} for field {fname!r}: must be one of {', '.join(AGGREGATION_METHODS)}."
+      aggregation[fname.strip()] = method
+   return aggregation, None
+
 def main():
    p = argparse.ArgumentParser(prog="dgg-import")
    p.add_argument("input_file", help="input raster file or vector GeoJSON (.json/.geojson)")
@@ -68,6 +85,34 @@ def main():
    p.add_argument("--batch-size", type=int, default=32, help="Number of root zones per write batch")
    p.add_argument("--groupSize", type=int, default=5, help="Levels per package (default 5)")
    p.add_argument("--max-workers", type=int, default=16, help="Max worker processes")
+   p.add_argument("--block-cache-mb", type=int, default=64,
+      help="raster blocks cached by each worker process, in MB (default 64; 0 to read one window per root zone)")
+   p.add_argument("--pipeline-batches", type=int, default=4,
+      help="raster batches being sampled and encoded by the workers at once (default 4)")
+   p.add_argument("--write-queue", type=int, default=4,
+      help="encoded raster batches waiting for the writer before sampling is held back (default 4)")
+   p.add_argument("--value-encoding", choices=VALUE_ENCODINGS, default="list",
+      help="raster value storage: DGGS-JSON lists (default) or typed binary arrays")
+   p.add_argument("--quantize", choices=QUANTIZED_DATA_TYPES + ["auto"], default=None,
+      help="store raster values as scaled integers of this type (auto: smallest type fitting --precision)")
+   p.add_argument("--precision", type=float, default=None,
+      help="quantization step for raster values (e.g. 0.01); implies --quantize auto")
+   p.add_argument("--without-rowid", action="store_true",
+      help="create raster package tables WITHOUT ROWID (only worthwhile for small zone blobs)")
+   p.add_argument("--layout", choices=PACKAGE_LAYOUTS, default="tree",
+      help="store packages as a directory tree of files (default), a single packed archive or a memory-mapped blob file")
+   p.add_argument("--aggregation", default=None,
+      help="method for aggregating coarser levels, for all fields (e.g. max) or per field (e.g. elev=max,landcover=mode)")
+   p.add_argument("--extra-depths", default=None,
+      help="additional depths to precompute and store in every root zone (e.g. 6-7,9-10), for faster custom-depth serving")
+   p.add_argument("--no-overview", action="store_true",
+      help="do not precompute the global overview of the levels coarser than level-0 root zones")
+   p.add_argument("--update", action="store_true",
+      help="update part of an existing raster collection, re-aggregating only the ancestors of changed zones")
+   p.add_argument("--whole-world", action="store_true",
+      help="visit the zones of the whole world rather than only those overlapping the input's WGS84 extent")
+   p.add_argument("--resume", action="store_true",
+      help="continue an interrupted import, skipping the packages and roots recorded as written in its journal")
    p.add_argument("--skip-reproj", action="store_true", help="Skip reprojection step for vector import")
    p.add_argument("--skip-fix", action="store_true", help="Skip topology fix step for vector import")
    args = p.parse_args()
@@ -96,7 +141,10 @@ def main():
          groupSize=args.groupSize,
          max_workers=args.max_workers,
          skip_reproj=args.skip_reproj,
-         skip_fix=args.skip_fix
+         skip_fix=args.skip_fix,
+         layout=args.layout,
+         resume=args.resume,
+         restrict_extent=not args.whole_world
       )
       return rc
 
@@ -110,6 +158,8 @@ def main():
    ds_count = ds.count
 
    bands, fields, err = _parse_bands_and_fields_arg(args, ds_count)
+   if not err:
+      aggregation, err = _parse_aggregation_arg(args.aggregation)
    if err:
       print("Error:", err, flush=True)
       ds.close()
@@ -126,7 +176,21 @@ def main():
       bands=bands,
       batch_size=args.batch_size,
       groupSize=args.groupSize,
-      max_workers=args.max_workers
+      max_workers=args.max_workers,
+      value_encoding=args.value_encoding,
+      quantize=args.quantize,
+      precision=args.precision,
+      without_rowid=args.without_rowid,
+      layout=args.layout,
+      aggregation=aggregation,
+      extra_depths=parse_zone_depths(args.extra_depths),
+      update=args.update,
+      overview=not args.no_overview,
+      pipeline_batches=args.pipeline_batches,
+      write_queue_depth=args.write_queue,
+      resume=args.resume,
+      restrict_extent=not args.whole_world,
+      block_cache_mb=args.block_cache_mb
    )
 
    return rc
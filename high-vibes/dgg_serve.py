@@ -27,6 +27,7 @@ if not __package__:
    from ogcapi.dggs.zones import bp as dggs_zones_bp
    from ogcapi.dggs.zoneInfo import bp as dggs_zoneinfo_bp
    from ogcapi.dggs.zoneData import bp as dggs_zoneData_bp
+   from ogcapi.dggs.responseCache import ResponseCache
    from dggsStore.store import *
 else:
    from .ogcapi.common.landingPage import bp as landing_bp
@@ -36,13 +37,15 @@ else:
    from .ogcapi.dggs.zones import bp as dggs_zones_bp
    from .ogcapi.dggs.zoneInfo import bp as dggs_zoneinfo_bp
    from .ogcapi.dggs.zoneData import bp as dggs_zoneData_bp
+   from .ogcapi.dggs.responseCache import ResponseCache
    from .dggsStore.store import *
 
 # Create Flask app and register blueprints
-def create_app(data_root: str, dggrs_schema_uri: str = None) -> Flask:
+def create_app(data_root: str, dggrs_schema_uri: str = None, response_cache: ResponseCache = None) -> Flask:
     app = Flask(__name__)
     # Configuration
     app.config["DATA_ROOT"] = data_root
+    app.config["RESPONSE_CACHE"] = response_cache
 
     # Register blueprints (they include their own url_prefix where appropriate)
     app.register_blueprint(landing_bp)            # root "/"
@@ -73,6 +76,9 @@ def parse_args():
     p.add_argument("--host", help="Host to bind", default="0.0.0.0")
     p.add_argument("--port", help="Port to listen on", type=int, default=int(os.environ.get("PORT", "8080")))
     p.add_argument("--debug", help="Enable debug mode", action="store_true")
+    p.add_argument("--response-cache-mb", help="Memory for cached zone data responses in MiB (0 disables caching)", type=int, default=256)
+    p.add_argument("--response-cache-dir", help="Directory to spill cached responses evicted from memory to", default=None)
+    p.add_argument("--response-cache-dir-mb", help="Disk space for spilled responses in MiB", type=int, default=4096)
     return p.parse_args()
 
 def dump_traces_and_exit(signum, frame):
@@ -89,7 +95,11 @@ def main():
         print(f"ERROR: DATA_ROOT directory does not exist: {DATA_ROOT!r}")
         return
     logger.info("Starting dgg-serve on %s:%d with data root: %s", args.host, args.port, DATA_ROOT)
-    app = create_app(DATA_ROOT)
+    response_cache = None
+    if args.response_cache_mb > 0:
+        response_cache = ResponseCache(args.response_cache_mb * 1024 * 1024, spill_dir=args.response_cache_dir,
+            spill_max_bytes=args.response_cache_dir_mb * 1024 * 1024)
+    app = create_app(DATA_ROOT, response_cache=response_cache)
     atexit.register(lambda: (logger.info("Closing all stores..."), close_all_stores()))
     signal.signal(signal.SIGINT, dump_traces_and_exit)
     app.run(host=args.host, port=args.port, debug=args.debug, use_reloader=False, threaded=True)
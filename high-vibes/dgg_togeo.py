@@ -4,6 +4,7 @@
 import argparse
 import json
 import sys
+import numpy as np
 from dggal import *
 import geopandas as gpd
 from shapely.geometry import Point, Polygon
@@ -117,11 +118,22 @@ def dggsJSON2shapely_features(dggsJSON, crs: CRS = None, centroids: bool = False
    if not subZones:
       return (None, "No subzones returned for depth " + str(depth))
 
+   # WGS84 centroids of all sub-zones at once, as (latitude, longitude) in degrees
+   centroid_coords = None
+   if centroids and ((not crs) or (crs == CRS(ogc, 84)) or (crs == CRS(epsg, 4326))):
+      ids = np.fromiter((int(z) for z in subZones), dtype=np.uint64, count=subZones.count)
+      centroid_coords = np.empty((ids.size, 2), dtype=np.float64)
+      dggrs.getZonesWGS84CentroidsInto(ids, centroid_coords)
+      centroid_coords = np.degrees(centroid_coords)
+
    values = dggsJSON.get('values', {})
    features = []
    i = 0
    for z in subZones:
-      geom = generate_zone_geometry_shapely(dggrs, z, crs, centroids)
+      if centroid_coords is not None:
+         geom = Point(centroid_coords[i, 1], centroid_coords[i, 0])
+      else:
+         geom = generate_zone_geometry_shapely(dggrs, z, crs, centroids)
       props = {}
       for key, vDepths in values.items():
          if key and vDepths and len(vDepths) > idx:
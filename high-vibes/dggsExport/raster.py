@@ -12,9 +12,9 @@ from dggal import *
 import dggal
 
 try:
-   from dggsStore.store import DGGSDataStore, iter_packages
+   from dggsStore.store import DGGSDataStore, SubZoneIndex, iter_packages, depth_entry_array, sub_zone_index
 except(ImportError):
-   from ..dggsStore.store import DGGSDataStore, iter_packages
+   from ..dggsStore.store import DGGSDataStore, SubZoneIndex, iter_packages, depth_entry_array, sub_zone_index
 
 import time
 import math
@@ -66,7 +66,7 @@ def _lon_ranges_for_extent(min_lon: float, max_lon: float) -> List[Tuple[float,
 def prepare_root(store: DGGSDataStore, dggrs, pkg_path: str, zone: DGGRSZone,
    depth: int, deg_per_pixel: float, width: int, height: int, nodata: float,
    fields: List[str]
-   ) -> Tuple[Dict[str, np.ndarray], np.ndarray, Dict[int,int], List[Tuple[float,float]], int, int, float]:
+   ) -> Tuple[Dict[str, np.ndarray], np.ndarray, SubZoneIndex, List[Tuple[float,float]], int, int, float]:
    t0 = time.time()
    decoded = store.read_and_decode_zone_blob(pkg_path, zone)
    if decoded is None:
@@ -85,16 +85,11 @@ def prepare_root(store: DGGSDataStore, dggrs, pkg_path: str, zone: DGGRSZone,
       if chosen is None:
          values_map[field] = np.full(0, nodata, dtype=np.float64)
          continue
-      raw = list(chosen["data"])
-      values_map[field] = np.array([nodata if v is None else float(v) for v in raw],
-         dtype=np.float64, copy=True)
+      data = depth_entry_array(chosen)
+      values_map[field] = np.where(np.isnan(data), nodata, data)
 
    # Subzone index mapping
-   subs_obj = dggrs.getSubZones(zone, depth)
-   subs_count = subs_obj.count
-   subs_ptr = ffi.cast("uint64_t *", subs_obj.array)
-   idx_map = { int(subs_ptr[i]): i for i in range(subs_count) }
-   Instance.delete(subs_obj)
+   idx_map = sub_zone_index(dggrs, zone, depth)
 
    # Extent and pixel row bounds
    ext = GeoExtent()
@@ -107,7 +102,7 @@ def prepare_root(store: DGGSDataStore, dggrs, pkg_path: str, zone: DGGRSZone,
    min_y = max(0, int(math.floor((90.0 - ur_lat) / deg_per_pixel - 0.5)))
    max_y = min(height - 1, int(math.floor((90.0 - ll_lat) / deg_per_pixel - 0.5)))
 
-   return values_map, subs_ptr, idx_map, lon_ranges, min_y, max_y, decode_s
+   return values_map, idx_map.zones, idx_map, lon_ranges, min_y, max_y, decode_s
 
 def _initialize_dggal_worker():
    app = Application(appGlobals=globals());
@@ -121,7 +116,7 @@ def _paint_worker(shm_zone_name: str, shm_out_name: str,
    min_y: int, max_y: int,
    subs_array: np.ndarray, values: np.ndarray,
    nodata: float, null_zone_int: int,
-   idx_map: Dict[int,int],
+   idx_map: SubZoneIndex,
    band_index: int, n_fields: int):
 
    shm_zone = _shm.SharedMemory(name=shm_zone_name)
@@ -152,8 +147,7 @@ def _paint_worker(shm_zone_name: str, shm_out_name: str,
       valid_positions = np.flatnonzero(valid_mask)
       zone_vals = block_flat[valid_positions]
 
-      idxs = np.fromiter((idx_map.get(int(z), -1) for z in zone_vals),
-                         dtype=np.int32, count=zone_vals.size)
+      idxs = idx_map.positions(zone_vals)
 
       present_mask = (idxs >= 0)
       if not np.any(present_mask):
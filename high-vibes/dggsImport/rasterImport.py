@@ -1,20 +1,25 @@
 from dggal import *
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import json
 
 try:
    from dggsStore.store import *
    from dggsStore.customDepths import *
+   from dggsStore.convert import materialize_extra_depths, rebuild_ancestors, build_overview
 except(ImportError):
    from ..dggsStore.store import *
    from ..dggsStore.customDepths import *
+   from ..dggsStore.convert import materialize_extra_depths, rebuild_ancestors, build_overview
 
 from .rasterSampling import *
 
 import threading
-from typing import List, Dict, Any, Optional
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import queue
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from concurrent.futures import ProcessPoolExecutor, Future
 import rasterio
+from rasterio.warp import transform_bounds
 
 from functools import wraps
 
@@ -34,6 +39,41 @@ def _initialize_dggal_worker():
    app = Application(appGlobals=globals());
    pydggal_setup(app)
 
+# State kept by each worker process of an import pool across tasks and batches:
+# the store (with its DGGRS instance), the open raster dataset and its block cache
+_worker_state: Dict[str, Any] = {}
+
+def _worker_store(worker_config: dict) -> DGGSDataStore:
+   key = (worker_config["_data_root"], worker_config["collection"])
+   if _worker_state.get("store_key") != key:
+      # finer levels are read while the import process writes coarser ones to the same packages
+      _worker_state["store"] = DGGSDataStore(key[0], key[1], config=worker_config["collection_config"],
+         shared_access=True)
+      _worker_state["store_key"] = key
+   return _worker_state["store"]
+
+def _worker_dataset(ds_path: str):
+   ds = _worker_state.get("ds")
+   if ds is None or ds.name != ds_path:
+      if ds is not None:
+         ds.close()
+      ds = _worker_state["ds"] = rasterio.open(ds_path)
+      _worker_state.pop("blocks", None)
+   return ds
+
+def _worker_blocks(ds, bands: List[int], max_mb: int) -> Optional[RasterBlockCache]:
+   # Block cache of the worker's dataset (see _worker_dataset()), None to read one window per root
+   if max_mb <= 0:
+      return None
+   blocks = _worker_state.get("blocks")
+   if blocks is None or blocks.ds is not ds or blocks.bands != bands:
+      blocks = _worker_state["blocks"] = RasterBlockCache(ds, bands, max_bytes=max_mb << 20)
+   return blocks
+
+def import_worker_pool(max_workers: int = 16) -> ProcessPoolExecutor:
+   # One pool for a whole import run, rather than one per batch
+   return ProcessPoolExecutor(max_workers=max(1, max_workers), initializer=_initialize_dggal_worker)
+
 # top-level process worker (must be picklable)
 @report_exceptions
 def _sample_package_worker(ds_path: str,
@@ -46,16 +86,15 @@ def _sample_package_worker(ds_path: str,
    fields: List[str],
    bands: Optional[List[int]] = None
 ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
-   data_root = worker_config["_data_root"]
-   collection = worker_config["collection"]
-   collection_config = worker_config["collection_config"]
-   store = DGGSDataStore(data_root, collection, config=collection_config)
+   store = _worker_store(worker_config)
    dggrs = store.dggrs
    # reconstruct zone object from integer id
    zone = DGGRSZone(zone_id)
-   with rasterio.open(ds_path) as ds:
-      return sample_depth_obj_for_zone(store, ds, raster_crs, dggrs, zone,
-         data_level, depth, use_overviews, fields, bands)
+   ds = _worker_dataset(ds_path)
+   blocks = _worker_blocks(ds, bands if bands is not None else list(range(1, ds.count + 1)),
+      worker_config.get("block_cache_mb", 0))
+   return sample_depth_obj_for_zone(store, ds, raster_crs, dggrs, zone,
+      data_level, depth, use_overviews, fields, bands, blocks)
 
 # top-level aggregate worker (must be picklable)
 @report_exceptions
@@ -64,121 +103,176 @@ def _aggregate_package_worker(worker_config: dict,
    zone_depth: int,
    fields: Optional[List[str]] = None
 ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
-   # Recreate the store inside the child process and call aggregate_zone_at_depth.
+   # Use the child process's store and call aggregate_zone_at_depth.
    # Accepts only picklable primitives so it can be submitted to ProcessPoolExecutor.
-   data_root = worker_config["_data_root"]
-   collection = worker_config["collection"]
-   collection_config = worker_config["collection_config"]
-   store = DGGSDataStore(data_root, collection, config=collection_config)
+   store = _worker_store(worker_config)
    # reconstruct zone object from integer id
    root_zone = DGGRSZone(zone_id)
    # call the existing aggregation function (signature unchanged)
    return aggregate_zone_at_depth(store, root_zone, zone_depth, fields)
 
-def _build_blobs_processes(
-   store_worker_config: dict,
-   ds_path: str,                # dataset path string (ds.name)
-   raster_crs: str,
-   dggrs,                       # used only in parent for zone text lookup
-   dggrs_uri: str,
-   zones: List,
-   data_level: int,
-   depth: int,
-   fields: List[str],
-   use_overviews: bool,
-   aggregate: bool,
-   bands: Optional[List[int]] = None,
-   max_workers: int = 16
-) -> Dict[int, Dict[str, Any]]:
-   if not zones:
-      return {}
-
-   workers = min(max_workers, max(1, len(zones)))
-   blobs: Dict[int, Dict[str, Any]] = {}
-
-   with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_dggal_worker) as ex:
-      futures = {}
-      if aggregate:
-         # submit the aggregate wrapper that reconstructs the store in the child
-         for z in zones:
-            fut = ex.submit(_aggregate_package_worker, store_worker_config, int(z), depth, fields)
-            futures[fut] = z
-      else:
-         for z in zones:
-            # pass only picklable primitives to the worker
-            fut = ex.submit(_sample_package_worker, ds_path, int(z), store_worker_config,
-               raster_crs, data_level, depth, use_overviews, fields, bands)
-            futures[fut] = z
-
-      for fut in as_completed(futures):
-         zone = futures[fut]
-         fields_map = fut.result()
-         if not fields_map:
-            if aggregate:
-               print(f"[AGG] zone={dggrs.getZoneTextID(zone)} aggregate returned empty, skipping", flush=True)
-            else:
-               print(f"[SAMPLE] zone={dggrs.getZoneTextID(zone)} sample returned empty, skipping", flush=True)
-            continue
-
-         zone_text = dggrs.getZoneTextID(zone)
-         blobs[int(zone)] = make_dggs_json_blob(dggrs_uri, zone_text, fields_map)
-         if aggregate:
-            print(f"[AGG] zone={zone_text} agg_blob_accepted", flush=True)
-         else:
-            print(f"[BUILD] zone={zone_text} blob_ready fields={list(fields_map.keys())}", flush=True)
-
-   return blobs
+def _encode_zone_blob(worker_config: dict, dggrs_uri: str, zone_id: int,
+   fields_map: Optional[Dict[str, List[Dict[str, Any]]]]) -> Optional[bytes]:
+   # DGGS-JSON blob of a root zone, encoded in the worker as stored by the collection
+   # (written with write_zone_batch(precompressed=True))
+   if not fields_map:
+      return None
+   store = _worker_store(worker_config)
+   zone_text = store.dggrs.getZoneTextID(DGGRSZone(zone_id))
+   return store._to_storage_blob(make_dggs_json_blob(dggrs_uri, zone_text, fields_map))
+
+def _sample_and_encode_worker(dggrs_uri: str, ds_path: str, zone_id: int, worker_config: dict,
+   raster_crs: str, data_level: int, depth: int, use_overviews: bool, fields: List[str],
+   bands: Optional[List[int]] = None) -> Optional[bytes]:
+   return _encode_zone_blob(worker_config, dggrs_uri, zone_id, _sample_package_worker(ds_path, zone_id, worker_config,
+      raster_crs, data_level, depth, use_overviews, fields, bands))
+
+def _aggregate_and_encode_worker(dggrs_uri: str, worker_config: dict, zone_id: int, zone_depth: int,
+   fields: Optional[List[str]] = None) -> Optional[bytes]:
+   return _encode_zone_blob(worker_config, dggrs_uri, zone_id,
+      _aggregate_package_worker(worker_config, zone_id, zone_depth, fields))
 
 # ---------------------------------------------------------------------------
-# Coordinator: single write boundary (uses the threaded builder)
-# - Keeps the original sample_depth_obj_for_zone signature unchanged.
-# - Passes the open ds through; the sampling worker will open a per-thread handle.
+# Import pipeline: batches of root zones are sampled (or aggregated) and encoded by the worker pool
+# while earlier batches are written to the store by a single writer thread.
+# Both stages are bounded (batches in flight, batches waiting to be written), which bounds memory use.
 # ---------------------------------------------------------------------------
-def _process_batch(store, ds, raster_crs: str, dggrs, dggrs_uri: str,
-   base_zone, batch_zones: List, base_ancestors: List,
-   data_level: int, depth: int, fields: List[str], use_overviews: bool, aggregate: bool, bands: List[int] = None,
-   max_workers: int = 16) -> int:
-   if not batch_zones:
-      print("[BATCH] empty batch, skipping", flush=True)
-      return 0
-
-   print(f"[BATCH] processing batch base_zone={dggrs.getZoneTextID(base_zone)} roots={len(batch_zones)} aggregate={aggregate}", flush=True)
-
-   worker_config = {
-      "_data_root": store.data_root,
-      "collection": store.collection,
-      "collection_config": store.config
-   }
-
-   entries = _build_blobs_processes(
-      store_worker_config=worker_config,
-      ds_path=ds.name,
-      raster_crs=raster_crs,
-      dggrs=dggrs,
-      dggrs_uri=dggrs_uri,
-      zones=batch_zones,
-      data_level=data_level,
-      depth=depth,
-      fields=fields,
-      use_overviews=use_overviews,
-      aggregate=aggregate,
-      bands=bands,
-      max_workers=max_workers
-   )
-
-   if not entries:
-      print("[BATCH] no entries produced for this batch, skipping write", flush=True)
-      return 0
-
-   print(f"[BATCH] writing {len(entries)} entries to store for base_zone={dggrs.getZoneTextID(base_zone)}", flush=True)
-   store.write_zone_batch(
-      base_zone=base_zone,
-      entries=entries,
-      base_ancestor_list=base_ancestors,
-      precompressed=False
-   )
-   print(f"[BATCH] write complete for base_zone={dggrs.getZoneTextID(base_zone)} wrote={len(entries)}", flush=True)
-   return len(entries)
+class ImportWriter:
+   # Single thread writing encoded batches to the store in the order they are queued
+   # (write() blocks while queue_depth batches are waiting); written batches and packages are recorded in `journal`
+   def __init__(self, store: DGGSDataStore, queue_depth: int = 4, mark_dirty: bool = False,
+      journal: Optional[ImportJournal] = None):
+      self.store = store
+      self.mark_dirty = mark_dirty
+      self.journal = journal
+      self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_depth))
+      self.written = 0
+      self.error: Optional[BaseException] = None
+      self.thread = threading.Thread(target=self._run, name="dggs-import-writer", daemon=True)
+      self.thread.start()
+
+   def _run(self) -> None:
+      while True:
+         item = self.queue.get()
+         try:
+            if item is None:
+               return
+            if self.error is None:
+               level, base_zone, base_ancestors, zones, entries = item
+               if zones is None:
+                  self.store.close_package_writers()
+                  if self.journal is not None:
+                     self.journal.package_done(level, base_zone)
+               else:
+                  if entries:
+                     self.store.write_zone_batch(base_zone=base_zone, entries=entries,
+                        base_ancestor_list=base_ancestors, precompressed=True, mark_dirty=self.mark_dirty)
+                     self.written += len(entries)
+                     print(f"[WRITE] base_zone={self.store.dggrs.getZoneTextID(base_zone)} wrote={len(entries)} "
+                        f"total={self.written}", flush=True)
+                  if self.journal is not None:
+                     self.journal.batch_done(level, base_zone, zones)
+         except BaseException as e:
+            self.error = e
+         finally:
+            self.queue.task_done()
+
+   def _put(self, item) -> None:
+      if self.error is not None:
+         raise self.error
+      self.queue.put(item)
+
+   def write(self, level: int, base_zone, base_ancestors: List, zones: List, entries: Dict[int, bytes]) -> None:
+      # zones: all roots of the batch, entries: blobs of those with data
+      self._put((level, base_zone, base_ancestors, zones, entries))
+
+   def close_package(self, level: int, base_zone) -> None:
+      # close the package writers once the batches queued so far are written
+      self._put((level, base_zone, None, None, None))
+
+   def flush(self) -> None:
+      self.queue.join()
+      if self.error is not None:
+         raise self.error
+
+   def close(self) -> None:
+      self.queue.put(None)
+      self.thread.join()
+
+class ImportPipeline:
+   # Batches of root zones built by the worker pool (one task per zone returning an encoded blob or None),
+   # handed to the writer in submission order; submit() blocks while more than max_batches batches are in flight
+   def __init__(self, writer: ImportWriter, dggrs, max_batches: int = 4):
+      self.writer = writer
+      self.dggrs = dggrs
+      self.max_batches = max(1, max_batches)
+      self.pending: deque = deque()
+      self.batches = 0
+
+   def submit(self, level: int, base_zone, base_ancestors: List, zones: List,
+      submit_zone: Callable[[Any], Future]) -> None:
+      self.pending.append((level, base_zone, base_ancestors, zones, [submit_zone(z) for z in zones]))
+      self.batches += 1
+      while self.batches > self.max_batches:
+         self._collect()
+
+   def close_package(self, level: int, base_zone) -> None:
+      self.pending.append((level, base_zone, None, None, None))
+
+   def _collect(self) -> None:
+      level, base_zone, base_ancestors, zones, futures = self.pending.popleft()
+      if zones is None:
+         self.writer.close_package(level, base_zone)
+         return
+      self.batches -= 1
+      entries: Dict[int, bytes] = {}
+      for zone, fut in zip(zones, futures):
+         blob = fut.result()
+         if blob:
+            entries[int(zone)] = blob
+         else:
+            print(f"[BUILD] zone={self.dggrs.getZoneTextID(zone)} returned empty, skipping", flush=True)
+      if not entries:
+         print("[BATCH] no entries produced for this batch, skipping write", flush=True)
+      else:
+         print(f"[BATCH] queuing {len(entries)} entries for base_zone={self.dggrs.getZoneTextID(base_zone)}",
+            flush=True)
+      self.writer.write(level, base_zone, base_ancestors, zones, entries)
+
+   def drain(self) -> None:
+      # wait until everything submitted so far is written
+      while self.pending:
+         self._collect()
+      self.writer.flush()
+
+def raster_wgs84_extent(ds) -> Tuple[float, float, float, float]:
+   # Footprint of the raster as a WGS84 (min lon, min lat, max lon, max lat) extent in degrees
+   b = ds.bounds
+   if ds.crs is not None and ds.crs.to_string() != "EPSG:4326":
+      return transform_bounds(ds.crs, "EPSG:4326", b.left, b.bottom, b.right, b.top, densify_pts=21)
+   min_lon, max_lon = min(b.left, b.right), max(b.left, b.right)
+   if max_lon - min_lon >= 360:
+      min_lon, max_lon = -180.0, 180.0
+   return (min_lon, max(-90.0, min(b.bottom, b.top)), max_lon, min(90.0, max(b.bottom, b.top)))
+
+def band_value_ranges(ds, bands: List[int], max_size: int = 4096) -> List[Optional[tuple]]:
+   # Approximate (min, max) of valid values per band from a decimated masked read
+   # (served from overviews when available), widened by 1% since decimation may miss extremes.
+   # Values outside the range are clamped when quantized. None for bands without valid values.
+   factor = max(1, (max(ds.width, ds.height) + max_size - 1) // max_size)
+   out_shape = (max(1, ds.height // factor), max(1, ds.width // factor))
+   ranges: List[Optional[tuple]] = []
+   for b in bands:
+      band = ds.read(b, out_shape=out_shape, masked=True).astype(np.float64)
+      valid = band.compressed()
+      valid = valid[np.isfinite(valid)]
+      if valid.size == 0:
+         ranges.append(None)
+         continue
+      vmin, vmax = float(valid.min()), float(valid.max())
+      margin = 0.01 * (vmax - vmin) if factor > 1 else 0.0
+      ranges.append((vmin - margin, vmax + margin))
+   return ranges
 
 # ---------------------------------------------------------------------------
 # Main import function (control flow preserved)
@@ -187,10 +281,22 @@ def _process_batch(store, ds, raster_crs: str, dggrs, dggrs_uri: str,
 def import_raster(ds, collection_id: str, dggrs_name: str, data_root: str = "data",
    level: int = None, depth: int = None,
    fields: List[str] = None, bands: List[int] = None,
-   batch_size: int = 32, groupSize: int = 5, aggregate: bool = None, max_workers: int = 16):
+   batch_size: int = 32, groupSize: int = 5, aggregate: bool = None, max_workers: int = 16,
+   value_encoding: str = "list", quantize: Optional[str] = None, precision: Optional[float] = None,
+   without_rowid: bool = False, layout: str = "tree", aggregation: Optional[Union[str, Dict[str, str]]] = None,
+   extra_depths: Optional[List[int]] = None, update: bool = False, overview: bool = True,
+   pipeline_batches: int = 4, write_queue_depth: int = 4, resume: bool = False, restrict_extent: bool = True,
+   block_cache_mb: int = 64):
 
    # Uses provided open rasterio dataset `ds`. closes ds on every return.
    # Returns 0 on success, 1 on error.
+   # update: write the raster into an existing collection, sampling only its finest root level
+   # and re-aggregating the ancestors of the changed roots (see rebuild_ancestors())
+   # overview: precompute the global overview of the levels coarser than level-0 roots (see build_overview())
+   # resume: continue an interrupted import of the same raster from its journal (see ImportJournal),
+   # skipping the packages and roots already written
+   # restrict_extent: only visit the zones which may overlap the raster's WGS84 extent (see extent_predicate())
+   # block_cache_mb: size of the cache of raster blocks of each worker (see RasterBlockCache), 0 to read one window per root
 
    raster_crs = ds.crs.to_string() if ds.crs is not None else "EPSG:4326"
 
@@ -211,6 +317,42 @@ def import_raster(ds, collection_id: str, dggrs_name: str, data_root: str = "dat
       return 1
    dggrs = dggrs_init()
 
+   base = os.path.join(data_root, collection_id)
+   journal = ImportJournal(base)
+   if resume:
+      if not journal.load():
+         if os.path.exists(os.path.join(base, "collection.json")):
+            print(f"[IMPORT] no interrupted import of collection {collection_id} to resume", flush=True)
+            ds.close()
+            return 0
+         resume = False
+      elif not os.path.exists(os.path.join(base, "collection.json")):
+         # interrupted before anything was written
+         resume = False
+      else:
+         print(f"[IMPORT] resuming: {len(journal.packages)} packages and {len(journal.roots)} roots "
+            f"of incomplete packages already written", flush=True)
+         if fields is None:
+            fields = journal.params.get("fields")
+   existing = None
+   if update or resume:
+      try:
+         with open(os.path.join(base, "collection.json"), "r", encoding="utf-8") as fh:
+            existing = json.load(fh)
+      except Exception as e:
+         print(f"Error: cannot {'resume' if resume else 'update'} collection {collection_id}: {e}", flush=True)
+         ds.close()
+         return 1
+      if level is None:
+         level = existing.get("maxRefinementLevel")
+      if depth is None:
+         depth = existing.get("depth")
+      if (existing.get("dggrs"), existing.get("maxRefinementLevel"), existing.get("depth")) != (dggrs_name, level, depth):
+         print(f"Error: collection {collection_id} is {existing.get('dggrs')} level {existing.get('maxRefinementLevel')} "
+            f"depth {existing.get('depth')}, not {dggrs_name} level {level} depth {depth}", flush=True)
+         ds.close()
+         return 1
+
    if level is None:
       b = ds.bounds
       if raster_crs != "EPSG:4326":
@@ -233,6 +375,8 @@ def import_raster(ds, collection_id: str, dggrs_name: str, data_root: str = "dat
 
    bands_used = bands if bands is not None else list(range(1, ds.count + 1))
 
+   if not fields and existing is not None:
+      fields = DGGSDataStore(data_root, collection_id).fields
    if not fields:
       fields = [f"field{i+1}" for i in range(len(bands_used))]
 
@@ -240,17 +384,62 @@ def import_raster(ds, collection_id: str, dggrs_name: str, data_root: str = "dat
 
    coll_info = {
       "dggrs": dggrs_name, "maxRefinementLevel": data_level, "depth": depth,
-      "groupSize": groupSize, "title": collection_id, "description": collection_id, "version": "1.0"
+      "groupSize": groupSize, "title": collection_id, "description": collection_id, "version": "1.0",
+      "storeVersion": STORE_VERSION
    }
+   if value_encoding != "list":
+      coll_info["valueEncoding"] = value_encoding
+   if without_rowid:
+      coll_info["withoutRowid"] = True
+   if layout != "tree":
+      coll_info["layout"] = layout
+   # aggregation: method (see AGGREGATION_METHODS) for all fields, or per field
+   if isinstance(aggregation, str):
+      aggregation = { fname: aggregation for fname in fields }
+   if aggregation:
+      coll_info["aggregation"] = aggregation
+
+   # quantize: integer storage type ("int8", "int16", "int32") or "auto" to pick the smallest type
+   # fitting each band's value range at the requested precision
+   if existing is None and (quantize is not None or precision is not None):
+      data_type = None if quantize in (None, "auto") else quantize
+      quantization = {}
+      for fname, vrange in zip(fields, band_value_ranges(ds, bands_used)):
+         if vrange is None:
+            continue
+         quantization[fname] = quantization_for_range(vrange[0], vrange[1], data_type, precision)
+         print(f"[IMPORT] quantizing {fname} (range {vrange[0]:g} to {vrange[1]:g}): {quantization[fname]}", flush=True)
+      if quantization:
+         coll_info["quantization"] = quantization
    dggrs_uri = f"[ogc-dggrs:{dggrs_name}]"
 
-   base = os.path.join(data_root, collection_id)
-   os.makedirs(base, exist_ok=True)
-   with open(os.path.join(base, "collection.json"), "w", encoding="utf-8") as fh:
-      json.dump(coll_info, fh, indent=2)
-   print(f"[IMPORT] Wrote collection config to {os.path.join(base, 'collection.json')}", flush=True)
-
-   store = DGGSDataStore(data_root, collection_id, config=coll_info)
+   import_params = {
+      "input": os.path.abspath(ds.name), "dggrs": dggrs_name, "level": data_level, "depth": depth,
+      "fields": list(fields), "update": update
+   }
+   if resume:
+      if journal.params != import_params:
+         print(f"Error: cannot resume the import of {journal.params} with {import_params}", flush=True)
+         ds.close()
+         return 1
+   else:
+      journal.start(import_params)
+
+   if existing is not None:
+      # the storage settings of the existing collection are kept
+      coll_info = existing
+   else:
+      os.makedirs(base, exist_ok=True)
+      with open(os.path.join(base, "collection.json"), "w", encoding="utf-8") as fh:
+         json.dump(coll_info, fh, indent=2)
+      print(f"[IMPORT] Wrote collection config to {os.path.join(base, 'collection.json')}", flush=True)
+
+   store = DGGSDataStore(data_root, collection_id, config=coll_info, shared_access=True)
+   if existing is not None and store.fields and list(fields) != list(store.fields):
+      print(f"Error: fields {fields} do not match those of collection {collection_id}: {store.fields}", flush=True)
+      ds.close()
+      store.close()
+      return 1
    dggrs = store.dggrs
    max_base_level = store._base_level_for_root(deepest_root_level)
    print(
@@ -259,68 +448,102 @@ def import_raster(ds, collection_id: str, dggrs_name: str, data_root: str = "dat
    )
    print(f"[DIAG] using groupSize={groupSize} (recommended default is 5)", flush=True)
 
-   pkg_index = 0
-   total_written = 0
-   finest_level_done = False
-
-   for root_level in range(deepest_root_level, -1, -1):
-      base_level = store._base_level_for_root(root_level)
-      up_to = False
-      for base_zone, base_ancestors in store.iter_bases(base_level, up_to=up_to):
-         pkg_index += 1
-         base_text = dggrs.getZoneTextID(base_zone)
-         print(f"[LEVEL {root_level}] #{pkg_index}: base_zone={base_text}", flush=True)
-
-         base_level = dggrs.getZoneLevel(base_zone)
-         package_group_levels = store.group0Size if base_level == 0 else store.groupSize
-         package_max = base_level + package_group_levels - 1
-         max_root_level = root_level
-         if base_level > max_root_level:
-            print(f"[SKIP] package base {base_text} (base_level={base_level}) deeper than target {max_root_level}",
-               flush=True)
-            continue
+   in_extent = None
+   if restrict_extent:
+      extent = raster_wgs84_extent(ds)
+      in_extent = extent_predicate(dggrs, extent)
+      if in_extent is not None:
+         print(f"[IMPORT] restricted to zones overlapping the WGS84 extent {extent}", flush=True)
 
-         roots_iter = store.iter_roots_for_base(base_zone, max_root_level, up_to=up_to)
+   worker_config = {
+      "_data_root": store.data_root,
+      "collection": store.collection,
+      "collection_config": store.config,
+      "block_cache_mb": block_cache_mb
+   }
 
-         batch_num = 0
-         batch_zones: List = []
-         for zone in roots_iter:
-            root_level = dggrs.getZoneLevel(zone)
-            if data_level - root_level < 0:
-               print(f"[IMPORT] skipping root {dggrs.getZoneTextID(zone)} because data_level < root_level",
+   pkg_index = 0
+   finest_level_done = False
+   pool = import_worker_pool(max_workers)
+   writer = ImportWriter(store, queue_depth=write_queue_depth, mark_dirty=update, journal=journal)
+   pipeline = ImportPipeline(writer, dggrs, max_batches=pipeline_batches)
+
+   try:
+      # when updating, coarser levels are re-aggregated only where the finest level changed
+      lowest_root_level = deepest_root_level if update else 0
+      for root_level in range(deepest_root_level, lowest_root_level - 1, -1):
+         if aggregate and root_level < deepest_root_level:
+            submit_zone = lambda z: pool.submit(_aggregate_and_encode_worker, dggrs_uri, worker_config, int(z), depth,
+               fields)
+         else:
+            submit_zone = lambda z: pool.submit(_sample_and_encode_worker, dggrs_uri, ds.name, int(z), worker_config,
+               raster_crs, data_level, depth, use_overviews_for_sampling, fields, bands_used)
+         base_level = store._base_level_for_root(root_level)
+         up_to = False
+         for base_zone, base_ancestors in store.iter_bases(base_level, up_to=up_to, in_extent_cb=in_extent):
+            pkg_index += 1
+            base_text = dggrs.getZoneTextID(base_zone)
+            print(f"[LEVEL {root_level}] #{pkg_index}: base_zone={base_text}", flush=True)
+
+            base_level = dggrs.getZoneLevel(base_zone)
+            package_group_levels = store.group0Size if base_level == 0 else store.groupSize
+            package_max = base_level + package_group_levels - 1
+            max_root_level = root_level
+            if base_level > max_root_level:
+               print(f"[SKIP] package base {base_text} (base_level={base_level}) deeper than target {max_root_level}",
                   flush=True)
                continue
-            batch_zones.append(zone)
-            if len(batch_zones) >= batch_size:
+            if resume and journal.package_completed(root_level, base_zone):
+               print(f"[RESUME] package base {base_text} already written", flush=True)
+               continue
+
+            roots_iter = store.iter_roots_for_base(base_zone, max_root_level, up_to=up_to, in_extent_cb=in_extent)
+
+            batch_num = 0
+            batch_zones: List = []
+            for zone in roots_iter:
+               if resume and int(zone) in journal.roots:
+                  continue
+               if data_level - dggrs.getZoneLevel(zone) < 0:
+                  print(f"[IMPORT] skipping root {dggrs.getZoneTextID(zone)} because data_level < root_level",
+                     flush=True)
+                  continue
+               batch_zones.append(zone)
+               if len(batch_zones) >= batch_size:
+                  batch_num += 1
+                  print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: submitting {len(batch_zones)} roots",
+                     flush=True)
+                  pipeline.submit(root_level, base_zone, base_ancestors, batch_zones, submit_zone)
+                  batch_zones = []
+
+            if batch_zones:
                batch_num += 1
-               print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: handling {len(batch_zones)} roots",
+               print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: submitting {len(batch_zones)} roots",
                   flush=True)
-               written = _process_batch(
-                  store, ds, raster_crs, dggrs, dggrs_uri, base_zone, batch_zones,
-                  base_ancestors, data_level, depth, fields, use_overviews_for_sampling,
-                  aggregate and root_level < deepest_root_level, bands_used,
-                  max_workers = max_workers
-               )
-               total_written += written
-               batch_zones = []
-
-         if batch_zones:
-            batch_num += 1
-            print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: handling {len(batch_zones)} roots",
-               flush=True)
-            written = _process_batch(
-               store, ds, raster_crs, dggrs, dggrs_uri, base_zone, batch_zones,
-               base_ancestors, data_level, depth, fields, use_overviews_for_sampling,
-               aggregate and root_level < deepest_root_level, bands_used
-            )
-            total_written += written
-
-         print(f"[LEVEL {root_level}] #{pkg_index} complete; total_written so far={total_written}", flush=True)
-
-      if aggregate and not finest_level_done:
-         finest_level_done = True
-         store._compute_fields()
-
-   ds.close()
-   print(f"[IMPORT] complete; total written={total_written}", flush=True)
+               pipeline.submit(root_level, base_zone, base_ancestors, batch_zones, submit_zone)
+
+            pipeline.close_package(root_level, base_zone)
+            print(f"[LEVEL {root_level}] #{pkg_index} submitted; total_written so far={writer.written}", flush=True)
+
+         # the next (coarser) level is aggregated from this one
+         pipeline.drain()
+         if aggregate and not finest_level_done:
+            finest_level_done = True
+            store._compute_fields()
+   finally:
+      # also on errors (e.g., raised by a worker or the writer): pending tasks are cancelled
+      writer.close()
+      pool.shutdown(cancel_futures=True)
+      ds.close()
+      store.close()
+
+   if update:
+      rebuilt = rebuild_ancestors(store, max_workers=max_workers)
+      print(f"[IMPORT] {rebuilt} ancestor zones re-aggregated", flush=True)
+   elif overview:
+      build_overview(store, max_workers=max_workers)
+   if extra_depths:
+      materialize_extra_depths(store, extra_depths, max_workers=max_workers)
+   journal.clear()
+   print(f"[IMPORT] complete; total written={writer.written}", flush=True)
    return 0
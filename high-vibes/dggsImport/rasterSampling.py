@@ -6,8 +6,9 @@ from rasterio.warp import transform
 from rasterio.sample import sample_gen
 from rasterio.transform import Affine, rowcol
 from rasterio.windows import Window
-from cffi import FFI
 from pyproj import Transformer
+import threading
+from collections import OrderedDict
 
 import numpy as np
 
@@ -25,13 +26,17 @@ _TRANSFORMER_RAD_BUG = (_lon < 2.0)
 # Low-level sampling / coordinate helpers
 # ---------------------------------------------------------------------------
 
-def _coords_for_centroids(centroids, raster_crs: str) -> List[Tuple[float, float]]:
-   ffi = FFI()
-   n = centroids.count
-   ptr = ffi.cast("double *", centroids.array)
-   buf = ffi.buffer(ptr, n * 2 * ffi.sizeof("double"))
-   arr = np.frombuffer(buf, dtype=np.float64).reshape((n, 2))   # columns: [lat_rad, lon_rad]
+# Centroid buffer of each sampling thread, reused across zones (grown as needed)
+_centroid_buffers = threading.local()
 
+def _centroid_buffer(count: int) -> np.ndarray:
+   buf = getattr(_centroid_buffers, "latlon", None)
+   if buf is None or buf.shape[0] < count:
+      buf = _centroid_buffers.latlon = np.empty((count, 2), dtype=np.float64)
+   return buf
+
+def _coords_for_centroids(arr: np.ndarray, raster_crs: str) -> List[Tuple[float, float]]:
+   # arr columns: [lat_rad, lon_rad]
    lat_rad = arr[:, 0]
    lon_rad = arr[:, 1]
 
@@ -53,8 +58,62 @@ def _coords_for_centroids(centroids, raster_crs: str) -> List[Tuple[float, float
       coords = np.column_stack((xs, ys))
    return [ (float(x), float(y)) for x, y in coords ]
 
-def _sample_values_for_centroids(ds, coords: List[tuple], overview_factor: Optional[int], bands: List[int]) -> List[List[Optional[float]]]:
-   # Vectorized sampling: one read covering all coords, then NumPy advanced indexing.
+class RasterBlockCache:
+   # Full-resolution pixels of a dataset's bands read in units of its native block (tile or strip) grid,
+   # only for the blocks containing sampled pixels, and kept in an LRU cache of at most max_bytes
+   # shared across the roots sampled by a worker (neighbouring roots mostly reuse the same blocks).
+   # Strips or small tiles are grouped into blocks of at least min_pixels.
+   def __init__(self, ds, bands: List[int], max_bytes: int = 64 << 20, min_pixels: int = 65536):
+      self.ds = ds
+      self.bands = list(bands)
+      bh, bw = ds.block_shapes[self.bands[0] - 1] if ds.block_shapes else (ds.height, ds.width)
+      bh, bw = max(1, min(bh, ds.height)), max(1, min(bw, ds.width))
+      if bh * bw < min_pixels:
+         bh = min(ds.height, bh * -(-min_pixels // (bh * bw)))
+      self.block_shape = (bh, bw)
+      self.blocks_per_row = -(-ds.width // bw)
+      self.max_bytes = max_bytes
+      self.nbytes = 0
+      self.blocks: "OrderedDict[int, np.ndarray]" = OrderedDict()
+      self.lock = threading.Lock()
+
+   def _block(self, key: int) -> np.ndarray:
+      with self.lock:
+         block = self.blocks.get(key)
+         if block is not None:
+            self.blocks.move_to_end(key)
+            return block
+         bh, bw = self.block_shape
+         row_off, col_off = (key // self.blocks_per_row) * bh, (key % self.blocks_per_row) * bw
+         block = self.ds.read(self.bands, window=Window(col_off, row_off,
+            min(bw, self.ds.width - col_off), min(bh, self.ds.height - row_off)))
+         self.blocks[key] = block
+         self.nbytes += block.nbytes
+         while self.nbytes > self.max_bytes and len(self.blocks) > 1:
+            self.nbytes -= self.blocks.popitem(last=False)[1].nbytes
+         return block
+
+   def sample(self, rows: np.ndarray, cols: np.ndarray, out: np.ndarray) -> None:
+      # out[band_index, i] = value of pixel (rows[i], cols[i]), left unchanged for pixels outside the dataset
+      valid = (rows >= 0) & (rows < self.ds.height) & (cols >= 0) & (cols < self.ds.width)
+      indices = np.nonzero(valid)[0]
+      if not indices.size:
+         return
+      bh, bw = self.block_shape
+      rows, cols = rows[indices], cols[indices]
+      keys = (rows // bh) * self.blocks_per_row + cols // bw
+      order = np.argsort(keys, kind="stable")
+      unique_keys, starts = np.unique(keys[order], return_index=True)
+      ends = np.append(starts[1:], order.size)
+      for key, start, end in zip(unique_keys.tolist(), starts, ends):
+         sel = order[start:end]
+         row_off, col_off = (key // self.blocks_per_row) * bh, (key % self.blocks_per_row) * bw
+         out[:, indices[sel]] = self._block(key)[:, rows[sel] - row_off, cols[sel] - col_off]
+
+def _sample_values_for_centroids(ds, coords: List[tuple], overview_factor: Optional[int], bands: List[int],
+   blocks: Optional[RasterBlockCache] = None) -> List[List[Optional[float]]]:
+   # Vectorized sampling: one read covering all coords (or at full resolution, reads of the cached blocks
+   # containing them when `blocks` is given), then NumPy advanced indexing.
    # Returns per_field_values[band_index][centroid_index] with None for nodata/missing.
    if not coords:
       return []
@@ -79,6 +138,10 @@ def _sample_values_for_centroids(ds, coords: List[tuple], overview_factor: Optio
    # compute pixel row/col indices at dataset resolution (vectorized)
    rows_all, cols_all = np.array(rowcol(ds.transform, xs, ys, op=int))
 
+   if blocks is not None and not (overview_factor and overview_factor > 1):
+      blocks.sample(rows_all, cols_all, result_np)
+      return _per_field_values(result_np, nodata_for_bands, nodata_is_nan)
+
    # determine bounding window in pixel coordinates (clamped to dataset)
    min_row = int(max(0, rows_all.min()))
    max_row = int(min(ds.height - 1, rows_all.max()))
@@ -122,6 +185,10 @@ def _sample_values_for_centroids(ds, coords: List[tuple], overview_factor: Optio
          vals = arr[:, rel_rows[valid_mask], rel_cols[valid_mask]]   # shape (bcount, n_valid)
          result_np[:, valid_indices] = vals
 
+   return _per_field_values(result_np, nodata_for_bands, nodata_is_nan)
+
+def _per_field_values(result_np: np.ndarray, nodata_for_bands: np.ndarray, nodata_is_nan: np.ndarray) -> List[List[Optional[float]]]:
+   bcount = result_np.shape[0]
    # vectorized nodata handling per band
    for bi in range(bcount):
       nod = nodata_for_bands[bi]
@@ -192,19 +259,20 @@ def _choose_overview_factor_for_level(ds, dggrs, zone, root_level: int, relative
 # ---------------------------------------------------------------------------
 
 def sample_depth_obj_for_zone(store, ds, raster_crs: str, dggrs, zone, data_level: int,
-   depth: int, use_overviews: bool, fields: List[str], bands: List[int] = None) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+   depth: int, use_overviews: bool, fields: List[str], bands: List[int] = None,
+   blocks: Optional[RasterBlockCache] = None) -> Optional[Dict[str, List[Dict[str, Any]]]]:
    # Sample centroids for `zone` at `depth` and return fields_map:      # | None
    #  { field_name: [ depth_entry ] }
-   # Assumes caller's `fields` corresponds to requested `bands`.
+   # Assumes caller's `fields` corresponds to requested `bands`
+   # (and `blocks`, if given, caches the same bands of `ds`).
    root_level = dggrs.getZoneLevel(zone)
    if data_level - root_level < 0:
       return None
 
-   centroids = dggrs.getSubZoneWGS84Centroids(zone, depth) or []
-   count_centroids = len(centroids)
+   centroids = _centroid_buffer(dggrs.countSubZones(zone, depth))
+   count_centroids = dggrs.getSubZoneWGS84CentroidsInto(zone, depth, centroids)
 
-   coords = _coords_for_centroids(centroids, raster_crs)
-   Instance.delete(centroids)
+   coords = _coords_for_centroids(centroids[:count_centroids], raster_crs)
    if not coords:
       print(f"[SAMPLE] zone={dggrs.getZoneTextID(zone)} depth={depth} no coords after transform, skipping", flush=True)
       return None
@@ -222,7 +290,7 @@ def sample_depth_obj_for_zone(store, ds, raster_crs: str, dggrs, zone, data_leve
    bcount = len(bands_to_sample)
 
    # get per-field arrays: per_field_values[band_index][centroid_index]
-   per_field_values = _sample_values_for_centroids(ds, coords, overview_factor, bands_to_sample)
+   per_field_values = _sample_values_for_centroids(ds, coords, overview_factor, bands_to_sample, blocks)
 
    if not per_field_values or len(per_field_values) != bcount or any(len(pv) != count_centroids for pv in per_field_values):
       print(f"[SAMPLE] zone={dggrs.getZoneTextID(zone)} depth={depth} shape_mismatch sampled_bands={len(per_field_values) if per_field_values else 0} expected_bands={bcount} or centroid_count_mismatch, skipping", flush=True)
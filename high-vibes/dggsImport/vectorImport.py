@@ -14,27 +14,27 @@ import os
 import json
 import gzip
 from concurrent.futures import ProcessPoolExecutor, as_completed
-from typing import Any, Dict, List, Optional
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
 import ubjson
 
 try:
-   from dggsStore.store import DGGSDataStore
+   from dggsStore.store import DGGSDataStore, ImportJournal, STORE_VERSION, extent_predicate
    from fg.reproj import geojson_load, instantiate_projection_for_dggrs_name, reproject_featurecollection
    from fg.fix_topology_5x6 import fix_feature_collection_5x6_topology
    from fg.clippingShapely import clip_featurecollection_to_zone
    from fg.dggsJSONFG import write_dggs_json_fg
    from fg.wkbc import write_wkb_collection_file, read_wkb_collection_file
 except(ImportError):
-   from ..dggsStore.store import DGGSDataStore
+   from ..dggsStore.store import DGGSDataStore, ImportJournal, STORE_VERSION, extent_predicate
    from ..fg.reproj import geojson_load, instantiate_projection_for_dggrs_name, reproject_featurecollection
    from ..fg.fix_topology_5x6 import fix_feature_collection_5x6_topology
    from ..fg.clippingShapely import clip_featurecollection_to_zone
    from ..fg.dggsJSONFG import write_dggs_json_fg
    from ..fg.wkbc import write_wkb_collection_file, read_wkb_collection_file
 
-# prepare input pipeline (reproj + fix) executed once in parent
-def _prepare_input_pipeline(input_path: str, dggrs_name: str, skip_reproj: bool, skip_fix: bool):
-   src = geojson_load(input_path)
+# prepare input pipeline (reproj + fix) executed once in parent on the loaded GeoJSON
+def _prepare_input_pipeline(src, dggrs_name: str, skip_reproj: bool, skip_fix: bool):
    if not skip_reproj:
       proj = instantiate_projection_for_dggrs_name(dggrs_name)
       print("Reprojecting to native CRS of", dggrs_name, "...")
@@ -44,32 +44,67 @@ def _prepare_input_pipeline(input_path: str, dggrs_name: str, skip_reproj: bool,
       src = fix_feature_collection_5x6_topology(src)
    return src
 
+def geojson_wgs84_extent(fc) -> Optional[Tuple[float, float, float, float]]:
+   # (min lon, min lat, max lon, max lat) of the coordinates of all feature geometries, None if there are none
+   min_lon = min_lat = float("inf")
+   max_lon = max_lat = float("-inf")
+   stack = []
+   for feat in fc.get("features", []) or []:
+      geom = feat.get("geometry") or {}
+      if geom.get("type") == "GeometryCollection":
+         stack.extend(g.get("coordinates") or [] for g in geom.get("geometries") or [])
+      else:
+         stack.append(geom.get("coordinates") or [])
+   while stack:
+      coords = stack.pop()
+      if coords and isinstance(coords[0], (int, float)):
+         min_lon, max_lon = min(min_lon, coords[0]), max(max_lon, coords[0])
+         min_lat, max_lat = min(min_lat, coords[1]), max(max_lat, coords[1])
+      else:
+         stack.extend(coords)
+   if min_lon > max_lon:
+      return None
+   return (min_lon, min_lat, max_lon, max_lat)
+
 def _initialize_dggal_worker():
    app = Application(appGlobals=globals());
    pydggal_setup(app)
 
+# State kept by each worker process of an import pool across tasks and batches:
+# the store (with its DGGRS instance) and the WKBC source features
+_worker_state: Dict[str, Any] = {}
+
+def _worker_store(worker_config: dict) -> DGGSDataStore:
+   key = (worker_config["_data_root"], worker_config["collection"])
+   if _worker_state.get("store_key") != key:
+      _worker_state["store"] = DGGSDataStore(key[0], key[1], config=worker_config["collection_config"])
+      _worker_state["store_key"] = key
+   return _worker_state["store"]
+
+def _worker_wkbc(wkbc_path: str) -> Dict[str, Any]:
+   # geometry-only feature collection, read once per worker (not modified by clipping)
+   if _worker_state.get("wkbc_path") != wkbc_path:
+      _worker_state["wkbc"] = read_wkb_collection_file(wkbc_path)
+      _worker_state["wkbc_path"] = wkbc_path
+   return _worker_state["wkbc"]
+
+def vector_import_worker_pool(max_workers: int = 16) -> ProcessPoolExecutor:
+   # One pool for a whole import run, rather than one per batch
+   return ProcessPoolExecutor(max_workers=max(1, max_workers), initializer=_initialize_dggal_worker)
+
 # worker: build a single FG blob for a root zone (picklable top-level)
 def _vector_package_worker(wkbc_path: str,
    zone_id: int,
    worker_config: dict,
    dggrs_name: str,
    depth: int) -> Optional[bytes]:
-   data_root = worker_config["_data_root"]
-   collection = worker_config["collection"]
-   collection_config = worker_config["collection_config"]
-
-   store = DGGSDataStore(data_root, collection, config=collection_config)
+   store = _worker_store(worker_config)
    dggrs = store.dggrs
    root_zone = DGGRSZone(zone_id)
 
-   # read WKBC (geometry-only feature collection)
-   src_fc = read_wkb_collection_file(wkbc_path)
-
-   # clip features to zone (out_fc will have features with ids and no properties)
-   out_fc, feature_entry_exit_indices = clip_featurecollection_to_zone(src_fc, dggrs, root_zone, refined=False)
-
-   # free the large WKBC source from memory
-   del src_fc
+   # clip features of the WKBC (geometry-only feature collection) to zone
+   # (out_fc will have features with ids and no properties)
+   out_fc, feature_entry_exit_indices = clip_featurecollection_to_zone(_worker_wkbc(wkbc_path), dggrs, root_zone, refined=False)
 
    features = out_fc.get("features", []) or []
    if not features:
@@ -92,13 +127,14 @@ def _build_vector_blobs_processes(
    dggrs,
    zones: List,
    depth: int,
-   max_workers: int = 16
+   max_workers: int = 16,
+   pool: Optional[ProcessPoolExecutor] = None
 ) -> Dict[int, bytes]:
+   # pool: worker pool of the import run (see vector_import_worker_pool()), otherwise one is created for this batch
    if not zones:
       return {}
-   workers = min(max_workers, max(1, len(zones)))
    blobs: Dict[int, bytes] = {}
-   with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_dggal_worker) as ex:
+   with nullcontext(pool) if pool is not None else vector_import_worker_pool(min(max_workers, len(zones))) as ex:
       futures = {}
       for z in zones:
          fut = ex.submit(_vector_package_worker, wkbc_path, int(z), store_worker_config, dggrs.__class__.__name__, depth)
@@ -116,7 +152,7 @@ def _build_vector_blobs_processes(
 
 # coordinator: process a batch of root zones and write to store (precompressed)
 def _process_batch_vector(store, wkbc_path: str, dggrs, base_zone, batch_zones: List, base_ancestors: List,
-   depth: int, max_workers: int = 16) -> int:
+   depth: int, max_workers: int = 16, pool: Optional[ProcessPoolExecutor] = None) -> int:
    if not batch_zones:
       print("[BATCH] empty batch, skipping", flush=True)
       return 0
@@ -135,7 +171,8 @@ def _process_batch_vector(store, wkbc_path: str, dggrs, base_zone, batch_zones:
       dggrs=dggrs,
       zones=batch_zones,
       depth=depth,
-      max_workers=max_workers
+      max_workers=max_workers,
+      pool=pool
    )
 
    if not entries_map:
@@ -170,7 +207,13 @@ def import_vector(input_geojson_path: str,
                   groupSize: int = 5,
                   max_workers: int = 16,
                   skip_reproj: bool = False,
-                  skip_fix: bool = False) -> int:
+                  skip_fix: bool = False,
+                  layout: str = "tree",
+                  resume: bool = False,
+                  restrict_extent: bool = True) -> int:
+   # resume: continue an interrupted import of the same file from its journal (see ImportJournal),
+   # skipping the packages and roots already written
+   # restrict_extent: only visit the zones which may overlap the WGS84 extent of the features (see extent_predicate())
 
    dggrs_init = globals().get(dggrs_name)
    if dggrs_init is None:
@@ -191,15 +234,46 @@ def import_vector(input_geojson_path: str,
 
    coll_info = {
       "dggrs": dggrs_name, "maxRefinementLevel": data_level, "depth": depth,
-      "groupSize": groupSize, "title": collection_id, "description": collection_id, "version": "1.0"
+      "groupSize": groupSize, "title": collection_id, "description": collection_id, "version": "1.0",
+      "storeVersion": STORE_VERSION
    }
+   if layout != "tree":
+      coll_info["layout"] = layout
    dggrs_uri = f"[ogc-dggrs:{dggrs_name}]"
 
    base = os.path.join(data_root, collection_id)
-   os.makedirs(base, exist_ok=True)
-   with open(os.path.join(base, "collection.json"), "w", encoding="utf-8") as fh:
-      json.dump(coll_info, fh, indent=2)
-   print(f"[IMPORT] Wrote collection config to {os.path.join(base, 'collection.json')}", flush=True)
+   coll_path = os.path.join(base, "collection.json")
+   journal = ImportJournal(base)
+   import_params = {
+      "input": os.path.abspath(input_geojson_path), "dggrs": dggrs_name, "level": data_level, "depth": depth,
+      "skipReproj": skip_reproj, "skipFix": skip_fix
+   }
+   if resume:
+      if not journal.load():
+         if os.path.exists(coll_path):
+            print(f"[IMPORT] no interrupted import of collection {collection_id} to resume", flush=True)
+            return 0
+         resume = False
+      elif not os.path.exists(coll_path):
+         # interrupted before anything was written
+         resume = False
+      elif journal.params != import_params:
+         print(f"Error: cannot resume the import of {journal.params} with {import_params}", flush=True)
+         return 1
+      else:
+         print(f"[IMPORT] resuming: {len(journal.packages)} packages and {len(journal.roots)} roots "
+            f"of incomplete packages already written", flush=True)
+
+   if resume:
+      # the storage settings of the interrupted import are kept
+      with open(coll_path, "r", encoding="utf-8") as fh:
+         coll_info = json.load(fh)
+   else:
+      journal.start(import_params)
+      os.makedirs(base, exist_ok=True)
+      with open(coll_path, "w", encoding="utf-8") as fh:
+         json.dump(coll_info, fh, indent=2)
+      print(f"[IMPORT] Wrote collection config to {coll_path}", flush=True)
 
    store = DGGSDataStore(data_root, collection_id, config=coll_info)
    dggrs = store.dggrs
@@ -210,74 +284,102 @@ def import_vector(input_geojson_path: str,
    )
    print(f"[DIAG] using groupSize={groupSize} (recommended default is 5)", flush=True)
 
-   # prepare input once (reproj + fix)
-   src = _prepare_input_pipeline(input_geojson_path, dggrs_name, skip_reproj=skip_reproj, skip_fix=skip_fix)
-
-   # write collection-level attributes (features list) into store.attributes.sqlite
-   features = src.get("features", []) or []
-   if features:
-      store.write_collection_attributes(features)
-      print(f"[IMPORT] wrote collection attributes for {len(features)} features", flush=True)
-
    # write WKBC file for workers (WKBC contains geometries and feature ids; properties are not included)
    tmp_wkbc_path = os.path.join(store.collection_dir, "tmp_input.wkbc")
-   write_wkb_collection_file(src, tmp_wkbc_path)
-   print(f"[IMPORT] wrote WKBC to {tmp_wkbc_path}", flush=True)
+   src = geojson_load(input_geojson_path)
+   in_extent = None
+   if restrict_extent and not skip_reproj:   # otherwise the input is not in WGS84 coordinates
+      extent = geojson_wgs84_extent(src)
+      in_extent = extent_predicate(dggrs, extent)
+      if in_extent is not None:
+         print(f"[IMPORT] restricted to zones overlapping the WGS84 extent {extent}", flush=True)
+   if resume and {"attributes", "wkbc"} <= journal.steps and os.path.exists(tmp_wkbc_path):
+      print(f"[RESUME] reusing attributes and WKBC {tmp_wkbc_path}", flush=True)
+   else:
+      # prepare input once (reproj + fix)
+      src = _prepare_input_pipeline(src, dggrs_name, skip_reproj=skip_reproj, skip_fix=skip_fix)
+
+      # write collection-level attributes (features list) into store.attributes.sqlite
+      features = src.get("features", []) or []
+      if "attributes" not in journal.steps:
+         if features:
+            store.write_collection_attributes(features)
+            print(f"[IMPORT] wrote collection attributes for {len(features)} features", flush=True)
+         journal.step_done("attributes")
+
+      write_wkb_collection_file(src, tmp_wkbc_path)
+      journal.step_done("wkbc")
+      print(f"[IMPORT] wrote WKBC to {tmp_wkbc_path}", flush=True)
 
    pkg_index = 0
    total_written = 0
-
-   for root_level in range(deepest_root_level, -1, -1):
-      base_level = store._base_level_for_root(root_level)
-      up_to = False
-      for base_zone, base_ancestors in store.iter_bases(base_level, up_to=up_to):
-         pkg_index += 1
-         base_text = dggrs.getZoneTextID(base_zone)
-         print(f"[LEVEL {root_level}] #{pkg_index}: base_zone={base_text}", flush=True)
-
-         base_level = dggrs.getZoneLevel(base_zone)
-         package_group_levels = store.group0Size if base_level == 0 else store.groupSize
-         package_max = base_level + package_group_levels - 1
-         max_root_level = root_level
-         if base_level > max_root_level:
-            print(f"[SKIP] package base {base_text} (base_level={base_level}) deeper than target {max_root_level}", flush=True)
-            continue
-
-         roots_iter = store.iter_roots_for_base(base_zone, max_root_level, up_to=up_to)
-
-         batch_num = 0
-         batch_zones: List = []
-         for zone in roots_iter:
-            root_level = dggrs.getZoneLevel(zone)
-            if data_level - root_level < 0:
-               print(f"[IMPORT] skipping root {dggrs.getZoneTextID(zone)} because data_level < root_level", flush=True)
+   pool = vector_import_worker_pool(max_workers)
+
+   try:
+      for root_level in range(deepest_root_level, -1, -1):
+         base_level = store._base_level_for_root(root_level)
+         up_to = False
+         for base_zone, base_ancestors in store.iter_bases(base_level, up_to=up_to, in_extent_cb=in_extent):
+            pkg_index += 1
+            base_text = dggrs.getZoneTextID(base_zone)
+            print(f"[LEVEL {root_level}] #{pkg_index}: base_zone={base_text}", flush=True)
+
+            base_level = dggrs.getZoneLevel(base_zone)
+            package_group_levels = store.group0Size if base_level == 0 else store.groupSize
+            package_max = base_level + package_group_levels - 1
+            max_root_level = root_level
+            if base_level > max_root_level:
+               print(f"[SKIP] package base {base_text} (base_level={base_level}) deeper than target {max_root_level}", flush=True)
+               continue
+            if resume and journal.package_completed(root_level, base_zone):
+               print(f"[RESUME] package base {base_text} already written", flush=True)
                continue
-            batch_zones.append(zone)
-            if len(batch_zones) >= batch_size:
+
+            roots_iter = store.iter_roots_for_base(base_zone, max_root_level, up_to=up_to, in_extent_cb=in_extent)
+
+            batch_num = 0
+            batch_zones: List = []
+            for zone in roots_iter:
+               if resume and int(zone) in journal.roots:
+                  continue
+               if data_level - dggrs.getZoneLevel(zone) < 0:
+                  print(f"[IMPORT] skipping root {dggrs.getZoneTextID(zone)} because data_level < root_level", flush=True)
+                  continue
+               batch_zones.append(zone)
+               if len(batch_zones) >= batch_size:
+                  batch_num += 1
+                  print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: handling {len(batch_zones)} roots", flush=True)
+                  written = _process_batch_vector(
+                     store, tmp_wkbc_path, dggrs, base_zone, batch_zones, base_ancestors,
+                     depth, max_workers=max_workers, pool=pool
+                  )
+                  journal.batch_done(root_level, base_zone, batch_zones)
+                  total_written += written
+                  batch_zones = []
+
+            if batch_zones:
                batch_num += 1
                print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: handling {len(batch_zones)} roots", flush=True)
                written = _process_batch_vector(
                   store, tmp_wkbc_path, dggrs, base_zone, batch_zones, base_ancestors,
-                  depth, max_workers=max_workers
+                  depth, max_workers=max_workers, pool=pool
                )
+               journal.batch_done(root_level, base_zone, batch_zones)
                total_written += written
                batch_zones = []
 
-         if batch_zones:
-            batch_num += 1
-            print(f"[LEVEL {root_level}] #{pkg_index} BATCH {batch_num}: handling {len(batch_zones)} roots", flush=True)
-            written = _process_batch_vector(
-               store, tmp_wkbc_path, dggrs, base_zone, batch_zones, base_ancestors,
-               depth, max_workers=max_workers
-            )
-            total_written += written
-            batch_zones = []
-
-         print(f"[LEVEL {root_level}] #{pkg_index} complete; total_written so far={total_written}", flush=True)
+            store.close_package_writers()
+            journal.package_done(root_level, base_zone)
+            print(f"[LEVEL {root_level}] #{pkg_index} complete; total_written so far={total_written}", flush=True)
+   finally:
+      # also on errors (e.g., raised by a worker) or interruptions: pending tasks are cancelled and writers closed
+      pool.shutdown(cancel_futures=True)
+      store.close()
 
    # cleanup temporary WKBC
    if os.path.exists(tmp_wkbc_path):
       os.remove(tmp_wkbc_path)
+   journal.clear()
 
    print(f"[IMPORT] complete; total written={total_written}", flush=True)
    return 0
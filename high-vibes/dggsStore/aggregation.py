@@ -11,6 +11,8 @@ except(ImportError):
 
 ffi = dggal.ffi
 
+import numpy as np
+
 from .store import *
 
 logger = logging.getLogger("dggs-serve.aggregation")
@@ -20,6 +22,7 @@ def collect_ancestors_at_level(dggrs, start_zone, target_level):
    out = []
    stack = [start_zone]
    seen = set()
+   parents = np.empty(3, dtype=np.uint64)
    while stack:
       n = stack.pop()
       nid = int(n)
@@ -32,22 +35,31 @@ def collect_ancestors_at_level(dggrs, start_zone, target_level):
          continue
       if lvl <= target_level:
          continue
-      parents = dggrs.getZoneParents(n)
-      for p in parents:
+      n_parents = dggrs.getZoneParentsInto(n, parents)
+      for p in parents[:n_parents].tolist():
          if nested == False and not dggrs.zoneHasSubZone(p, start_zone):
             continue # Skip ancestors not overlapping the sub-zone
          stack.append(p)
-      if parents is not None:
-         Instance.delete(parents)
    return out
                                                                                    # | None
-def assemble_aggregate_from_level0(store, root_zone, zone_depth, fields: List[str] = None) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+def assemble_aggregate_from_level0(store, root_zone, zone_depth, fields: List[str] = None,
+   use_overview: bool = True) -> Optional[Dict[str, List[Dict[str, Any]]]]:
    # Returns a ValuesObject: field -> [ValueEntry]
+   # looked up in the collection's global overview if built (see build_overview()), otherwise
    # collect level-0 ancestors (roots at level 0 that cover this root_zone)
    # paint their values (at store's depth) onto the target root zone at target depth
    # (assumed to be of a refinement level coarser than the level0 source store depth values)
+   if fields is None:
+      fields = store.fields
+   if use_overview:
+      zones = sub_zone_index(store.dggrs, root_zone, zone_depth).zones
+      level = store.dggrs.getZoneLevel(root_zone) + zone_depth
+      values = store.overview.values(zones, level, fields)
+      if values is not None:
+         return { fname: [ make_dggs_json_depth(zone_depth, zones.size, [ None if x != x else x for x in v.tolist() ]) ]
+            for fname, v in values.items() }
    ancestors = collect_ancestors_at_level(store.dggrs, root_zone, 0)
-   return _aggregate_stored_roots(store, root_zone, zone_depth, ancestors, store.depth, fields)
+   return _aggregate_stored_roots(store, root_zone, zone_depth, ancestors, store.depth, fields, parallel=True)
 
 def aggregate_from_children(store, root_zone, zone_depth, fields: List[str]):
    # Returns a ValuesObject: field -> [ValueEntry]
@@ -60,129 +72,193 @@ def aggregate_from_children(store, root_zone, zone_depth, fields: List[str]):
       Instance.delete(children)
    return values
 
+# Aggregation plans keyed by (DGGRS, target root zone, target depth, relative depth)
+aggregation_plans = LRUMemo(32)
+
+def aggregation_plan(dggrs, target_root_zone: DGGRSZone, target_depth: int, rel_depth: int):
+   # Sparse (COO) weight matrix from the sub-zones of target_root_zone at target_depth to their sub-zones
+   # rel_depth levels finer (or themselves for a rel_depth of 0), as (subs_count, target sub-zone indices, source zones, weights).
+   # It only depends on the target and is shared by all source roots and fields being aggregated.
+   key = (type(dggrs).__name__, int(target_root_zone), target_depth, rel_depth)
+   plan = aggregation_plans.get(key)
+   if plan is not None:
+      return plan
+
+   targets = sub_zone_index(dggrs, target_root_zone, target_depth).zones.tolist()
+   subs_count = len(targets)
+   counts = np.zeros(subs_count, dtype=np.intp)
+
+   if rel_depth == 0:
+      # sub-zones at the same level: each target sub-zone is its own source
+      src = np.array(targets, dtype=np.uint64)
+      weights = np.ones(subs_count)
+      counts[:] = 1
+   elif rel_depth == 1:
+      # Skip Python bindings for better performance: children are written directly into the plan
+      gzc = dggal.lib.DGGRS_getZoneChildren
+      dggrs_impl = dggrs.impl
+      src = np.empty(subs_count * 13, dtype=np.uint64)
+      weights = np.ones(subs_count * 13)
+      src_ptr = ffi.cast("uint64_t *", ffi.from_buffer(src))
+      pos = 0
+      for i, t in enumerate(targets):
+         n_z = gzc(dggrs_impl, t, src_ptr + pos)
+         w = dggrs.getChildrenWeights(t)
+         if w is not None:
+            weights[pos:pos + n_z] = w[:n_z]
+         counts[i] = n_z
+         pos += n_z
+      src, weights = src[:pos], weights[:pos]
+   else:
+      # sub-zones of all targets written one after the other into the plan
+      for i, t in enumerate(targets):
+         counts[i] = dggrs.countSubZones(t, rel_depth)
+      src = np.empty(int(counts.sum()), dtype=np.uint64)
+      weights = np.ones(src.size)
+      pos = 0
+      for i, t in enumerate(targets):
+         n_z = dggrs.getSubZonesInto(t, rel_depth, src[pos:pos + counts[i]])
+         w = dggrs.getSubZoneWeights(t, rel_depth)
+         if w is not None:
+            weights[pos:pos + n_z] = w[:n_z]
+         counts[i] = n_z
+         pos += n_z
+      src, weights = src[:pos], weights[:pos]
+
+   plan = (subs_count, np.repeat(np.arange(subs_count), counts), src, weights)
+   aggregation_plans.put(key, plan)
+   return plan
+
+def aggregate_values(method: str, tgt: np.ndarray, values: np.ndarray, weights: np.ndarray, count: int) -> np.ndarray:
+   # Aggregate the (target index, value, weight) contributions of valid (non-NaN) source values
+   # into `count` targets using one of AGGREGATION_METHODS, with NaN for targets without contributors.
+   # For "nearest", ties between the highest weights go to the earliest contribution.
+   out = np.full(count, np.nan)
+   if not tgt.size:
+      return out
+   if method in ("mean", "stddev", "sum"):
+      wsum = np.bincount(tgt, weights=weights, minlength=count)
+      vsum = np.bincount(tgt, weights=values * weights, minlength=count)
+      has_data = wsum > 0
+      if method == "sum":
+         out[has_data] = vsum[has_data]
+      else:
+         mean = vsum[has_data] / wsum[has_data]
+         if method == "mean":
+            out[has_data] = mean
+         else:
+            sqsum = np.bincount(tgt, weights=values * values * weights, minlength=count)
+            out[has_data] = np.sqrt(np.maximum(sqsum[has_data] / wsum[has_data] - mean * mean, 0.0))
+   elif method == "min":
+      np.fmin.at(out, tgt, values)
+   elif method == "max":
+      np.fmax.at(out, tgt, values)
+   elif method == "count":
+      n = np.bincount(tgt, minlength=count)
+      out[n > 0] = n[n > 0]
+   elif method == "mode":
+      # total weight of each distinct (target, value), then the heaviest value of each target (smallest on ties)
+      order = np.lexsort((values, tgt))
+      t, v, w = tgt[order], values[order], weights[order]
+      starts = np.flatnonzero(np.concatenate(([True], (t[1:] != t[:-1]) | (v[1:] != v[:-1]))))
+      gt, gv, gw = t[starts], v[starts], np.add.reduceat(w, starts)
+      order = np.lexsort((-gw, gt))
+      gt, gv = gt[order], gv[order]
+      first = np.concatenate(([True], gt[1:] != gt[:-1]))
+      out[gt[first]] = gv[first]
+   elif method == "nearest":
+      order = np.lexsort((-weights, tgt))
+      t = tgt[order]
+      first = np.concatenate(([True], t[1:] != t[:-1]))
+      out[t[first]] = values[order][first]
+   else:
+      raise ValueError(f"Unsupported aggregation method: {method!r}")
+   return out
+
 def _aggregate_stored_roots(store: DGGSDataStore,
    target_root_zone: DGGRSZone, target_depth: int,
-   root_zones, source_depth, fields: List[str], average: bool = True ):
+   root_zones, source_depth, fields: List[str], methods: Optional[Mapping[str, str]] = None,
+   default_method: str = "mean", parallel: bool = False):
+   # Aggregate the values of stored root zones at source_depth onto the sub-zones of target_root_zone
+   # at target_depth, using the field's method from `methods` (collection.json "aggregation" by default).
+   # A source sub-zone shared by several stored roots contributes once, from the first root with a value.
+   # Sub-zones at the same level as the targets (rel_depth 0) are copied rather than aggregated.
+   # parallel: match the sub-zones of the roots in the shared thread pool (for few, large roots, e.g. level-0 ones)
 
    dggrs = store.dggrs
 
-   subs_count = dggrs.countSubZones(target_root_zone, target_depth)
-
-   # per-field accumulators
-   sums_map = { fname: [0.0] * subs_count for fname in fields }
-   counts_map = { fname: [0] * subs_count for fname in fields }
-
-   subs = dggrs.getSubZones(target_root_zone, target_depth)
-   subs_ptr = ffi.cast("uint64_t *", subs.array)
-   sub_index = { int(subs_ptr[i]): i for i in range(subs_count) }
-
-   gzc = dggal.lib.DGGRS_getZoneChildren
-   dggrs_impl = dggrs.impl
-
    if fields is None:
       fields = store.fields
+   if methods is None:
+      methods = store.aggregation
+
+   target_level = dggrs.getZoneLevel(target_root_zone) + target_depth
+
+   # per-field (target index, source zone, value, weight) contributions
+   contributions = { fname: [] for fname in fields }
+   subs_count = None
+   rel_depth = None
+
+   def root_contributions(root_zone, decoded):
+      # (subs_count, rel_depth, per-field contributions) of one stored root
+      rel_depth = dggrs.getZoneLevel(root_zone) + source_depth - target_level
+      subs_count, tgt, src, weights = aggregation_plan(dggrs, target_root_zone, target_depth, rel_depth)
+
+      # Positions of the plan's source zones within this root's sub-zones (the order of its stored values)
+      src_pos = sub_zone_index(dggrs, root_zone, source_depth).positions(src)
+      hit = src_pos >= 0
+      out = {}
+      if not hit.any():
+         return subs_count, rel_depth, out
+      src_pos = src_pos[hit]
+      tgt_hit, src_hit, weights_hit = tgt[hit], src[hit], weights[hit]
 
-   fields_src_data = [None] * len(fields)
-
-   cBuf = None
-   for root_zone in root_zones:
-      pkg = store.compute_package_path_for_root_zone(root_zone)
-      decoded = None if not pkg else store.read_and_decode_zone_blob(pkg, root_zone)
-      if not decoded:
-         #print("WARNING: Could not decode blob for zone ", dggrs.getZoneTextID(root_zone))
-         continue
-      source_subs = dggrs.getSubZones(root_zone, source_depth)
-      source_ptr = ffi.cast("uint64_t *", source_subs.array)
-      src_index = { int(source_ptr[i]): i for i in range(len(source_subs)) }
-      Instance.delete(source_subs)
-
-      rel_depth = dggrs.getZoneLevel(source_ptr[0]) - dggrs.getZoneLevel(subs_ptr[0])
-
-      fieldIX = 0
       for fname in fields:
-         fData = None
          entries = decoded["values"].get(fname)
-         if entries:
-            chosen = next((e for e in entries if int(e["depth"]) == source_depth), None)
-            if chosen:
-               fData = chosen["data"]
-         fields_src_data[fieldIX] = fData
-         fieldIX = fieldIX + 1
-
-      if rel_depth == 1 and not cBuf:
-         cBuf = ffi.new("uint64_t[13]")
-      for si in range(len(subs)):
-         t = subs_ptr[si]
-         t_idx = sub_index.get(int(t))
-         if t_idx is None:
+         if not entries:
             continue
-
-         if rel_depth == 1:
-            n_z = gzc(dggrs_impl, t, cBuf)
-            weights = dggrs.getChildrenWeights(t)
-            zptr = cBuf
-         else:
-            src_zones = dggrs.getSubZones(t, rel_depth)
-            weights = dggrs.getSubZoneWeights(t, rel_depth)
-            n_z = len(src_zones)
-            zptr = ffi.cast("uint64_t *", src_zones.array)
-
-         fieldIX = 0
-         for fname in fields:
-            src_data = fields_src_data[fieldIX]
-            fieldIX = fieldIX + 1
-            if src_data is None:
-               continue
-
-            sums = sums_map[fname]
-            counts = counts_map[fname]
-
-            sum = sums[t_idx]
-            count = counts[t_idx]
-
-            if weights is None:
-               for i in range(n_z):
-                  idx = src_index.get(zptr[i])
-                  if idx is None:
-                     continue
-                  val = src_data[idx]
-                  if val is None:
-                     continue
-                  sum += val
-                  count += 1.0
-            else:
-               for i in range(n_z):
-                  idx = src_index.get(zptr[i])
-
-                  if idx is None:
-                     continue
-
-                  val = src_data[idx]
-
-                  if val is None:
-                     continue
-                  weight = weights[i]
-                  sum += val * weight
-                  count += weight
-
-            sums[t_idx] = sum
-            counts[t_idx] = count
-
-         if rel_depth != 1:
-            Instance.delete(src_zones)
-
-   Instance.delete(subs)
-
-   # compute averages (None when no contributors) per field
+         chosen = next((e for e in entries if int(e["depth"]) == source_depth), None)
+         if not chosen:
+            continue
+         values = depth_entry_array(chosen)[src_pos]
+         valid = ~np.isnan(values)
+         out[fname] = (tgt_hit[valid], src_hit[valid], values[valid], weights_hit[valid])
+      return subs_count, rel_depth, out
+
+   # all stored roots read with one query per package and decoded in parallel
+   root_zones = list(root_zones)
+   decoded_roots = store.read_and_decode_zone_blobs(root_zones)
+   stored = [ (z, decoded_roots[int(z)]) for z in root_zones if decoded_roots.get(int(z)) ]
+   if parallel and len(stored) > 1:
+      results = decode_executor().map(lambda item: root_contributions(*item), stored)
+   else:
+      results = (root_contributions(*item) for item in stored)
+   # in the order of root_zones, which decides which root a shared source sub-zone is taken from
+   for subs_count, rel_depth, root_parts in results:
+      for fname, part in root_parts.items():
+         contributions[fname].append(part)
+
+   if subs_count is None:
+      subs_count = dggrs.countSubZones(target_root_zone, target_depth)
+
+   # aggregate (None when no contributors) per field
    # wrap into ValuesObject: each field maps to a list of ValueEntry dicts
    values_obj: Dict[str, List[Dict[str, Any]]] = {}
    for fname in fields:
-      sums = sums_map[fname]
-      counts = counts_map[fname]
-      if average == True:
-         out = [ (sums[i] / counts[i]) if counts[i] > 0 else None for i in range(subs_count) ]
+      parts = contributions[fname]
+      if not parts:
+         out = [ None ] * subs_count
       else:
-         out = [ sums[i] if counts[i] > 0 else None for i in range(subs_count) ]
+         tgt, src, values, weights = (np.concatenate(a) for a in zip(*parts))
+         if len(parts) > 1:
+            # keep the first contribution of each (target, source zone) pair, in contribution order
+            order = np.lexsort((src, tgt))
+            t, z = tgt[order], src[order]
+            keep = np.sort(order[np.concatenate(([True], (t[1:] != t[:-1]) | (z[1:] != z[:-1])))])
+            tgt, values, weights = tgt[keep], values[keep], weights[keep]
+         method = "nearest" if rel_depth == 0 else methods.get(fname, default_method)
+         result = aggregate_values(method, tgt, values, weights, subs_count)
+         out = [ None if v != v else v for v in result.tolist() ]
       # REVIEW: Do we want to return None if fully empty or not? Parameter option?
       values_obj[fname] = [ make_dggs_json_depth(target_depth, subs_count, out) ]
 
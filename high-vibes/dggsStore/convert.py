@@ -0,0 +1,516 @@
+# dggsStore/convert.py
+# Conversion of existing DGGS Data Stores between storage formats
+
+from dggal import *
+import os
+import sqlite3
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .store import *
+from .customDepths import assemble_zone_at_depth
+from .aggregation import aggregate_from_children, _aggregate_stored_roots, collect_ancestors_at_level
+
+def rewrite_package_blobs(pkg_path: str, transform: Callable[[Any], Any], batch_size: int = 32,
+   key_column: str = "root_zone_id") -> int:
+   # Rewrite every zone_data row of a package as to_blob(transform(decoded)).
+   # Rows are processed in batches to bound memory use for large packages.
+   conn = sqlite3.connect(pkg_path)
+   conn.execute("PRAGMA synchronous=OFF")
+   ids = [r[0] for r in conn.execute(f"SELECT {key_column} FROM zone_data").fetchall()]
+   for i in range(0, len(ids), batch_size):
+      batch = ids[i:i + batch_size]
+      q = ",".join("?" for _ in batch)
+      rows = conn.execute(f"SELECT {key_column}, data FROM zone_data WHERE {key_column} IN ({q})", batch).fetchall()
+      updated = [ (to_blob(transform(decode_blob(blob))), zid) for zid, blob in rows ]
+      conn.executemany(f"UPDATE zone_data SET data = ? WHERE {key_column} = ?", updated)
+      conn.commit()
+   conn.close()
+   return len(ids)
+
+def _blob_field_ranges(blobs, ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, Tuple[float, float]]:
+   ranges = ranges if ranges is not None else {}
+   for blob in blobs:
+      decoded = decode_blob(blob)
+      for fname, entries in decoded.get("values", {}).items():
+         for e in entries:
+            values = depth_entry_array(e)
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+               continue
+            lo, hi = float(values.min()), float(values.max())
+            if fname in ranges:
+               lo, hi = min(lo, ranges[fname][0]), max(hi, ranges[fname][1])
+            ranges[fname] = (lo, hi)
+   return ranges
+
+def _package_field_ranges(store: DGGSDataStore, pkg_path: str) -> Dict[str, Tuple[float, float]]:
+   with store.connections.connection(pkg_path) as conn:
+      if conn is None:
+         return {}
+      return _blob_field_ranges(blob for (blob,) in conn.execute("SELECT data FROM zone_data"))
+
+def compute_field_ranges(store: DGGSDataStore, max_workers: int = 8) -> Dict[str, Tuple[float, float]]:
+   # Exact (min, max) of the stored values of each field over all packages
+   if store.mapped:
+      return _blob_field_ranges(blob for _, blob in store.iter_zone_blobs())
+   ranges: Dict[str, Tuple[float, float]] = {}
+   packages = list(store.iter_package_files())
+   with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(packages)))) as ex:
+      for pkg_ranges in ex.map(lambda pkg: _package_field_ranges(store, pkg), packages):
+         for fname, (lo, hi) in pkg_ranges.items():
+            if fname in ranges:
+               lo, hi = min(lo, ranges[fname][0]), max(hi, ranges[fname][1])
+            ranges[fname] = (lo, hi)
+   return ranges
+
+def quantization_for_store(store: DGGSDataStore, data_type: Optional[str] = None,
+   precision: Optional[float] = None, max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+   # Per-field quantization parameters (see quantization_for_range()) covering the stored values
+   return { fname: quantization_for_range(lo, hi, data_type, precision)
+      for fname, (lo, hi) in compute_field_ranges(store, max_workers).items() }
+
+def convert_value_encoding(store: DGGSDataStore, value_encoding: str, max_workers: int = 8,
+   quantization: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+   # Re-encode the field values of all packages of a raster store (see VALUE_ENCODINGS),
+   # quantizing the fields listed in `quantization` (any previous quantization is dropped otherwise),
+   # and record the new encoding in collection.json. Returns the number of zones converted.
+   if store.is_vector:
+      print("Value encodings only apply to raster collections", flush=True)
+      return 0
+   if value_encoding not in VALUE_ENCODINGS:
+      print(f"Unsupported value encoding: {value_encoding!r} (expected one of {', '.join(VALUE_ENCODINGS)})", flush=True)
+      return 0
+
+   if store.mapped:
+      print("Mapped archives cannot be rewritten in place; repack the store to the tree or packed layout first", flush=True)
+      return 0
+
+   transform = lambda obj: encode_dggs_json_values(obj, value_encoding, quantization)
+   packages: List[str] = list(store.iter_package_files())
+   total = 0
+   with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(packages)))) as ex:
+      futures = { ex.submit(rewrite_package_blobs, pkg, transform, key_column=store.key_column): pkg for pkg in packages }
+      for fut in as_completed(futures):
+         count = fut.result()
+         total += count
+         print(f"[CONVERT] {futures[fut]}: {count} zones re-encoded as {value_encoding}", flush=True)
+
+   if value_encoding == "list":
+      store.config.pop("valueEncoding", None)
+   else:
+      store.config["valueEncoding"] = value_encoding
+   if quantization:
+      store.config["quantization"] = quantization
+   else:
+      store.config.pop("quantization", None)
+   store.value_encoding = value_encoding
+   store.quantization = quantization or {}
+   store.standard_values = value_encoding == "list" and not quantization
+   store.write_config()
+   store.connections.close()
+   store.blob_cache.clear()
+   print(f"[CONVERT] complete; {total} zones in {len(packages)} packages", flush=True)
+   return total
+
+def migrate_package_keys(store: DGGSDataStore, pkg_path: str, int_keys: bool, text_ids: bool = False,
+   batch_size: int = 256) -> int:
+   # Copy the rows of a package into a new file keyed as package_key_columns(int_keys, text_ids),
+   # then replace the package with it
+   dggrs = store.dggrs
+   tmp_path = pkg_path + ".tmp"
+   if os.path.exists(tmp_path):
+      os.remove(tmp_path)
+   writer = PackageWriter(tmp_path, without_rowid=store.without_rowid, int_keys=int_keys, text_ids=text_ids)
+   src = sqlite3.connect(pkg_path)
+   cur = src.execute(f"SELECT {store.key_column}, data FROM zone_data")
+   count = 0
+   while True:
+      rows = cur.fetchmany(batch_size)
+      if not rows:
+         break
+      out = []
+      for key, blob in rows:
+         zone = zone_from_key(key) if store.int_keys else dggrs.getZoneFromTextID(key)
+         if not int_keys:
+            out.append((dggrs.getZoneTextID(zone), blob))
+         elif text_ids:
+            out.append((zone_key(zone), dggrs.getZoneTextID(zone), blob))
+         else:
+            out.append((zone_key(zone), blob))
+      count += writer.write(out)
+   src.close()
+   writer.close()
+   os.replace(tmp_path, pkg_path)
+   return count
+
+def migrate_store_version(store: DGGSDataStore, version: int, text_ids: bool = False, max_workers: int = 8) -> int:
+   # Rewrite all packages of a store for another storeVersion (see STORE_VERSIONS)
+   # and record it in collection.json. Returns the number of zones migrated.
+   if version not in STORE_VERSIONS:
+      print(f"Unsupported store version: {version!r} (expected one of {', '.join(map(str, STORE_VERSIONS))})", flush=True)
+      return 0
+   int_keys = version >= 2
+   text_ids = text_ids and int_keys
+   if version == store.store_version and text_ids == store.text_ids:
+      print(f"[MIGRATE] store is already version {version}", flush=True)
+      return 0
+   if store.mapped:
+      print("Mapped archives are keyed by zone ids only; repack the store to the tree or packed layout first", flush=True)
+      return 0
+
+   store.close_package_writers()
+   store.connections.close()
+   packages: List[str] = list(store.iter_package_files())
+   total = 0
+   with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(packages)))) as ex:
+      futures = { ex.submit(migrate_package_keys, store, pkg, int_keys, text_ids): pkg for pkg in packages }
+      for fut in as_completed(futures):
+         count = fut.result()
+         total += count
+         print(f"[MIGRATE] {futures[fut]}: {count} zones", flush=True)
+
+   if version == 1:
+      store.config.pop("storeVersion", None)
+   else:
+      store.config["storeVersion"] = version
+   if text_ids:
+      store.config["textIDs"] = True
+   else:
+      store.config.pop("textIDs", None)
+   store.store_version = version
+   store.int_keys = int_keys
+   store.text_ids = text_ids
+   store.key_column = package_key_columns(int_keys)[0]
+   store.write_config()
+   store.connections.close()
+   print(f"[MIGRATE] complete; {total} zones in {len(packages)} packages now stored as version {version}", flush=True)
+   return total
+
+def _remove_empty_dirs(root: str) -> None:
+   for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+      if dirpath != root and not os.listdir(dirpath):
+         os.rmdir(dirpath)
+
+def _repack_blobs(store: DGGSDataStore, layout: str, batch_size: int = 256) -> int:
+   # Copy the stored blobs of all root zones into a store of the same collection using another layout,
+   # then remove the source files (used whenever the mapped layout is involved, as blob files and
+   # zone_data tables do not share rows)
+   sources = [] if store.mapped else list(store.iter_package_files())
+   target = DGGSDataStore(store.data_root, store.collection, config=dict(store.config, layout=layout))
+   total = 0
+
+   def flush(rows):
+      by_file: Dict[str, List[Tuple[Any, ...]]] = {}
+      for zone_id, blob in rows:
+         zone = DGGRSZone(zone_id)
+         pkg_file = target.package_file(target.compute_package_path_for_root_zone(zone))
+         by_file.setdefault(pkg_file, []).append(target._row_keys(zone) + (target._stored_blob(blob),))
+      return sum(target.package_writer(f).write(r) for f, r in by_file.items())
+
+   rows = []
+   for zone_id, blob in store.iter_zone_blobs():
+      rows.append((zone_id, blob))
+      if len(rows) >= batch_size:
+         total += flush(rows)
+         rows = []
+   total += flush(rows)
+   target.mapped_written = target.mapped
+   target.close()
+
+   store.close_package_writers()
+   store.connections.close()
+   if store.mapped:
+      sources = [os.path.join(store.collection_dir, n) for n in (MAPPED_BLOBS, MAPPED_INDEX)]
+   for path in sources:
+      if os.path.exists(path):
+         os.remove(path)
+   _remove_empty_dirs(store.collection_dir)
+   print(f"[REPACK] moved {total} zones from the {store.layout} layout to the {layout} layout", flush=True)
+   return total
+
+def repack_store(store: DGGSDataStore, layout: str, batch_size: int = 256) -> int:
+   # Move all packages of a store to another layout (see PACKAGE_LAYOUTS)
+   # and record it in collection.json. Returns the number of zones moved.
+   if layout not in PACKAGE_LAYOUTS:
+      print(f"Unsupported layout: {layout!r} (expected one of {', '.join(PACKAGE_LAYOUTS)})", flush=True)
+      return 0
+   if layout == store.layout:
+      print(f"[REPACK] store already uses the {layout} layout", flush=True)
+      return 0
+
+   store.close_package_writers()
+   store.connections.close()
+   columns = ", ".join(package_key_columns(store.int_keys, store.text_ids) + ["data"])
+   total = 0
+   if layout == "mapped" or store.mapped:
+      total = _repack_blobs(store, layout, batch_size)
+   elif layout == "packed":
+      sources = [p for p in store.iter_tree_package_files() if p != store.archive_path]
+      tmp_path = store.archive_path + ".tmp"
+      if os.path.exists(tmp_path):
+         os.remove(tmp_path)
+      writer = PackageWriter(tmp_path, without_rowid=store.without_rowid, int_keys=store.int_keys, text_ids=store.text_ids)
+      for pkg in sources:
+         src = sqlite3.connect(pkg)
+         cur = src.execute(f"SELECT {columns} FROM zone_data")
+         while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+               break
+            total += writer.write(rows)
+         src.close()
+      writer.close()
+      os.replace(tmp_path, store.archive_path)
+      for pkg in sources:
+         os.remove(pkg)
+      _remove_empty_dirs(store.collection_dir)
+      print(f"[REPACK] packed {total} zones from {len(sources)} packages into {store.archive_path}", flush=True)
+   else:
+      dggrs = store.dggrs
+      archive_path = store.archive_path
+      store.set_layout(layout)
+      src = sqlite3.connect(archive_path)
+      cur = src.execute(f"SELECT {columns} FROM zone_data")
+      while True:
+         rows = cur.fetchmany(batch_size)
+         if not rows:
+            break
+         by_package: Dict[str, List[Tuple[Any, ...]]] = {}
+         for row in rows:
+            zone = DGGRSZone(zone_from_key(row[0])) if store.int_keys else dggrs.getZoneFromTextID(row[0])
+            by_package.setdefault(store.compute_package_path_for_root_zone(zone), []).append(row)
+         for pkg, pkg_rows in by_package.items():
+            total += store.package_writer(pkg).write(pkg_rows)
+      src.close()
+      store.close_package_writers()
+      os.remove(archive_path)
+      print(f"[REPACK] unpacked {total} zones into package files", flush=True)
+
+   if layout == "tree":
+      store.config.pop("layout", None)
+   else:
+      store.config["layout"] = layout
+   store.set_layout(layout)
+   store.write_config()
+   store.connections.close()
+   return total
+
+def _with_extra_depths(store: DGGSDataStore, zone: DGGRSZone, depths: List[int], drop: List[int]) -> Optional[Dict[str, Any]]:
+   # Decoded blob of a root zone without its entries at `drop` depths, plus freshly assembled ones at `depths`
+   pkg = store.compute_package_path_for_root_zone(zone)
+   decoded = store.read_and_decode_zone_blob(pkg, zone) if pkg else None
+   if not decoded:
+      return None
+   values = { fname: [e for e in entries if int(e["depth"]) not in drop]
+      for fname, entries in decoded.get("values", {}).items() }
+   for d in depths:
+      assembled = assemble_zone_at_depth(store, zone, d)
+      for fname, entries in (assembled or {}).items():
+         values.setdefault(fname, []).extend(entries)
+   for entries in values.values():
+      entries.sort(key=lambda e: int(e["depth"]))
+   out = dict(decoded)
+   out["values"] = values
+   out["depths"] = sorted({ int(e["depth"]) for entries in values.values() for e in entries })
+   return out
+
+def materialize_extra_depths(store: DGGSDataStore, depths: List[int], max_workers: int = 8) -> int:
+   # Assemble the values of every root zone at additional depths (see assemble_zone_at_depth()), store them
+   # in the zone's own blob next to the native depth and record them as "extraDepths" in collection.json,
+   # so that these depths are served without reading other packages. An empty list removes extra depths.
+   # Returns the number of zones rewritten.
+   if store.is_vector:
+      print("Extra depths only apply to raster collections", flush=True)
+      return 0
+   depths = sorted({ int(d) for d in depths if int(d) != store.depth and int(d) >= 0 })
+   removed = [d for d in store.extra_depths if d not in depths]
+   rewrite = depths + removed
+   if not rewrite:
+      return 0
+
+   # assemble from the native depth only, also for depths stored by a previous run
+   store.extra_depths = []
+   total = 0
+   for level in range(0, store.maxRefinementLevel - store.depth + 1):
+      zones = store.list_zones_with_data_at_level(level)
+      by_package: Dict[str, List[DGGRSZone]] = {}
+      for zone, pkg in zip(zones, store.compute_package_paths(zones)):
+         if pkg:
+            by_package.setdefault(pkg, []).append(zone)
+      # packages are rewritten one at a time, after all their zones were assembled
+      # (assembling reads other packages, which must not be written to meanwhile)
+      for pkg, pkg_zones in by_package.items():
+         with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pkg_zones)))) as ex:
+            objs = list(ex.map(lambda z: _with_extra_depths(store, z, depths, rewrite), pkg_zones))
+         entries = { z: obj for z, obj in zip(pkg_zones, objs) if obj is not None }
+         store.write_zone_batch(None, entries, pkg_path=pkg)
+         store.close_package_writers(pkg)
+         total += len(entries)
+      if zones:
+         print(f"[DEPTHS] level {level}: {len(zones)} zones with depths {depths}", flush=True)
+
+   if depths:
+      store.config["extraDepths"] = depths
+   else:
+      store.config.pop("extraDepths", None)
+   store.extra_depths = depths
+   store.write_config()
+   store.close()
+   print(f"[DEPTHS] complete; {total} zones rewritten", flush=True)
+   return total
+
+def build_overview(store: DGGSDataStore, max_workers: int = 8) -> int:
+   # Aggregate the level-0 roots onto every zone of the global levels coarser than their native depth
+   # and store the values as the collection's global overview (see GlobalOverview),
+   # from which assemble_aggregate_from_level0() serves world-scale requests.
+   # Returns the number of overview zones.
+   if store.is_vector:
+      print("Global overviews only apply to raster collections", flush=True)
+      return 0
+   dggrs = store.dggrs
+   fields = list(store.fields)
+   level0 = list(store._iter_lvl0_seeds())
+   levels = list(range(min(store.depth, store.maxRefinementLevel + 1)))
+   if not fields or not level0 or not levels:
+      return 0
+
+   # every level-0 zone aggregated from all level-0 roots, so that zones straddling several are complete
+   tasks = [ (z0, level) for level in levels for z0 in level0 ]
+   with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as ex:
+      results = list(ex.map(lambda t: _aggregate_stored_roots(store, t[0], t[1], level0, store.depth, fields), tasks))
+
+   overview: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+   for level in levels:
+      ids_parts, value_parts = [], []
+      for (z0, l), values in zip(tasks, results):
+         if l != level:
+            continue
+         ids_parts.append(sub_zone_index(dggrs, z0, level).zones)
+         value_parts.append(np.array([ [ np.nan if v is None else v for v in values[f][0]["data"] ] for f in fields ],
+            dtype=np.float64).reshape(len(fields), -1))
+      ids = np.concatenate(ids_parts)
+      # zones shared by several level-0 zones are kept once
+      ids, first = np.unique(ids, return_index=True)
+      overview[level] = (ids, np.concatenate(value_parts, axis=1)[:, first])
+      print(f"[OVERVIEW] level {level}: {ids.size} zones", flush=True)
+
+   store.overview.write(fields, overview)
+   return sum(ids.size for ids, _ in overview.values())
+
+def _descendants_painted_from(store: DGGSDataStore, sources: List[DGGRSZone], depths: List[int]) -> List[DGGRSZone]:
+   # Stored root zones below `sources` whose extra depths coarser than the native depth are assembled from one of them:
+   # painted from their ancestors store.depth - d levels up (see _assemble_from_ancestors()) or, for zones less than
+   # store.depth - d levels below level 0, taken from the global overview of their level-0 ancestors
+   dggrs = store.dggrs
+   nested: bool = dggrs.getMaxNeighbors() != 6
+   offsets = sorted({ store.depth - d for d in depths if d < store.depth })
+   if not offsets:
+      return []
+   max_root_level = store.maxRefinementLevel - store.depth
+   children = np.empty(dggrs.getMaxChildren(), dtype=np.uint64)
+   out: set = set()
+   for source in sources:
+      source_level = dggrs.getZoneLevel(source)
+      wanted = set(offsets)
+      if source_level == 0:
+         wanted.update(range(1, offsets[-1]))
+      frontier = { int(source) }
+      for k in range(1, max(wanted) + 1):
+         if source_level + k > max_root_level or not frontier:
+            break
+         below = set()
+         for z in frontier:
+            below.update(children[:dggrs.getZoneChildrenInto(DGGRSZone(z), children)].tolist())
+         frontier = below
+         if k not in wanted:
+            continue
+         for z in frontier:
+            if z in out or not store.has_zone(DGGRSZone(z)):
+               continue
+            # children of non-nested DGGRSs include zones only partly overlapping their parent
+            if not nested and int(source) not in [int(a) for a in collect_ancestors_at_level(dggrs, DGGRSZone(z), source_level)]:
+               continue
+            out.add(z)
+   return [DGGRSZone(z) for z in sorted(out)]
+
+def rebuild_ancestors(store: DGGSDataStore, zones: Optional[List[Any]] = None, max_workers: int = 8) -> int:
+   # Re-aggregate (see aggregate_from_children()) the ancestors of changed root zones, level by level up to level 0,
+   # so that updating part of a collection costs in proportion to the change.
+   # zones: the changed roots, by default those recorded as dirty by write_zone_batch(mark_dirty=True)
+   # (the tracker is then cleared). Returns the number of ancestors rewritten.
+   if store.is_vector:
+      print("Incremental rebuild of ancestors only applies to raster collections", flush=True)
+      return 0
+   dggrs = store.dggrs
+   from_tracker = zones is None
+   if from_tracker:
+      zones = store.dirty.zones().tolist()
+   pending: Dict[int, set] = {}
+   for z in zones:
+      pending.setdefault(dggrs.getZoneLevel(DGGRSZone(int(z))), set()).add(int(z))
+   dggrs_uri = f"[ogc-dggrs:{store.config['dggrs']}]"
+   total = 0
+   rewritten: List[DGGRSZone] = []
+
+   level = max(pending.keys(), default=0)
+   while level > 0:
+      changed = pending.pop(level, set())
+      level -= 1
+      parents = pending.setdefault(level, set())
+      if changed:
+         ids = np.fromiter(changed, dtype=np.uint64, count=len(changed))
+         zone_parents = np.empty((ids.size, dggrs.getMaxParents()), dtype=np.uint64)
+         dggrs.getZonesParentsInto(ids, zone_parents)
+         parents.update(zone_parents[zone_parents != nullZone].tolist())
+      if not parents:
+         continue
+
+      targets = sorted(parents)
+      fields = store.fields
+      with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as ex:
+         results = list(ex.map(lambda p: aggregate_from_children(store, DGGRSZone(p), store.depth, fields), targets))
+      by_package: Dict[str, Dict[DGGRSZone, Any]] = {}
+      for p, pkg, values in zip(targets, store.compute_package_paths([DGGRSZone(p) for p in targets]), results):
+         if pkg and values:
+            zone = DGGRSZone(p)
+            by_package.setdefault(pkg, {})[zone] = make_dggs_json_blob(dggrs_uri, dggrs.getZoneTextID(zone), values)
+            rewritten.append(zone)
+      for pkg, entries in by_package.items():
+         store.write_zone_batch(None, entries, pkg_path=pkg)
+         total += len(entries)
+      # the next level up is aggregated from what was just written
+      store.close()
+      print(f"[PYRAMID] level {level}: {len(targets)} ancestors re-aggregated", flush=True)
+
+   if from_tracker:
+      store.dirty.clear()
+   store.close()
+   # the overview is rebuilt first, as extra depths coarser than the lowest root levels are assembled from it
+   if total and store.overview.exists():
+      build_overview(store, max_workers=max_workers)
+
+   # Materialized extra depths of the changed roots, of their ancestors and of the descendants
+   # whose coarser depths are painted from either are assembled again
+   depths = store.extra_depths
+   if depths:
+      sources = [DGGRSZone(int(z)) for z in zones] + rewritten
+      zones = sorted({ int(z) for z in sources } | { int(z) for z in _descendants_painted_from(store, sources, depths) })
+      zones = [DGGRSZone(z) for z in zones]
+      # assembled from the native depth, not from the extra depths stored so far
+      store.extra_depths = []
+      try:
+         with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(zones)))) as ex:
+            results = list(ex.map(lambda z: _with_extra_depths(store, z, depths, depths), zones))
+      finally:
+         store.extra_depths = depths
+      by_package = {}
+      for zone, pkg, decoded in zip(zones, store.compute_package_paths(zones), results):
+         if pkg and decoded:
+            by_package.setdefault(pkg, {})[zone] = decoded
+      for pkg, entries in by_package.items():
+         store.write_zone_batch(None, entries, pkg_path=pkg)
+      store.close()
+      print(f"[PYRAMID] extra depths {depths} assembled again for {len(zones)} zones", flush=True)
+   return total
@@ -7,9 +7,14 @@ import gzip
 import threading
 import logging
 import array
-from typing import Any, Dict, List, Optional, Tuple, Iterable, Iterator, Mapping, Sequence
+import mmap
+import shutil
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple, Iterable, Iterator, Mapping, Sequence
 from types import MethodType
 import ubjson
+import numpy as np
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
@@ -17,6 +22,10 @@ try:
 except(ImportError):
    from typing_extensions import TypedDict
 
+from .ubjsonView import loadb_view
+
+ffi = dggal.ffi
+
 DGGS_JSON_SCHEMA_URI = "https://schemas.opengis.net/ogcapi/dggs/1.0/core/schemas/dggs-json/dggs-json.json"
 
 # --- types ---
@@ -49,6 +58,168 @@ def to_blob(obj: Any, compress: bool = True) -> bytes:
    ub = ubjson.dumpb(obj)
    return gzip.compress(ub) if compress else ub
 
+# --- value encodings ---
+# Depth entries are stored either as DGGS-JSON lists of numbers / None ("list", the default),
+# or as a typed contiguous little-endian array in "data" (a UBJSON uint8 array) described by
+# "dataType", with NaN (floating-point types) or the "noData" sentinel (integer types) for missing
+# values, and optionally a "validity" bitmap (1 bit per value, little bit order, 1 = valid).
+# The encoding of a store is selected by "valueEncoding" in collection.json.
+# Integer arrays may additionally be quantized, with "scale" and "offset" members in the entry
+# (value = stored * scale + offset), as selected per field by "quantization" in collection.json:
+#   "quantization": { "Elevation": { "dataType": "int16", "scale": 1.0, "offset": -43000.0 } }
+VALUE_DATA_TYPES: Dict[str, str] = {
+   "float32": "<f4",
+   "float64": "<f8",
+   "int8": "i1",
+   "int16": "<i2",
+   "int32": "<i4"
+}
+VALUE_ENCODINGS = ["list"] + list(VALUE_DATA_TYPES.keys())
+QUANTIZED_DATA_TYPES = ["int8", "int16", "int32"]
+_ENCODING_KEYS = ("data", "dataType", "noData", "validity", "scale", "offset")
+
+# Per-field methods for aggregating finer sub-zone values ("aggregation" in collection.json, mean by default)
+# - mean, sum, stddev: weighted by the sub-zone weights of hexagonal DGGRSs
+# - mode: value with the largest total weight (for categorical fields)
+# - nearest: value of the sub-zone with the largest weight (e.g., the centroid child)
+AGGREGATION_METHODS = ["mean", "sum", "min", "max", "mode", "count", "stddev", "nearest"]
+
+def values_to_array(data: Any) -> np.ndarray:
+   # Field values (list with None, or array with NaN) as a float64 array with NaN for missing values
+   if isinstance(data, np.ndarray):
+      return data.astype(np.float64, copy=False)
+   return np.array([np.nan if v is None else v for v in data], dtype=np.float64)
+
+def encode_depth_data(data: Any, data_type: str, scale: Optional[float] = None, offset: Optional[float] = None) -> Dict[str, Any]:
+   # Returns the entry members storing `data` as a typed array of `data_type`,
+   # quantized as (value - offset) / scale for integer types if scale or offset is specified
+   dt = np.dtype(VALUE_DATA_TYPES[data_type])
+   values = values_to_array(data)
+   if dt.kind == "f":
+      return { "dataType": data_type, "data": values.astype(dt).tobytes() }
+   info = np.iinfo(dt)
+   missing = np.isnan(values)
+   members: Dict[str, Any] = { "dataType": data_type, "noData": int(info.min) }
+   if scale is not None or offset is not None:
+      scale = 1.0 if not scale else float(scale)
+      offset = 0.0 if offset is None else float(offset)
+      values = (values - offset) / scale
+      members["scale"] = scale
+      members["offset"] = offset
+   stored = np.clip(np.rint(np.where(missing, 0, values)), info.min + 1, info.max).astype(dt)
+   stored[missing] = info.min
+   members["data"] = stored.tobytes()
+   return members
+
+def quantization_for_range(vmin: float, vmax: float, data_type: Optional[str] = None,
+   precision: Optional[float] = None) -> Dict[str, Any]:
+   # Quantization parameters ({ "dataType", "scale", "offset" }) covering [vmin, vmax].
+   # With a precision (the quantization step), the smallest integer type fitting the range is chosen
+   # unless data_type is specified, and the offset is aligned to a multiple of the step so that values
+   # which are multiples of the precision (e.g., integer elevations with precision 1) are kept exactly.
+   # Without a precision, the range is spread over all values of data_type (default int16).
+   span = max(0.0, float(vmax) - float(vmin))
+   # steps of the precision between the aligned offset and vmax (the alignment adds up to one step to the span)
+   steps = max(0.0, float(np.ceil(float(vmax) / precision) - np.floor(float(vmin) / precision))) if precision else 0.0
+   if data_type is None and precision:
+      data_type = next((t for t in QUANTIZED_DATA_TYPES
+         if steps <= np.iinfo(VALUE_DATA_TYPES[t]).max - np.iinfo(VALUE_DATA_TYPES[t]).min - 1), "int32")
+   elif data_type is None:
+      data_type = "int16"
+   info = np.iinfo(VALUE_DATA_TYPES[data_type])
+   levels = int(info.max) - int(info.min) - 1   # info.min is reserved for noData
+   if precision and steps <= levels:
+      scale = float(precision)
+      offset = (np.floor(vmin / scale) - (info.min + 1)) * scale
+   else:
+      if precision:
+         print(f"[QUANTIZE] precision {precision} cannot cover range [{vmin}, {vmax}] as {data_type}; using full {data_type} range", flush=True)
+      scale = span / levels if span > 0 else 1.0
+      offset = vmin - (info.min + 1) * scale
+   return { "dataType": data_type, "scale": scale, "offset": float(offset) }
+
+def depth_entry_array(entry: Mapping[str, Any]) -> np.ndarray:
+   # Field values of a depth entry as a float array with NaN for missing values.
+   # Float typed arrays are returned as read-only views over the stored bytes.
+   data = entry["data"]
+   data_type = entry.get("dataType")
+   if data_type is None:
+      return values_to_array(data)
+   stored = np.frombuffer(data, dtype=VALUE_DATA_TYPES[data_type])
+   if stored.dtype.kind == "f":
+      values = stored
+   else:
+      values = stored.astype(np.float64)
+      scale = entry.get("scale")
+      offset = entry.get("offset")
+      if scale is not None:
+         values *= scale
+      if offset is not None:
+         values += offset
+      nodata = entry.get("noData")
+      if nodata is not None:
+         values[stored == nodata] = np.nan
+   validity = entry.get("validity")
+   if validity is not None:
+      valid = np.unpackbits(np.frombuffer(validity, dtype=np.uint8), count=len(stored), bitorder="little").astype(bool)
+      values = np.where(valid, values, np.nan)
+   return values
+
+def depth_entry_list(entry: Mapping[str, Any]) -> List[Optional[float]]:
+   # Field values of a depth entry as a DGGS-JSON list with None for missing values
+   data = entry["data"]
+   if entry.get("dataType") is None and not isinstance(data, np.ndarray):
+      return data
+   return [None if v != v else v for v in depth_entry_array(entry).tolist()]
+
+def encode_depth_entry(entry: Mapping[str, Any], value_encoding: str,
+   quantization: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+   out = { k: v for k, v in entry.items() if k not in _ENCODING_KEYS }
+   if quantization is not None:
+      out.update(encode_depth_data(depth_entry_array(entry), quantization["dataType"],
+         quantization.get("scale"), quantization.get("offset")))
+   elif value_encoding == "list":
+      out["data"] = depth_entry_list(entry)
+   else:
+      out.update(encode_depth_data(depth_entry_array(entry), value_encoding))
+   return out
+
+def _is_standard_entry(entry: Mapping[str, Any]) -> bool:
+   return entry.get("dataType") is None and not isinstance(entry.get("data"), np.ndarray)
+
+def encode_dggs_json_values(obj: Any, value_encoding: str,
+   quantization: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Any:
+   # Returns `obj` with its depth entries stored using `value_encoding`, or quantized for fields
+   # listed in `quantization` (a copy unless nothing changes)
+   values = obj.get("values") if isinstance(obj, dict) else None
+   if not isinstance(values, dict):
+      return obj
+   if not quantization:
+      quantization = {}
+   if value_encoding == "list" and not quantization and all(_is_standard_entry(e) for entries in values.values() for e in entries):
+      return obj
+   out = dict(obj)
+   out["values"] = { fname: [ encode_depth_entry(e, value_encoding, quantization.get(fname)) for e in entries ]
+      for fname, entries in values.items() }
+   return out
+
+def standard_dggs_json(obj: Any) -> Any:
+   # DGGS-JSON with plain lists of values, as returned to clients
+   return encode_dggs_json_values(obj, "list")
+
+def depth_values(obj: Any, depth: int, standard: bool = True) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+   # ValuesObject of the entries of a decoded blob at one depth (None if there are none),
+   # with plain lists of values unless `standard` is False
+   values = obj.get("values") if isinstance(obj, dict) else None
+   if not isinstance(values, dict):
+      return None
+   out = {}
+   for fname, entries in values.items():
+      selected = [e for e in entries if int(e["depth"]) == depth]
+      if selected:
+         out[fname] = [encode_depth_entry(e, "list") for e in selected] if standard else selected
+   return out or None
+
 
 logger = logging.getLogger("dggsStore")
 
@@ -205,7 +376,7 @@ def get_or_create_dggrs(dggrsID: str) -> DGGRS:
             dggrs.getZonePrimaryChildren = MethodType(getZonePrimaryChildren7H, dggrs)
             dggrs.getZonePrimaryParent = MethodType(getZonePrimaryParent0, dggrs)
             dggrs.getSubZoneWeights = MethodType(getSubZoneWeights7H, dggrs)
-            dggrs.getChidlrenWeights = MethodType(getChildrenWeights7H, dggrs)
+            dggrs.getChildrenWeights = MethodType(getChildrenWeights7H, dggrs)
       else:
          # Fully nested DGGRS
          dggrs.getZonePrimaryChildren = dggrs.getZoneChildren
@@ -216,48 +387,832 @@ def get_or_create_dggrs(dggrsID: str) -> DGGRS:
       dggrs_cache[key] = dggrs
       return dggrs
 
-def ensure_package_table(path: str) -> None:
+# --- package formats ---
+# storeVersion 1: zone_data(root_zone_id TEXT PRIMARY KEY, data BLOB) keyed by textual zone identifiers
+# storeVersion 2: zone_data(zone_id INTEGER PRIMARY KEY, data BLOB[, root_zone_id TEXT]) keyed by the 64-bit
+#   DGGRSZone stored as the signed integer with the same bits (SQLite integers are signed),
+#   keeping the textual identifier only when "textIDs" is set in collection.json.
+# Collections without "storeVersion" are version 1; importers create version STORE_VERSION.
+STORE_VERSIONS = [1, 2]
+STORE_VERSION = 2
+
+# Package layouts ("layout" in collection.json):
+# - "tree" (default): one <base>_L<n>.sqlite file per package in a directory tree of group base ancestors
+# - "packed": all packages of a collection in a single PACKED_ARCHIVE file with the same zone_data table;
+#   package paths remain logical names for the groups of root zones, all mapped to that file
+# - "mapped": uncompressed blobs of all packages appended to a MAPPED_BLOBS file indexed by MAPPED_INDEX,
+#   read through a memory map and returned as memoryview slices (see MappedBlobArchive)
+PACKAGE_LAYOUTS = ["tree", "packed", "mapped"]
+PACKED_ARCHIVE = "packages.sqlite"
+MAPPED_BLOBS = "blobs.ubj"
+MAPPED_INDEX = "blobs.idx"
+
+def zone_key(zone: Any) -> int:
+   z = int(zone)
+   return z - (1 << 64) if z >= (1 << 63) else z
+
+def zone_from_key(key: int) -> int:
+   return key + (1 << 64) if key < 0 else key
+
+def package_key_columns(int_keys: bool = False, text_ids: bool = False) -> List[str]:
+   # Columns identifying the zone of a zone_data row, the first one being the primary key
+   if not int_keys:
+      return ["root_zone_id"]
+   return ["zone_id", "root_zone_id"] if text_ids else ["zone_id"]
+
+def create_package_table(conn: sqlite3.Connection, without_rowid: bool = False,
+   int_keys: bool = False, text_ids: bool = False) -> None:
+   # WITHOUT ROWID stores rows in the primary key b-tree, saving the rowid lookup,
+   # but is only worthwhile when blobs are small relative to the page size
+   # (integer keys are already the rowid, so it does not apply to them)
+   if int_keys:
+      text_column = ", root_zone_id TEXT" if text_ids else ""
+      conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS zone_data(
+          zone_id INTEGER PRIMARY KEY,
+          data BLOB NOT NULL{text_column}
+        )""")
+   else:
+      conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS zone_data(
+          root_zone_id TEXT PRIMARY KEY,
+          data BLOB NOT NULL
+        ){" WITHOUT ROWID" if without_rowid else ""}""")
+   conn.commit()
+
+def ensure_package_table(path: str, without_rowid: bool = False, int_keys: bool = False, text_ids: bool = False) -> None:
    os.makedirs(os.path.dirname(path), exist_ok=True)
    conn = sqlite3.connect(path)
    conn.execute("PRAGMA synchronous=OFF")
-   cur = conn.cursor()
-   cur.execute("""
-     CREATE TABLE IF NOT EXISTS zone_data(
-       root_zone_id TEXT PRIMARY KEY,
-       data BLOB NOT NULL
-     )""")
-   conn.commit()
+   create_package_table(conn, without_rowid, int_keys, text_ids)
    conn.close()
 
 def write_sqlite_two_col(path: str, entries: List[Tuple[str, bytes]]) -> int:
-   ensure_package_table(path)
-   conn = sqlite3.connect(path)
-   conn.execute("PRAGMA synchronous=OFF")
-   cur = conn.cursor()
-   for zid, blob in entries:
-      cur.execute("INSERT OR REPLACE INTO zone_data(root_zone_id, data) VALUES(?,?)", (zid, blob))
-   conn.commit()
-   conn.close()
-   return len(entries)
+   writer = PackageWriter(path, exclusive=False)
+   written = writer.write(entries)
+   writer.close()
+   return written
+
+# Package file kept open for writing across batches (e.g., for the lifetime of an import pass over a package).
+# - Each write() inserts its rows with executemany() in a single transaction.
+# - With exclusive=True, the file lock is held until close(), avoiding lock / schema re-reads per batch.
+#   Readers from the PackageConnectionPool open packages with immutable=1 and take no locks,
+#   so a package must not be read while it is being written to.
+# - Packages written while other processes read them (e.g., aggregation workers reading finer levels during an import)
+#   are written with exclusive=False and read by stores created with shared_access=True, whose connections take
+#   (and wait for) the usual SQLite locks. A rollback journal rather than WAL is used either way, so that every commit
+#   lands in the package file itself and immutable readers see complete packages once their writers are closed.
+# - Rows are (key columns..., data) tuples, the key columns being package_key_columns(int_keys, text_ids).
+class PackageWriter:
+   def __init__(self, path: str, without_rowid: bool = False, exclusive: bool = True, journal_mode: str = "TRUNCATE",
+      int_keys: bool = False, text_ids: bool = False):
+      self.path = path
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      self.conn = sqlite3.connect(path, check_same_thread=False, timeout=60)
+      self.conn.execute("PRAGMA synchronous=OFF")
+      self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+      if exclusive:
+         self.conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+      create_package_table(self.conn, without_rowid, int_keys, text_ids)
+      columns = package_key_columns(int_keys, text_ids) + ["data"]
+      existing = [r[1] for r in self.conn.execute("PRAGMA table_info(zone_data)").fetchall()]
+      if existing[0] != columns[0] or any(c not in existing for c in columns):
+         self.conn.close()
+         raise ValueError(f"Package {path!r} has columns {existing}, expected {columns} (see dgg-convert --store-version)")
+      self.insert_sql = f"INSERT OR REPLACE INTO zone_data({', '.join(columns)}) VALUES({','.join('?' for _ in columns)})"
+      self.lock = threading.Lock()
+      self.rows_written = 0
+
+   def write(self, entries: Sequence[Tuple[Any, ...]]) -> int:
+      if not entries:
+         return 0
+      with self.lock:
+         with self.conn:   # one transaction, committed on exit
+            self.conn.executemany(self.insert_sql, entries)
+         self.rows_written += len(entries)
+      return len(entries)
+
+   def close(self) -> None:
+      with self.lock:
+         if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+def open_package_readonly(pkg_path: str, immutable: bool = True) -> sqlite3.Connection:
+   # immutable: no locks are taken (the package must not be written to while the connection is used)
+   if immutable:
+      return sqlite3.connect(f"file:{os.path.abspath(pkg_path)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+   return sqlite3.connect(f"file:{os.path.abspath(pkg_path)}?mode=ro", uri=True, check_same_thread=False, timeout=60)
+
+def _select_root_ids(conn: sqlite3.Connection, limit: Optional[int] = None, key_column: str = "root_zone_id") -> List[Any]:
+   if limit is None:
+      cur = conn.execute(f"SELECT {key_column} FROM zone_data")
+   else:
+      cur = conn.execute(f"SELECT {key_column} FROM zone_data LIMIT ?", (limit,))
+   return [r[0] for r in cur.fetchall() if r[0] is not None]
 
 def read_package_root_ids_from_sqlite(pkg_path: str, limit: Optional[int] = None) -> List[str]:
    if not pkg_path or not os.path.exists(pkg_path):
       return []
-   conn = sqlite3.connect(f"file:{os.path.abspath(pkg_path)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
-   conn.row_factory = sqlite3.Row
-   if limit is None:
-      cur = conn.execute("SELECT root_zone_id FROM zone_data")
-   else:
-      cur = conn.execute("SELECT root_zone_id FROM zone_data LIMIT ?", (limit,))
-   rows = cur.fetchall()
+   conn = open_package_readonly(pkg_path)
+   ids = _select_root_ids(conn, limit)
    conn.close()
-   return [r[0] for r in rows if r[0] is not None]
+   return ids
+
+# Pool of long-lived read-only connections to package files, keyed by package path.
+# - A connection is checked out by a single thread at a time and returned to the pool afterwards;
+#   connections are opened with check_same_thread=False so that the next request thread
+#   (Flask threaded=True spawns one per request) can pick up an idle handle.
+# - At most max_idle idle handles are kept; the least recently used package handles are closed first.
+# - Packages are opened with immutable=1 (unless immutable=False, see PackageWriter), so each handle remembers
+#   the (mtime, size) of the file it was opened on and is discarded rather than reused if the package has since been rewritten.
+class PackageConnectionPool:
+   def __init__(self, max_idle: int = 64, immutable: bool = True):
+      self.max_idle = max_idle
+      self.immutable = immutable
+      self.lock = threading.Lock()
+      self.idle: "OrderedDict[str, List[Tuple[sqlite3.Connection, Tuple[int, int]]]]" = OrderedDict()
+      self.idle_count = 0
+
+   @contextmanager
+   def connection(self, pkg_path: str) -> Iterator[Optional[sqlite3.Connection]]:
+      # Yields None when the package does not exist
+      try:
+         st = os.stat(pkg_path)
+      except OSError:
+         yield None
+         return
+      signature = (st.st_mtime_ns, st.st_size)
+
+      conn = None
+      stale: List[sqlite3.Connection] = []
+      with self.lock:
+         handles = self.idle.get(pkg_path)
+         while handles:
+            c, c_signature = handles.pop()
+            self.idle_count -= 1
+            if c_signature == signature:
+               conn = c
+               break
+            stale.append(c)
+         if handles is not None and not handles:
+            del self.idle[pkg_path]
+      for c in stale:
+         c.close()
+
+      if conn is None:
+         conn = open_package_readonly(pkg_path, self.immutable)
+      try:
+         yield conn
+      finally:
+         self._release(pkg_path, conn, signature)
+
+   def _release(self, pkg_path: str, conn: sqlite3.Connection, signature: Tuple[int, int]) -> None:
+      evicted: List[sqlite3.Connection] = []
+      with self.lock:
+         handles = self.idle.get(pkg_path)
+         if handles is None:
+            handles = self.idle[pkg_path] = []
+         else:
+            self.idle.move_to_end(pkg_path)
+         handles.append((conn, signature))
+         self.idle_count += 1
+         while self.idle_count > self.max_idle:
+            lru_path, lru_handles = next(iter(self.idle.items()))
+            evicted.append(lru_handles.pop(0)[0])
+            self.idle_count -= 1
+            if not lru_handles:
+               del self.idle[lru_path]
+      for c in evicted:
+         c.close()
+
+   def invalidate(self, pkg_path: str) -> None:
+      # Close idle handles of a package which was just written to
+      with self.lock:
+         handles = self.idle.pop(pkg_path, None) or []
+         self.idle_count -= len(handles)
+      for c, _ in handles:
+         c.close()
+
+   def close(self) -> None:
+      with self.lock:
+         all_handles = [h for handles in self.idle.values() for h in handles]
+         self.idle.clear()
+         self.idle_count = 0
+      for c, _ in all_handles:
+         c.close()
+
+def approx_decoded_size(decoded: Any, raw_size: int) -> int:
+   # Rough in-memory footprint of a decoded DGGS-(UB)JSON object.
+   # For field values, the list slot (8 bytes) and the float object (24 bytes) dominate;
+   # for anything else (e.g., DGGS-JSON-FG features), assume a multiple of the UBJSON size.
+   values = decoded.get("values") if isinstance(decoded, dict) else None
+   if not isinstance(values, dict):
+      return 256 + 8 * raw_size
+   size = 256
+   for entries in values.values():
+      for e in entries:
+         data = e.get("data")
+         if data is None:
+            continue
+         if isinstance(data, (bytes, bytearray)):
+            nbytes = len(data)
+         else:
+            nbytes = getattr(data, "nbytes", None)
+         size += 128 + (nbytes if nbytes is not None else 32 * len(data))
+   return size
+
+# LRU cache of decoded zone blobs keyed by (collection directory, zone id), bounded by the approximate
+# size of the decoded objects rather than by entry count.
+# Each entry keeps the signature (e.g., package file (mtime, size)) it was decoded from, and is only returned
+# for the same signature, so that packages rewritten by other processes are not served stale.
+# Cached objects are shared between callers and must be treated as read-only.
+class DecodedBlobCache:
+   def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+      self.max_bytes = max_bytes
+      self.lock = threading.Lock()
+      self.entries: "OrderedDict[Tuple[str, int], Tuple[Any, int, Any]]" = OrderedDict()
+      self.size = 0
+      self.hits = 0
+      self.misses = 0
+      self.evictions = 0
+
+   def get(self, key: Tuple[str, int], signature: Any = None) -> Optional[Any]:
+      with self.lock:
+         entry = self.entries.get(key)
+         if entry is not None and entry[2] != signature:
+            del self.entries[key]
+            self.size -= entry[1]
+            entry = None
+         if entry is None:
+            self.misses += 1
+            return None
+         self.entries.move_to_end(key)
+         self.hits += 1
+         return entry[0]
+
+   def put(self, key: Tuple[str, int], decoded: Any, size: int, signature: Any = None) -> None:
+      if size > self.max_bytes:
+         return
+      with self.lock:
+         previous = self.entries.pop(key, None)
+         if previous is not None:
+            self.size -= previous[1]
+         self.entries[key] = (decoded, size, signature)
+         self.size += size
+         while self.size > self.max_bytes:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+   def discard(self, key: Tuple[str, int]) -> None:
+      with self.lock:
+         previous = self.entries.pop(key, None)
+         if previous is not None:
+            self.size -= previous[1]
+
+   def clear(self) -> None:
+      with self.lock:
+         self.entries.clear()
+         self.size = 0
+
+   def stats(self) -> Dict[str, int]:
+      with self.lock:
+         return {
+            "entries": len(self.entries), "bytes": self.size, "maxBytes": self.max_bytes,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions
+         }
+
+# Bounded, thread-safe least-recently-used memo (e.g., of values derived from zone ids)
+class LRUMemo:
+   def __init__(self, max_entries: int = 65536):
+      self.max_entries = max_entries
+      self.lock = threading.Lock()
+      self.entries: "OrderedDict[Any, Any]" = OrderedDict()
+
+   def get(self, key: Any) -> Any:
+      with self.lock:
+         value = self.entries.get(key)
+         if value is not None:
+            self.entries.move_to_end(key)
+         return value
+
+   def put(self, key: Any, value: Any) -> None:
+      with self.lock:
+         self.entries[key] = value
+         self.entries.move_to_end(key)
+         while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+   def clear(self) -> None:
+      with self.lock:
+         self.entries.clear()
+
+def zone_array(zones) -> np.ndarray:
+   # Copy of a DGGAL Array of DGGRSZone as a uint64 NumPy array
+   count = zones.count if zones is not None else 0
+   if not count:
+      return np.empty(0, dtype=np.uint64)
+   return np.frombuffer(ffi.buffer(ffi.cast("uint64_t *", zones.array), count * 8), dtype=np.uint64).copy()
+
+# Sub-zones of a root zone at a depth in getSubZones() order (the order of stored values),
+# with vectorized zone -> position lookups
+class SubZoneIndex:
+   def __init__(self, zones: np.ndarray, order: Optional[np.ndarray] = None, sorted: Optional[np.ndarray] = None):
+      # order and sorted: argsort of zones and zones in that order, if already known (see SubZoneTemplate)
+      self.zones = zones
+      self.order = np.argsort(zones) if order is None else order
+      self.sorted = zones[self.order] if sorted is None else sorted
+      self._mapping: Optional[Dict[int, int]] = None
+
+   def __len__(self) -> int:
+      return self.zones.size
+
+   def positions(self, zones: Any) -> np.ndarray:
+      # Positions of `zones` among the sub-zones, -1 for zones which are not sub-zones
+      zones = np.asarray(zones, dtype=np.uint64)
+      if not self.sorted.size:
+         return np.full(zones.shape, -1, dtype=np.intp)
+      pos = np.minimum(np.searchsorted(self.sorted, zones), self.sorted.size - 1)
+      return np.where(self.sorted[pos] == zones, self.order[pos], -1)
+
+   @property
+   def mapping(self) -> Dict[int, int]:
+      # zone id -> position dict, for scalar lookups in loops
+      if self._mapping is None:
+         self._mapping = dict(zip(self.zones.tolist(), range(self.zones.size)))
+      return self._mapping
+
+# Sub-zone indices keyed by (DGGRS, root zone, depth), e.g., for roots shared by neighbouring aggregation targets
+# or requested repeatedly (about 1.5 MiB each at depth 8 of a 4-refinement DGGRS)
+sub_zone_indices = LRUMemo(64)
+
+# Sub-zones at a depth relative to the first one, shared by all root zones of a DGGRS whose zone ids pack
+# (level, row, column) bit fields and whose sub-zones are the rows and columns of their parent's cell in row-major order
+# (the rhombic 4R and 9R DGGRSs and rHEALPix, where all zones are of a single shape class): the sub-zones of any root
+# are its first sub-zone plus the same offsets, in the same order.
+class SubZoneTemplate:
+   def __init__(self, zones: np.ndarray):
+      self.offsets = zones - zones[0]
+      self.order = np.argsort(self.offsets)
+      self.sorted_offsets = self.offsets[self.order]
+
+   def index(self, first: int) -> SubZoneIndex:
+      base = np.uint64(first)
+      return SubZoneIndex(self.offsets + base, self.order, self.sorted_offsets + base)
+
+row_major_dggrs_classes = (RhombicIcosahedral4R, RhombicIcosahedral9R, rHEALPix)
+
+# Templates keyed by (DGGRS class, depth)
+sub_zone_templates: Dict[Tuple[str, int], Optional[SubZoneTemplate]] = {}
+
+def _sub_zones(dggrs: DGGRS, zone: DGGRSZone, depth: int) -> np.ndarray:
+   zones = np.empty(dggrs.countSubZones(zone, depth), dtype=np.uint64)
+   return zones[:dggrs.getSubZonesInto(zone, depth, zones)]
+
+def sub_zone_index(dggrs: DGGRS, zone: DGGRSZone, depth: int) -> SubZoneIndex:
+   if isinstance(dggrs, row_major_dggrs_classes) and dggrs.getZoneLevel(zone) + depth <= dggrs.getMaxDGGRSZoneLevel():
+      tkey = (type(dggrs).__name__, depth)
+      template = sub_zone_templates.get(tkey)
+      if template is None and tkey not in sub_zone_templates:
+         zones = _sub_zones(dggrs, zone, depth)
+         # only used if consistent with getFirstSubZone() for the root it was built from
+         template = SubZoneTemplate(zones) if zones.size and int(zones[0]) == int(dggrs.getFirstSubZone(zone, depth)) else None
+         sub_zone_templates[tkey] = template
+      if template is not None:
+         return template.index(int(dggrs.getFirstSubZone(zone, depth)))
+
+   key = (type(dggrs).__name__, int(zone), depth)
+   index = sub_zone_indices.get(key)
+   if index is None:
+      index = SubZoneIndex(_sub_zones(dggrs, zone, depth))
+      sub_zone_indices.put(key, index)
+   return index
+
+# Per-collection index of the root zones stored at each level, kept alongside collection.json
+# as presence/L<level>.u64 files of little-endian uint64 zone ids.
+# - Writers append the ids of each committed batch; compact() rewrites appended levels sorted and unique.
+# - Readers load a level once (sorting it if it has unsorted appends) and reload it only if the file changed.
+# - The index is only authoritative once the presence directory exists: it is created empty for a new
+#   collection, or built from the packages of an existing one (see DGGSDataStore.ensure_presence_index()).
+class ZonePresenceIndex:
+   def __init__(self, collection_dir: str):
+      self.dir = os.path.join(collection_dir, "presence")
+      self.lock = threading.Lock()
+      self.levels: Dict[int, Tuple[np.ndarray, Tuple[int, int]]] = {}
+      self.appended: set = set()
+
+   def exists(self) -> bool:
+      return os.path.isdir(self.dir)
+
+   def _level_path(self, level: int, index_dir: Optional[str] = None) -> str:
+      return os.path.join(index_dir or self.dir, f"L{level}.u64")
+
+   def zones_at_level(self, level: int) -> np.ndarray:
+      # Sorted unique zone ids stored at this level (read-only; shared between callers)
+      path = self._level_path(level)
+      try:
+         st = os.stat(path)
+      except OSError:
+         return np.empty(0, dtype="<u8")
+      signature = (st.st_mtime_ns, st.st_size)
+      with self.lock:
+         cached = self.levels.get(level)
+         if cached is not None and cached[1] == signature:
+            return cached[0]
+      ids = np.fromfile(path, dtype="<u8")
+      if ids.size > 1 and not np.all(ids[1:] > ids[:-1]):
+         ids = np.unique(ids)
+      ids.flags.writeable = False
+      with self.lock:
+         self.levels[level] = (ids, signature)
+      return ids
+
+   def contains(self, level: int, zone_id: int) -> bool:
+      ids = self.zones_at_level(level)
+      i = int(np.searchsorted(ids, np.uint64(zone_id)))
+      return i < ids.size and int(ids[i]) == zone_id
+
+   def append(self, zones_by_level: Mapping[int, Sequence[int]]) -> None:
+      os.makedirs(self.dir, exist_ok=True)
+      with self.lock:
+         for level, ids in zones_by_level.items():
+            with open(self._level_path(level), "ab") as f:
+               f.write(np.asarray(ids, dtype="<u8").tobytes())
+            self.appended.add(level)
+
+   def write_level(self, level: int, ids: Any, index_dir: Optional[str] = None) -> None:
+      path = self._level_path(level, index_dir)
+      tmp = path + ".tmp"
+      np.unique(np.asarray(ids, dtype="<u8")).tofile(tmp)
+      os.replace(tmp, path)
+
+   def compact(self) -> None:
+      with self.lock:
+         levels, self.appended = self.appended, set()
+      for level in levels:
+         self.write_level(level, self.zones_at_level(level))
+
+# Serializes the (re)builds of presence indexes triggered by readers of a process (see ensure_presence_index())
+presence_build_lock = threading.Lock()
+
+# Root zones written since coarser levels were last aggregated from them, as a dirty.u64 file
+# of little-endian uint64 zone ids next to collection.json (see rebuild_ancestors())
+class DirtyZoneTracker:
+   def __init__(self, collection_dir: str):
+      self.path = os.path.join(collection_dir, "dirty.u64")
+      self.lock = threading.Lock()
+
+   def add(self, ids: Iterable[int]) -> None:
+      ids = np.fromiter((int(z) for z in ids), dtype="<u8")
+      if ids.size:
+         with self.lock, open(self.path, "ab") as f:
+            f.write(ids.tobytes())
+
+   def zones(self) -> np.ndarray:
+      try:
+         return np.unique(np.fromfile(self.path, dtype="<u8"))
+      except (FileNotFoundError, ValueError):
+         return np.empty(0, dtype="<u8")
+
+   def clear(self) -> None:
+      with self.lock:
+         try:
+            os.remove(self.path)
+         except FileNotFoundError:
+            pass
+
+# Progress of an import run (see dgg-import --resume): one JSON record per line, appended and synced to disk
+# once the batches of roots and whole packages it lists are written, removed when the import completes
+IMPORT_JOURNAL_FILE = "import.journal"
+
+class ImportJournal:
+   def __init__(self, collection_dir: str):
+      self.path = os.path.join(collection_dir, IMPORT_JOURNAL_FILE)
+      self.lock = threading.Lock()
+      self.params: Optional[Dict[str, Any]] = None
+      self.steps: Set[str] = set()
+      # (root level, base zone) of completed packages, and roots written (or found empty) in incomplete ones
+      self.packages: Set[Tuple[int, int]] = set()
+      self.roots: Set[int] = set()
+
+   def load(self) -> bool:
+      # False if there is no interrupted import; a truncated last record (interrupted append) is ignored
+      try:
+         with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+      except FileNotFoundError:
+         return False
+      for line in lines:
+         try:
+            rec = json.loads(line)
+         except ValueError:
+            continue
+         if "start" in rec:
+            self.params = rec["start"]
+         elif "step" in rec:
+            self.steps.add(rec["step"])
+         elif "package" in rec:
+            self.packages.add((rec["level"], rec["package"]))
+         elif "roots" in rec:
+            self.roots.update(rec["roots"])
+      return self.params is not None
+
+   def _append(self, rec: Dict[str, Any], mode: str = "a") -> None:
+      with self.lock, open(self.path, mode, encoding="utf-8") as f:
+         f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+         f.flush()
+         os.fsync(f.fileno())
+
+   def start(self, params: Dict[str, Any]) -> None:
+      # new journal for an import with these parameters (checked when resuming)
+      self.params, self.steps, self.packages, self.roots = params, set(), set(), set()
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      self._append({"start": params}, "w")
+
+   def step_done(self, step: str) -> None:
+      self.steps.add(step)
+      self._append({"step": step})
+
+   def batch_done(self, level: int, base_zone: DGGRSZone, zones: Iterable[DGGRSZone]) -> None:
+      self._append({"level": level, "base": int(base_zone), "roots": [int(z) for z in zones]})
+
+   def package_done(self, level: int, base_zone: DGGRSZone) -> None:
+      self._append({"level": level, "package": int(base_zone)})
+
+   def package_completed(self, level: int, base_zone: DGGRSZone) -> bool:
+      return (level, int(base_zone)) in self.packages
+
+   def clear(self) -> None:
+      with self.lock:
+         try:
+            os.remove(self.path)
+         except FileNotFoundError:
+            pass
+
+# Values of all zones of the global levels coarser than the native depth of level-0 roots, precomputed per collection
+# (see build_overview()) so that world-scale requests are not aggregated from level-0 roots
+OVERVIEW_FILE = "overview.npz"
+
+class GlobalOverview:
+   def __init__(self, collection_dir: str):
+      self.path = os.path.join(collection_dir, OVERVIEW_FILE)
+      self.lock = threading.Lock()
+      self.mtime: Optional[int] = None
+      self.fields: List[str] = []
+      # level -> (sorted zone ids, values as a fields x zones array)
+      self.levels: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+   def _load(self) -> Tuple[List[str], Dict[int, Tuple[np.ndarray, np.ndarray]]]:
+      # (Re)loaded when the file changes
+      try:
+         mtime = os.stat(self.path).st_mtime_ns
+      except OSError:
+         mtime = None
+      with self.lock:
+         if mtime != self.mtime:
+            self.fields, self.levels = [], {}
+            if mtime is not None:
+               with np.load(self.path) as npz:
+                  self.fields = npz["fields"].tolist()
+                  for key in npz.files:
+                     if key.startswith("zones"):
+                        level = int(key[5:])
+                        self.levels[level] = (npz[key], npz[f"values{level}"])
+            self.mtime = mtime
+         return self.fields, self.levels
+
+   def exists(self) -> bool:
+      return os.path.exists(self.path)
+
+   def values(self, zones: np.ndarray, level: int, fields: Sequence[str]) -> Optional[Dict[str, np.ndarray]]:
+      # Values of `zones` of a global level per field (NaN without data), None if not part of the overview
+      overview_fields, levels = self._load()
+      if level not in levels or any(f not in overview_fields for f in fields):
+         return None
+      ids, values = levels[level]
+      pos = np.minimum(np.searchsorted(ids, zones), ids.size - 1)
+      found = ids[pos] == zones
+      out: Dict[str, np.ndarray] = {}
+      for fname in fields:
+         v = np.full(zones.size, np.nan)
+         v[found] = values[overview_fields.index(fname)][pos[found]]
+         out[fname] = v
+      return out
+
+   def write(self, fields: List[str], levels: Mapping[int, Tuple[np.ndarray, np.ndarray]]) -> None:
+      arrays: Dict[str, np.ndarray] = { "fields": np.array(fields, dtype=str) }
+      for level, (ids, values) in levels.items():
+         arrays[f"zones{level}"] = ids
+         arrays[f"values{level}"] = values
+      tmp = self.path[:-len(".npz")] + ".tmp.npz"
+      np.savez(tmp, **arrays)
+      os.replace(tmp, self.path)
+
+MAPPED_INDEX_DTYPE = np.dtype([("zone", "<u8"), ("offset", "<u8"), ("size", "<u8")])
+
+def _latest_index_records(records: np.ndarray) -> np.ndarray:
+   # Index records sorted by zone, keeping the last record written for each zone
+   zones = records["zone"]
+   if zones.size < 2 or np.all(zones[1:] > zones[:-1]):
+      return records
+   records = records[np.argsort(zones, kind="stable")]
+   zones = records["zone"]
+   return records[np.append(zones[1:] != zones[:-1], True)]
+
+def compact_mapped_index(collection_dir: str) -> None:
+   # Rewrite the index of a mapped archive sorted by zone without superseded records
+   # (the bytes of rewritten blobs stay in the blob file until the collection is repacked)
+   index_path = os.path.join(collection_dir, MAPPED_INDEX)
+   if not os.path.isfile(index_path):
+      return
+   records = np.fromfile(index_path, dtype=MAPPED_INDEX_DTYPE)
+   tmp = index_path + ".tmp"
+   _latest_index_records(records).tofile(tmp)
+   os.replace(tmp, index_path)
+
+# Append-only file of uncompressed zone blobs (MAPPED_BLOBS) with an index of (zone, offset, size) records
+# (MAPPED_INDEX), read through a shared read-only memory map so that blobs are returned as memoryview slices.
+# - Writers append the blobs of a batch, then their index records, so that readers never see records
+#   pointing past the end of the blob file.
+# - Readers reload the index and map whenever the index file changes. Previous maps are not closed
+#   explicitly since memoryviews of blobs returned earlier (e.g., in the decoded blob cache) may still use them.
+class MappedBlobArchive:
+   def __init__(self, collection_dir: str):
+      self.blobs_path = os.path.join(collection_dir, MAPPED_BLOBS)
+      self.index_path = os.path.join(collection_dir, MAPPED_INDEX)
+      self.lock = threading.Lock()
+      self.signature: Optional[Tuple[int, int]] = None
+      self.view = memoryview(b"")
+      self.records = np.empty(0, dtype=MAPPED_INDEX_DTYPE)
+
+   def _refresh(self) -> Tuple[memoryview, np.ndarray]:
+      try:
+         st = os.stat(self.index_path)
+         signature = (st.st_mtime_ns, st.st_size)
+      except OSError:
+         signature = None
+      with self.lock:
+         if signature != self.signature:
+            if signature is None:
+               view, records = memoryview(b""), np.empty(0, dtype=MAPPED_INDEX_DTYPE)
+            else:
+               # a record being appended by a writer (see MappedBlobWriter) is ignored until complete
+               with open(self.index_path, "rb") as f:
+                  data = f.read()
+               whole = len(data) - len(data) % MAPPED_INDEX_DTYPE.itemsize
+               records = _latest_index_records(np.frombuffer(data[:whole], dtype=MAPPED_INDEX_DTYPE))
+               with open(self.blobs_path, "rb") as f:
+                  size = os.fstat(f.fileno()).st_size
+                  view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) if size else memoryview(b"")
+            self.view, self.records, self.signature = view, records, signature
+         return self.view, self.records
+
+   def get(self, zone_id: int) -> Optional[memoryview]:
+      view, records = self._refresh()
+      zones = records["zone"]
+      i = int(np.searchsorted(zones, np.uint64(zone_id)))
+      if i >= zones.size or int(zones[i]) != zone_id:
+         return None
+      offset, size = int(records["offset"][i]), int(records["size"][i])
+      return view[offset:offset + size]
+
+   def zone_ids(self) -> np.ndarray:
+      return self._refresh()[1]["zone"]
+
+decode_pool: Optional[ThreadPoolExecutor] = None
+decode_pool_lock = threading.Lock()
+
+def decode_executor() -> ThreadPoolExecutor:
+   # Thread pool shared by all stores of a process for decompressing and decoding batches of blobs,
+   # and for aggregating the values of many roots
+   global decode_pool
+   with decode_pool_lock:
+      if decode_pool is None:
+         decode_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="dggs-decode")
+      return decode_pool
+
+mapped_archives: Dict[str, MappedBlobArchive] = {}
+mapped_archives_lock = threading.Lock()
+
+def get_mapped_archive(collection_dir: str) -> MappedBlobArchive:
+   # One archive reader (and memory map) per collection and process
+   key = os.path.abspath(collection_dir)
+   with mapped_archives_lock:
+      archive = mapped_archives.get(key)
+      if archive is None:
+         archive = mapped_archives[key] = MappedBlobArchive(collection_dir)
+      return archive
+
+# Writer appending (zone id, uncompressed blob) rows to a mapped archive (same interface as PackageWriter)
+class MappedBlobWriter:
+   def __init__(self, collection_dir: str):
+      os.makedirs(collection_dir, exist_ok=True)
+      self.path = os.path.join(collection_dir, MAPPED_BLOBS)
+      self.blobs = open(self.path, "ab")
+      self.index = open(os.path.join(collection_dir, MAPPED_INDEX), "ab")
+      self.lock = threading.Lock()
+      self.rows_written = 0
+
+   def write(self, entries: Sequence[Tuple[int, Any]]) -> int:
+      if not entries:
+         return 0
+      with self.lock:
+         records = np.empty(len(entries), dtype=MAPPED_INDEX_DTYPE)
+         offset = self.blobs.seek(0, os.SEEK_END)
+         for i, (zone_id, blob) in enumerate(entries):
+            records[i] = (zone_id, offset, len(blob))
+            self.blobs.write(blob)
+            offset += len(blob)
+         self.blobs.flush()
+         self.index.write(records.tobytes())
+         self.index.flush()
+         self.rows_written += len(entries)
+      return len(entries)
+
+   def close(self) -> None:
+      with self.lock:
+         if self.blobs is not None:
+            self.blobs.close()
+            self.index.close()
+            self.blobs = self.index = None
+
+# Shared by all stores of a process unless a store is given its own cache
+decoded_blob_cache = DecodedBlobCache()
+
+class ExtentPredicate:
+   # in_extent_cb for iter_bases() / iter_roots_for_base() selecting the zones which may overlap a WGS84 extent
+   # (min lon, min lat, max lon, max lat in degrees, min lon > max lon crossing the antimeridian).
+   # Zone extents are padded by half their size on each side, as these iterators descend through primary children,
+   # which may extend beyond their parent (e.g., for hexagonal DGGRSs).
+   # filter() tests the children of a zone together, from extents retrieved with getZonesWGS84ExtentsInto().
+   def __init__(self, dggrs, min_lon: float, min_lat: float, max_lat: float, lon_width: float):
+      self.dggrs = dggrs
+      self.min_lon, self.min_lat, self.max_lat = min_lon, min_lat, max_lat
+      self.lon_width = lon_width
+
+   def __call__(self, zone: DGGRSZone) -> bool:
+      return bool(self.mask(np.array([int(zone)], dtype=np.uint64))[0])
+
+   def mask(self, ids: np.ndarray) -> np.ndarray:
+      extents = np.empty((ids.size, 4), dtype=np.float64)
+      self.dggrs.getZonesWGS84ExtentsInto(ids, extents)
+      lat0, lon0, lat1, lon1 = np.degrees(extents).T
+      pad = (lat1 - lat0) / 2
+      overlap = (lat1 + pad >= self.min_lat) & (lat0 - pad <= self.max_lat)
+      if self.lon_width >= 360.0:
+         return overlap
+      width = np.where(lon1 > lon0, lon1 - lon0, lon1 - lon0 + 360.0)
+      # whether [lon0 - width / 2, lon0 + 3 / 2 width] overlaps [min_lon, min_lon + lon_width], modulo 360
+      d = (self.min_lon - (lon0 - width / 2)) % 360.0
+      lon_overlap = (d <= 2 * width) | (d + self.lon_width >= 360.0)
+      return overlap & ((lat1 + pad >= 90.0) | (lat0 - pad <= -90.0) | (2 * width >= 360.0) | lon_overlap)
+
+   def filter(self, zones: Sequence[DGGRSZone]) -> List[DGGRSZone]:
+      zones = list(zones)
+      if not zones:
+         return zones
+      keep = self.mask(np.fromiter((int(z) for z in zones), dtype=np.uint64, count=len(zones)))
+      return [z for z, k in zip(zones, keep.tolist()) if k]
+
+def extent_predicate(dggrs, extent: Optional[Sequence[float]]) -> Optional[ExtentPredicate]:
+   # ExtentPredicate for a WGS84 extent (min lon, min lat, max lon, max lat in degrees), or None for the whole world
+   if extent is None:
+      return None
+   min_lon, min_lat, max_lon, max_lat = (float(v) for v in extent)
+   lon_width = (max_lon - min_lon) % 360.0 if max_lon != min_lon + 360.0 else 360.0
+   if lon_width >= 360.0 and min_lat <= -90.0 and max_lat >= 90.0:
+      return None
+   return ExtentPredicate(dggrs, min_lon, min_lat, max_lat, lon_width)
+
+def zones_in_extent(in_extent_cb, zones) -> List[DGGRSZone]:
+   # zones kept by in_extent_cb (all without one), tested together when it supports it (see ExtentPredicate.filter())
+   if in_extent_cb is None:
+      return list(zones)
+   if hasattr(in_extent_cb, "filter"):
+      return in_extent_cb.filter(zones)
+   return [z for z in zones if in_extent_cb(z)]
 
 class DGGSDataStore:
-   def __init__(self, data_root: str, collection: str, config: Optional[dict] = None):
+   def __init__(self, data_root: str, collection: str, config: Optional[dict] = None, max_connections: int = 64,
+      blob_cache: Optional[DecodedBlobCache] = None, shared_access: bool = False):
+      # shared_access: packages may be written and read concurrently by several processes (see PackageWriter)
       self.data_root = data_root
       self.collection = collection
       self.collection_dir = os.path.join(data_root, collection)
+      self.shared_access = shared_access
+      self.connections = PackageConnectionPool(max_connections, immutable=not shared_access)
+      self.blob_cache = blob_cache if blob_cache is not None else decoded_blob_cache
+      self.writers: "OrderedDict[str, PackageWriter]" = OrderedDict()
+      self.writers_lock = threading.Lock()
+      self.max_writers = 16
+      self.presence = ZonePresenceIndex(self.collection_dir)
+      self.dirty = DirtyZoneTracker(self.collection_dir)
+      self.overview = GlobalOverview(self.collection_dir)
+      # root zone -> package path, deepest group base -> package path, group base -> group base ancestors
+      self.root_package_paths = LRUMemo(65536)
+      self.base_package_paths = LRUMemo(16384)
+      self.base_ancestors = LRUMemo(16384)
 
       if config is not None:
          os.makedirs(os.path.dirname(self.collection_dir), exist_ok=True)
@@ -290,6 +1245,39 @@ class DGGSDataStore:
          print("Missing 'maxRefinementLevel' in collection config")
       self.maxRefinementLevel = int(maxRefinementLevel)
 
+      self.value_encoding = self.config.get("valueEncoding", "list")
+      if self.value_encoding not in VALUE_ENCODINGS:
+         print(f"Unsupported 'valueEncoding' in collection config: {self.value_encoding!r}")
+         return
+      self.quantization: Dict[str, Dict[str, Any]] = self.config.get("quantization") or {}
+      for fname, q in self.quantization.items():
+         if q.get("dataType") not in QUANTIZED_DATA_TYPES:
+            print(f"Unsupported quantization 'dataType' for field {fname!r}: {q.get('dataType')!r}")
+            return
+      self.aggregation: Dict[str, str] = self.config.get("aggregation") or {}
+      for fname, method in self.aggregation.items():
+         if method not in AGGREGATION_METHODS:
+            print(f"Unsupported aggregation method for field {fname!r}: {method!r}")
+            return
+      # depths stored in addition to `depth` in every root zone blob (see materialize_extra_depths())
+      self.extra_depths: List[int] = sorted(int(d) for d in self.config.get("extraDepths", []))
+      self.without_rowid = bool(self.config.get("withoutRowid", False))
+      self.store_version = int(self.config.get("storeVersion", 1))
+      if self.store_version not in STORE_VERSIONS:
+         print(f"Unsupported 'storeVersion' in collection config: {self.store_version!r}")
+         return
+      self.int_keys = self.store_version >= 2
+      self.text_ids = bool(self.config.get("textIDs", False))
+      self.key_column = package_key_columns(self.int_keys)[0]
+      layout = self.config.get("layout", "tree")
+      if layout not in PACKAGE_LAYOUTS:
+         print(f"Unsupported 'layout' in collection config: {layout!r}")
+         return
+      self.set_layout(layout)
+      self.mapped_written = False
+      # Whether stored blobs are plain DGGS-JSON which can be forwarded to clients as-is
+      self.standard_values = self.value_encoding == "list" and not self.quantization
+
       self._compute_groups()
       self._compute_fields()
 
@@ -300,50 +1288,88 @@ class DGGSDataStore:
 
       attr_path = self._attributes_db_path()
       if os.path.exists(attr_path):
-         conn = sqlite3.connect(f"file:{os.path.abspath(attr_path)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
-         cur = conn.cursor()
-         cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='attributes'")
-         if cur.fetchone():
-            cur.execute("PRAGMA table_info(attributes)")
-            cols = [r[1] for r in cur.fetchall()]
-            conn.close()
-            cols = [c for c in cols if c != "feature_id"]
-            if cols:
-               self.fields = cols
-         else:
-            conn.close()
+         with self.connections.connection(attr_path) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='attributes'")
+            if cur.fetchone():
+               cur.execute("PRAGMA table_info(attributes)")
+               cols = [r[1] for r in cur.fetchall()]
+               cols = [c for c in cols if c != "feature_id"]
+               if cols:
+                  self.fields = cols
          self.is_vector = True
       else:
          # attributes.sqlite not present -> inspect package .sqlite files
-         sample_pkg = None
-         for root, _, names in os.walk(self.collection_dir):
-            for n in names:
-               if n.endswith(".sqlite"):
-                  sample_pkg = os.path.join(root, n)
-                  break
-            if sample_pkg:
-               break
-
-         if sample_pkg:
-            root_ids = read_package_root_ids_from_sqlite(sample_pkg, limit=1)
-            if root_ids:
-               sample_root = root_ids[0]
-               conn2 = sqlite3.connect(f"file:{os.path.abspath(sample_pkg)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
-               conn2.row_factory = sqlite3.Row
-               cur2 = conn2.execute("SELECT data FROM zone_data WHERE root_zone_id = ?", (sample_root,))
-               r2 = cur2.fetchone()
-               conn2.close()
-               if r2:
-                  blob = r2["data"]
-                  if blob:
-                     raw = gzip.decompress(blob) if blob[:2] == b"\x1f\x8b" else blob
-                     decoded = ubjson.loadb(raw)
-                     values_map = decoded.get("values") if isinstance(decoded, dict) else None
-                     if isinstance(values_map, dict):
-                        self.fields = list(values_map.keys())
+         sample_pkg = next(self.iter_package_files(), None)
+
+         if self.mapped:
+            ids = self.mapped_archive.zone_ids()
+            blob = self.mapped_archive.get(int(ids[0])) if ids.size else None
+            if blob:
+               values_map = ubjson.loadb(blob).get("values")
+               if isinstance(values_map, dict):
+                  self.fields = list(values_map.keys())
+         elif sample_pkg:
+            r2 = None
+            with self.connections.connection(sample_pkg) as conn:
+               if conn is not None:
+                  r2 = conn.execute("SELECT data FROM zone_data LIMIT 1").fetchone()
+            if r2:
+               blob = r2[0]
+               if blob:
+                  raw = gzip.decompress(blob) if blob[:2] == b"\x1f\x8b" else blob
+                  decoded = ubjson.loadb(raw)
+                  values_map = decoded.get("values") if isinstance(decoded, dict) else None
+                  if isinstance(values_map, dict):
+                     self.fields = list(values_map.keys())
          self.is_vector = False
       # print("Computed fields: ", self.fields)
 
+   def set_layout(self, layout: str) -> None:
+      # Package layout used for subsequent reads and writes (see PACKAGE_LAYOUTS)
+      self.layout = layout
+      self.packed = layout == "packed"
+      self.mapped = layout == "mapped"
+      self.archive_path = os.path.join(self.collection_dir, MAPPED_BLOBS if self.mapped else PACKED_ARCHIVE)
+      self.mapped_archive = get_mapped_archive(self.collection_dir) if self.mapped else None
+
+   def write_config(self) -> None:
+      os.makedirs(self.collection_dir, exist_ok=True)
+      with open(os.path.join(self.collection_dir, "collection.json"), "w", encoding="utf-8") as fh:
+         json.dump(self.config, fh, indent=2)
+
+   def iter_tree_package_files(self) -> Iterator[str]:
+      for root, _, names in os.walk(self.collection_dir):
+         for n in sorted(names):
+            if n.endswith(".sqlite") and n != "attributes.sqlite":
+               yield os.path.join(root, n)
+
+   def iter_package_files(self) -> Iterator[str]:
+      # Physical package files of the collection
+      if self.layout != "tree":
+         if os.path.isfile(self.archive_path):
+            yield self.archive_path
+         return
+      yield from self.iter_tree_package_files()
+
+   def package_file(self, pkg_path: str) -> str:
+      # Physical file storing a (logical) package
+      return pkg_path if self.layout == "tree" else self.archive_path
+
+   def encode_for_storage(self, obj: Any) -> Any:
+      # DGGS-JSON object with its values in the store's value encoding and quantization
+      return encode_dggs_json_values(obj, self.value_encoding, self.quantization)
+
+   def _to_storage_blob(self, obj: Any) -> bytes:
+      # mapped archives keep blobs uncompressed so that they can be read in place
+      return to_blob(self.encode_for_storage(obj), compress=not self.mapped)
+
+   def _stored_blob(self, blob: Any) -> Any:
+      # An already encoded (gzip'd or not) blob in the form stored by this store's layout
+      if self.mapped:
+         return decompress_blob(blob)
+      return blob if blob[:2] == b"\x1f\x8b" else gzip.compress(blob)
+
    def _compute_groups(self) -> None:
        self.groupSize = self.config.get("groupSize", 1)
        self.deepest_root = max(0, self.maxRefinementLevel - self.depth)
@@ -373,24 +1399,30 @@ class DGGSDataStore:
 
    def _compute_ancestral_group_base_list(self, zone: DGGRSZone) -> list:
        # Collect group-base ancestors in digging-down order (top -> ... -> deepest).
-       # Walks from `zone` up to root, but PREPENDS each discovered base so the final
-       # list is ordered as if discovered by digging down.
-       # Each entry is a tuple (level, zone).
+       # Walks from `zone` up to the first group base whose own ancestors are memoized
+       # (or to the root), then memoizes the list of each newly discovered base.
 
        dggrs = self.dggrs
-       bases: list = []
+       discovered: list = []   # deepest first
+       bases: tuple = ()
 
        current_level = dggrs.getZoneLevel(zone)
        while True:
            if self._is_base_level(current_level):
-               # prepend so final order is top -> ... -> deepest
-               bases.insert(0, zone)
+               cached = self.base_ancestors.get(int(zone))
+               if cached is not None:
+                   bases = cached
+                   break
+               discovered.append(zone)
            zone = dggrs.getZonePrimaryParent(zone)
            if zone is None:
                break
            current_level = dggrs.getZoneLevel(zone)
 
-       return bases
+       for base in reversed(discovered):
+           bases = bases + (base,)
+           self.base_ancestors.put(int(base), bases)
+       return list(bases)
 
    def compute_package_path_for_root_zone(self, zone: DGGRSZone, base_ancestor_list: Optional[list] = None) -> str:
       # Compute package path for root `zone`. If `base_ancestor_list` is not provided,
@@ -401,7 +1433,33 @@ class DGGSDataStore:
 
       dggrs = self.dggrs
       if base_ancestor_list is None:
+         path = self.root_package_paths.get(int(zone))
+         if path is not None:
+            return path
          base_ancestor_list = self._compute_ancestral_group_base_list(zone)
+         path = self._compute_package_path_for_bases(base_ancestor_list)
+         self.root_package_paths.put(int(zone), path)
+         return path
+      return self._compute_package_path_for_bases(base_ancestor_list)
+
+   def compute_package_paths(self, zones: Iterable[DGGRSZone]) -> List[str]:
+      # Package paths of many root zones, resolving each distinct zone once
+      paths: Dict[int, str] = {}
+      out: List[str] = []
+      for zone in zones:
+         zid = int(zone)
+         path = paths.get(zid)
+         if path is None:
+            path = paths[zid] = self.compute_package_path_for_root_zone(zone)
+         out.append(path)
+      return out
+
+   def _compute_package_path_for_bases(self, base_ancestor_list: list) -> str:
+      dggrs = self.dggrs
+      base_key = int(base_ancestor_list[-1])
+      path = self.base_package_paths.get(base_key)
+      if path is not None:
+         return path
 
       # base_ancestor_list is top -> ... -> deepest
       base_texts = [dggrs.getZoneTextID(int(n)) for n in base_ancestor_list if n is not None]
@@ -419,28 +1477,174 @@ class DGGSDataStore:
 
       parts = [self.collection_dir] + dirs + [filename]
 
-      return os.path.join(*parts)
+      path = os.path.join(*parts)
+      self.base_package_paths.put(base_key, path)
+      return path
+
+   def _zone_key(self, zone: DGGRSZone) -> Any:
+      # Primary key of a zone's zone_data row
+      return zone_key(zone) if self.int_keys else self.dggrs.getZoneTextID(zone)
+
+   def _row_keys(self, zone: DGGRSZone) -> Tuple[Any, ...]:
+      # Key column values of a zone's zone_data row (see package_key_columns())
+      if self.mapped:
+         return (int(zone),)
+      if not self.int_keys:
+         return (self.dggrs.getZoneTextID(zone),)
+      return (zone_key(zone), self.dggrs.getZoneTextID(zone)) if self.text_ids else (zone_key(zone),)
 
    def read_zone_blob(self, pkg_path: str, zone: DGGRSZone) -> Optional[bytes]:
-      if not os.path.isfile(pkg_path):
-         return None
-      zone_text = self.dggrs.getZoneTextID(zone)
-      conn = sqlite3.connect(f"file:{os.path.abspath(pkg_path)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
-      conn.row_factory = sqlite3.Row
-      cur = conn.execute("SELECT data FROM zone_data WHERE root_zone_id = ?", (zone_text,))
-      row = cur.fetchone()
-      conn.close()
+      # For mapped archives, a memoryview of the uncompressed blob within the memory map
+      if self.mapped:
+         return self.mapped_archive.get(int(zone))
+      with self.connections.connection(self.package_file(pkg_path)) as conn:
+         if conn is None:
+            return None
+         row = conn.execute(f"SELECT data FROM zone_data WHERE {self.key_column} = ?", (self._zone_key(zone),)).fetchone()
       if not row:
-         # logger.warning("read_zone_blob: package=%s missing root_zone_id=%s", pkg_path, zone_text)
          return None
-      return row["data"]
+      return row[0]
+
+   def read_zone_blobs(self, pkg_path: str, zones: Sequence[DGGRSZone], chunk_size: int = 500) -> Dict[int, Any]:
+      # Stored blobs of several root zones of a package by integer zone id (zones without data are omitted),
+      # with one query per chunk of zones
+      if self.mapped:
+         blobs = ((int(z), self.mapped_archive.get(int(z))) for z in zones)
+         return { z: b for z, b in blobs if b is not None }
+      zone_by_key = { self._zone_key(z): int(z) for z in zones }
+      keys = list(zone_by_key.keys())
+      out: Dict[int, Any] = {}
+      with self.connections.connection(self.package_file(pkg_path)) as conn:
+         if conn is None:
+            return out
+         for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            q = ",".join("?" for _ in chunk)
+            for key, blob in conn.execute(f"SELECT {self.key_column}, data FROM zone_data WHERE {self.key_column} IN ({q})", chunk):
+               out[zone_by_key[key]] = blob
+      return out
+
+   def package_signature(self, pkg_path: str) -> Optional[Tuple[int, int]]:
+      # (mtime_ns, size) of the file storing a package (the index of a mapped archive), None if there is none
+      path = os.path.join(self.collection_dir, MAPPED_INDEX) if self.mapped else self.package_file(pkg_path)
+      try:
+         st = os.stat(path)
+      except OSError:
+         return None
+      return (st.st_mtime_ns, st.st_size)
+
+   def _decode_and_cache(self, zone_id: int, blob: Any, signature: Optional[Tuple[int, int]]) -> Optional[dict]:
+      raw = decompress_blob(blob)
+      if raw is None:
+         return None
+      if isinstance(raw, memoryview) and not self.standard_values and not self.is_vector:
+         # typed value arrays decoded as views over the memory map (see depth_entry_array())
+         decoded = loadb_view(raw)
+      else:
+         decoded = ubjson.loadb(raw)
+      self.blob_cache.put((self.collection_dir, zone_id), decoded, approx_decoded_size(decoded, len(raw)), signature)
+      return decoded
 
    def read_and_decode_zone_blob(self, pkg_path: str, zone: DGGRSZone) -> dict: # | None:
-      return decode_blob(self.read_zone_blob(pkg_path, zone))
+      # The returned object may be shared through the decoded blob cache and must not be modified
+      signature = self.package_signature(pkg_path)
+      decoded = self.blob_cache.get((self.collection_dir, int(zone)), signature)
+      if decoded is None:
+         decoded = self._decode_and_cache(int(zone), self.read_zone_blob(pkg_path, zone), signature)
+      return decoded
+
+   def read_and_decode_zone_blobs(self, zones: Sequence[DGGRSZone]) -> Dict[int, dict]:
+      # Decoded blobs of several root zones by integer zone id (zones without data are omitted):
+      # cache misses are read with one query per package and decoded in parallel (see decode_executor()).
+      # As for read_and_decode_zone_blob(), the returned objects must not be modified.
+      out: Dict[int, dict] = {}
+      by_package: Dict[str, List[DGGRSZone]] = {}
+      for z, pkg in zip(zones, self.compute_package_paths(zones)):
+         if pkg:
+            by_package.setdefault(pkg, []).append(z)
+      blobs: Dict[int, Tuple[Any, Optional[Tuple[int, int]]]] = {}
+      for pkg, pkg_zones in by_package.items():
+         signature = self.package_signature(pkg)
+         missing: List[DGGRSZone] = []
+         for z in pkg_zones:
+            decoded = self.blob_cache.get((self.collection_dir, int(z)), signature)
+            if decoded is not None:
+               out[int(z)] = decoded
+            else:
+               missing.append(z)
+         if missing:
+            blobs.update((z, (blob, signature)) for z, blob in self.read_zone_blobs(pkg, missing).items())
+      if not blobs:
+         return out
+      if len(blobs) > 1:
+         decoded_blobs = decode_executor().map(lambda item: self._decode_and_cache(item[0], *item[1]), blobs.items())
+      else:
+         decoded_blobs = (self._decode_and_cache(item[0], *item[1]) for item in blobs.items())
+      for zone_id, decoded in zip(blobs.keys(), decoded_blobs):
+         if decoded is not None:
+            out[zone_id] = decoded
+      return out
+
+   def stored_zone_ids(self, pkg_path: str, zones: Sequence[DGGRSZone], chunk_size: int = 500) -> set:
+      # Integer ids of those of `zones` stored in a package, looked up by key with one query per chunk of zones
+      if self.mapped:
+         ids = np.fromiter((int(z) for z in zones), dtype=np.uint64, count=len(zones))
+         stored = self.mapped_archive.zone_ids()
+         pos = np.minimum(np.searchsorted(stored, ids), max(stored.size - 1, 0))
+         return set(ids[stored[pos] == ids].tolist()) if stored.size else set()
+      zone_by_key = { self._zone_key(z): int(z) for z in zones }
+      keys = list(zone_by_key.keys())
+      out: set = set()
+      with self.connections.connection(self.package_file(pkg_path)) as conn:
+         if conn is None:
+            return out
+         for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            q = ",".join("?" for _ in chunk)
+            for (key,) in conn.execute(f"SELECT {self.key_column} FROM zone_data WHERE {self.key_column} IN ({q})", chunk):
+               out.add(zone_by_key[key])
+      return out
+
+   def read_package_zone_ids(self, pkg_path: str, limit: Optional[int] = None,
+      roots: Optional[Sequence[DGGRSZone]] = None) -> set:
+      # Integer DGGRSZone ids of the roots stored in a package
+      # roots: the candidate roots of the package (e.g., from iter_roots_for_base()), only looked up (see stored_zone_ids())
+      # for the logical packages of packed and mapped layouts rather than reading all roots of the collection
+      if not pkg_path:
+         return set()
+      pkg_file = self.package_file(pkg_path)
+      whole_file = pkg_file == pkg_path
+      if roots is not None and (self.mapped or not whole_file):
+         zones = self.stored_zone_ids(pkg_path, roots)
+         return zones if limit is None else set(list(zones)[:limit])
+      if self.mapped:
+         zones = set(self.mapped_archive.zone_ids().tolist())
+      else:
+         with self.connections.connection(pkg_file) as conn:
+            keys = _select_root_ids(conn, limit if whole_file else None, self.key_column) if conn is not None else []
+         if self.int_keys:
+            zones = { zone_from_key(k) for k in keys }
+         else:
+            ids = np.empty(len(keys), dtype=np.uint64)
+            self.dggrs.getZonesFromTextIDsInto(keys, ids)
+            zones = set(ids[ids != nullZone].tolist())
+      if not whole_file:
+         # logical package of a packed archive: keep the roots belonging to it
+         zones = { z for z in zones if self.compute_package_path_for_root_zone(DGGRSZone(z)) == pkg_path }
+         if limit is not None:
+            zones = set(list(zones)[:limit])
+      return zones
 
    def read_package_root_ids(self, pkg_path: str, limit: Optional[int] = None) -> set:
-      ids = read_package_root_ids_from_sqlite(pkg_path, limit=limit)
-      return set(ids)
+      # Textual identifiers of the roots stored in a package
+      if not self.int_keys and self.layout == "tree":
+         if not pkg_path:
+            return set()
+         with self.connections.connection(pkg_path) as conn:
+            ids = _select_root_ids(conn, limit) if conn is not None else []
+         return set(ids)
+      zones = self.read_package_zone_ids(pkg_path, limit)
+      return set(self.dggrs.getZonesTextIDs(np.fromiter(zones, dtype=np.uint64, count=len(zones))))
 
    def _iter_lvl0_seeds(self) -> Iterable[Any]:
       dggrs = self.dggrs
@@ -460,17 +1664,14 @@ class DGGSDataStore:
 
       # start from lvl0's children (iter_bases yields lvl0 itself when appropriate)
       children0 = dggrs.getZonePrimaryChildren(lvl0) or []
-      for child in children0:
+      for child in zones_in_extent(in_extent_cb, children0):
          stack.append((child, [lvl0]))
       if not isinstance(children0, list):
          Instance.delete(children0)
 
       while stack:
+         # zones are only stacked if in the extent (zones_in_extent())
          zone, base_ancestors = stack.pop()
-
-         if in_extent_cb is not None and not in_extent_cb(zone):
-            continue
-
          zone_level = dggrs.getZoneLevel(zone)
 
          # exact base level: yield and do not descend
@@ -482,7 +1683,7 @@ class DGGSDataStore:
          if up_to and zone_level < base_level and self._is_base_level(zone_level):
             yield (zone, base_ancestors + [zone])
             children = dggrs.getZoneChildren(zone) or []
-            for child in children:
+            for child in zones_in_extent(in_extent_cb, children):
                stack.append((child, base_ancestors + [zone]))
             if not isinstance(children, list):
                Instance.delete(children)
@@ -490,7 +1691,7 @@ class DGGSDataStore:
 
          # otherwise descend normally
          children = dggrs.getZonePrimaryChildren(zone) or []
-         for child in children:
+         for child in zones_in_extent(in_extent_cb, children):
             stack.append((child, base_ancestors))
          if not isinstance(children, list):
             Instance.delete(children)
@@ -500,7 +1701,7 @@ class DGGSDataStore:
          return
       dggrs = self.dggrs
 
-      for lvl0 in self._iter_lvl0_seeds():
+      for lvl0 in zones_in_extent(in_extent_cb, self._iter_lvl0_seeds()):
          lvl0_level = dggrs.getZoneLevel(lvl0)
 
          # yield lvl0 itself when it qualifies
@@ -536,14 +1737,14 @@ class DGGSDataStore:
 
       stack: List[Tuple[DGGRSZone, int]] = []
       children = dggrs.getZonePrimaryChildren(base_zone) or []
-      for child in children:
+      # extent filter (neither the zones nor their descendants are yielded)
+      for child in zones_in_extent(in_extent_cb, children):
          stack.append((child, base_level + 1))
       if not isinstance(children, list):
          Instance.delete(children)
 
       while stack:
          zone, ref = stack.pop()
-         zid = int(zone)
 
          # yield according to up_to vs exact semantics
          if up_to:
@@ -554,34 +1755,91 @@ class DGGSDataStore:
                yield zone
                continue
 
-         # extent filter
-         if in_extent_cb is not None and not in_extent_cb(zone):
-            continue
-
          # only descend while ref < level (children would be ref+1)
          if ref < level:
             children = dggrs.getZonePrimaryChildren(zone) or []
-            for child in children:
+            for child in zones_in_extent(in_extent_cb, children):
                stack.append((child, ref + 1))
             if not isinstance(children, list):
                Instance.delete(children)
 
+   def build_presence_index(self) -> None:
+      # (Re)build the zone presence index from the root ids stored in all packages
+      dggrs = self.dggrs
+      by_level: Dict[int, List[int]] = {}
+      for pkg in self.iter_package_files():
+         zones = self.read_package_zone_ids(pkg)
+         ids = np.fromiter(zones, dtype=np.uint64, count=len(zones))
+         levels = np.empty(ids.size, dtype=np.int32)
+         dggrs.getZonesLevelsInto(ids, levels)
+         for level in np.unique(levels).tolist():
+            by_level.setdefault(level, []).extend(ids[levels == level].tolist())
+      # build next to the live index (in a directory of this process and thread) and swap it in,
+      # so that readers never see a partial index
+      tmp_dir = f"{self.presence.dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+      shutil.rmtree(tmp_dir, ignore_errors=True)
+      os.makedirs(tmp_dir)
+      try:
+         for level, ids in by_level.items():
+            self.presence.write_level(level, ids, tmp_dir)
+         shutil.rmtree(self.presence.dir, ignore_errors=True)
+         os.replace(tmp_dir, self.presence.dir)
+      finally:
+         shutil.rmtree(tmp_dir, ignore_errors=True)
+      print(f"[PRESENCE] indexed {sum(len(ids) for ids in by_level.values())} zones for {self.collection}", flush=True)
+
+   def ensure_presence_index(self) -> bool:
+      # Whether the presence index can be used, building it first for collections without one
+      # (once per process: concurrent requests wait for the build rather than each scanning the packages).
+      # Returns False (callers scan packages instead) if it cannot be written, e.g. for a read-only data root.
+      if self.presence.exists():
+         return True
+      with presence_build_lock:
+         if self.presence.exists():
+            return True
+         try:
+            if next(self.iter_package_files(), None) is None:
+               os.makedirs(self.presence.dir, exist_ok=True)
+            else:
+               self.build_presence_index()
+            return True
+         except OSError as e:
+            if self.presence.exists():   # built meanwhile by another process
+               return True
+            logger.warning("Could not create zone presence index for %s: %s", self.collection, e)
+            return False
+
+   def has_zone(self, zone: DGGRSZone) -> bool:
+      # Whether data is stored for this root zone
+      if self.ensure_presence_index():
+         return self.presence.contains(self.dggrs.getZoneLevel(zone), int(zone))
+      pkg = self.compute_package_path_for_root_zone(zone)
+      return pkg is not None and int(zone) in self.stored_zone_ids(pkg, [zone])
+
    def list_zones_with_data_at_level(self, root_level: int, as_textIDs: bool = False) -> List[Any]:
       result: List[Any] = []
       dggrs = self.dggrs
+
+      if self.ensure_presence_index():
+         ids = self.presence.zones_at_level(root_level)
+         if as_textIDs:
+            return dggrs.getZonesTextIDs(np.ascontiguousarray(ids, dtype=np.uint64))
+         return [ DGGRSZone(int(z)) for z in ids ]
+
+      # no index available: scan the packages
       base_level = self._base_level_for_root(root_level)
 
       for base_zone, base_ancestors in self.iter_bases(base_level, up_to=False):
          pkg = self.compute_package_path_for_root_zone(base_zone, base_ancestors)
          if not pkg:
             continue
-         root_ids = self.read_package_root_ids(pkg)
+         roots = list(self.iter_roots_for_base(base_zone, root_level, up_to=False))
+         root_ids = self.read_package_zone_ids(pkg, roots=roots)
          if not root_ids:
             continue
-         for root_zone in self.iter_roots_for_base(base_zone, root_level, up_to=False):
-            zid_text = dggrs.getZoneTextID(root_zone)
-            if zid_text and zid_text in root_ids:
-               result.append(zid_text if as_textIDs else root_zone)
+         for root_zone in roots:
+            if int(root_zone) in root_ids:
+               result.append(dggrs.getZoneTextID(root_zone) if as_textIDs else root_zone)
       return result
 
    def write_zone_batch(self,
@@ -590,37 +1848,136 @@ class DGGSDataStore:
                         base_ancestor_list: Optional[List['DGGRSZone']] = None,
                         pkg_path: Optional[str] = None,
                         precompressed: bool = False,
-                        max_workers: int = 8) -> None:
+                        max_workers: int = 8,
+                        mark_dirty: bool = False) -> None:
+      # mark_dirty: record the zones as changed for an incremental rebuild of their ancestors
       dggrs = self.dggrs
 
       if pkg_path is None:
          pkg_path = self.compute_package_path_for_root_zone(base_zone, base_ancestor_list=base_ancestor_list)
 
-      items: List[Tuple[str, Any]] = []
+      items: List[Tuple[Tuple[Any, ...], Any]] = []
+      zones_by_level: Dict[int, List[int]] = {}
       for zone_obj, data_obj in entries.items():
-         zone_text = dggrs.getZoneTextID(zone_obj)
-         items.append((zone_text, data_obj))
+         items.append((self._row_keys(zone_obj), data_obj))
+         zones_by_level.setdefault(dggrs.getZoneLevel(zone_obj), []).append(int(zone_obj))
+         self.blob_cache.discard((self.collection_dir, int(zone_obj)))
 
-      output_rows: List[Tuple[str, bytes]] = []
+      output_rows: List[Tuple[Any, ...]] = []
 
       if items:
          if precompressed:
-            for zone_text, data_obj in items:
-               output_rows.append((zone_text, data_obj))
+            for row_keys, data_obj in items:
+               output_rows.append(row_keys + (self._stored_blob(data_obj),))
          else:
             workers = min(max_workers, max(1, len(items)))
             with ThreadPoolExecutor(max_workers=workers) as ex:
                fut_map = {}
-               for zone_text, data_obj in items:
-                  fut = ex.submit(to_blob, data_obj)
-                  fut_map[fut] = zone_text
+               for row_keys, data_obj in items:
+                  fut = ex.submit(self._to_storage_blob, data_obj)
+                  fut_map[fut] = row_keys
 
                for fut in as_completed(fut_map):
-                  zone_text = fut_map[fut]
-                  output_rows.append((zone_text, fut.result()))
+                  row_keys = fut_map[fut]
+                  output_rows.append(row_keys + (fut.result(),))
+
+      has_index = self.ensure_presence_index()
+      pkg_file = self.package_file(pkg_path)
+      self.package_writer(pkg_file).write(output_rows)
+      self.connections.invalidate(pkg_file)
+      self.mapped_written = self.mapped_written or self.mapped
+      if has_index and output_rows:
+         self.presence.append(zones_by_level)
+      if mark_dirty and output_rows:
+         self.dirty.add(z for ids in zones_by_level.values() for z in ids)
+
+   def package_writer(self, pkg_path: str) -> PackageWriter:
+      # Writer kept open across write_zone_batch() calls until close_package_writers()
+      # (at most max_writers, the least recently used being closed first)
+      evicted: List[PackageWriter] = []
+      with self.writers_lock:
+         writer = self.writers.get(pkg_path)
+         if writer is None:
+            if self.mapped:
+               writer = self.writers[pkg_path] = MappedBlobWriter(self.collection_dir)
+            else:
+               writer = self.writers[pkg_path] = PackageWriter(pkg_path, without_rowid=self.without_rowid,
+                  exclusive=not self.shared_access, int_keys=self.int_keys, text_ids=self.text_ids)
+         else:
+            self.writers.move_to_end(pkg_path)
+         while len(self.writers) > self.max_writers:
+            evicted.append(self.writers.popitem(last=False)[1])
+      for w in evicted:
+         w.close()
+      return writer
+
+   def close_package_writers(self, pkg_path: Optional[str] = None) -> None:
+      # Close the writer of a completed package, or all open writers
+      with self.writers_lock:
+         if pkg_path is None:
+            writers = list(self.writers.values())
+            self.writers.clear()
+         else:
+            w = self.writers.pop(self.package_file(pkg_path), None)
+            writers = [w] if w is not None else []
+      for w in writers:
+         w.close()
+         self.connections.invalidate(w.path)
+
+   def data_signature(self, zone: DGGRSZone) -> Tuple[Any, ...]:
+      # Modification times (ns) of the files whose changes may affect the data returned for a zone at any depth
+      # (e.g., for cache validation): collection.json, the global overview, the zone's package or the collection's archive,
+      # and the presence index levels appended to by every write, as well as the (mtime, size) of the vector feature
+      # attributes database (and its write-ahead log) embedded in responses. For tree collections without a presence index,
+      # changes to other packages (used for custom depths) are not reflected.
+      paths = [os.path.join(self.collection_dir, "collection.json"), self.overview.path]
+      if self.mapped:
+         paths.append(os.path.join(self.collection_dir, MAPPED_INDEX))
+      else:
+         pkg = self.compute_package_path_for_root_zone(zone)
+         if pkg:
+            paths.append(self.package_file(pkg))
+      signature = []
+      for path in paths:
+         try:
+            signature.append(os.stat(path).st_mtime_ns)
+         except OSError:
+            signature.append(0)
+      try:
+         with os.scandir(self.presence.dir) as it:
+            signature.extend(sorted((e.name, e.stat().st_mtime_ns) for e in it))
+      except OSError:
+         pass
+      attributes_path = self._attributes_db_path()
+      for path in (attributes_path, attributes_path + "-wal"):
+         try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+         except OSError:
+            signature.append(None)
+      return tuple(signature)
+
+   def iter_zone_blobs(self) -> Iterator[Tuple[int, Any]]:
+      # (zone id, stored blob) of all root zones of the collection, for any layout
+      if self.mapped:
+         for z in self.mapped_archive.zone_ids().tolist():
+            yield z, self.mapped_archive.get(z)
+         return
+      dggrs = self.dggrs
+      for pkg in self.iter_package_files():
+         with self.connections.connection(pkg) as conn:
+            if conn is None:
+               continue
+            for key, blob in conn.execute(f"SELECT {self.key_column}, data FROM zone_data"):
+               yield (zone_from_key(key) if self.int_keys else int(dggrs.getZoneFromTextID(key))), blob
 
-      pkg_dir = os.path.dirname(pkg_path)
-      write_sqlite_two_col(pkg_path, output_rows)
+   def close(self) -> None:
+      self.close_package_writers()
+      self.presence.compact()
+      if self.mapped_written:
+         compact_mapped_index(self.collection_dir)
+         self.mapped_written = False
+      self.connections.close()
 
    # Vector Attributes DB
    def _attributes_db_path(self) -> str:
@@ -827,6 +2184,9 @@ def get_store(data_root: str, collection: str, config: Optional[dict] = None) ->
 
 def close_all_stores() -> None:
    with store_lock:
+      for st in store_cache.values():
+         if st is not None:
+            st.close()
       store_cache.clear()
    with dggrs_lock:
       dggrs_cache.clear()
@@ -0,0 +1,126 @@
+# dggsStore/ubjsonView.py
+# Minimal UBJSON (draft 12) decoder returning memoryview slices of the input for strongly typed uint8 arrays
+# (binary data, as written by py-ubjson for bytes) instead of copies, so that typed value arrays
+# of a decoded blob (see VALUE_DATA_TYPES) can be used with np.frombuffer() directly over the original buffer
+# (e.g., a memory-mapped archive). Everything else decodes as with ubjson.loadb().
+
+import struct
+from decimal import Decimal
+from typing import Any, Optional, Tuple
+
+_NUMBERS = {
+   ord('i'): struct.Struct('>b'),
+   ord('U'): struct.Struct('>B'),
+   ord('I'): struct.Struct('>h'),
+   ord('l'): struct.Struct('>i'),
+   ord('L'): struct.Struct('>q'),
+   ord('d'): struct.Struct('>f'),
+   ord('D'): struct.Struct('>d')
+}
+_UINT8 = ord('U')
+_NOOP = ord('N')
+_NULL, _TRUE, _FALSE = ord('Z'), ord('T'), ord('F')
+_STRING, _CHAR, _HIGH_PREC = ord('S'), ord('C'), ord('H')
+_ARRAY_START, _ARRAY_END = ord('['), ord(']')
+_OBJECT_START, _OBJECT_END = ord('{'), ord('}')
+_TYPE, _COUNT = ord('$'), ord('#')
+
+def loadb_view(data: Any) -> Any:
+   buf = memoryview(data)
+   if buf.format != 'B' or buf.ndim != 1:
+      buf = buf.cast('B')
+   pos = 0
+   while buf[pos] == _NOOP:
+      pos += 1
+   value, _ = _read_value(buf, pos + 1, buf[pos])
+   return value
+
+def _read_length(buf: memoryview, pos: int) -> Tuple[int, int]:
+   number = _NUMBERS.get(buf[pos])
+   if number is None or buf[pos] in (ord('d'), ord('D')):
+      raise ValueError(f"Invalid UBJSON length marker at {pos}")
+   return number.unpack_from(buf, pos + 1)[0], pos + 1 + number.size
+
+def _read_string(buf: memoryview, pos: int) -> Tuple[str, int]:
+   n, pos = _read_length(buf, pos)
+   return str(buf[pos:pos + n], 'utf-8'), pos + n
+
+def _read_value(buf: memoryview, pos: int, marker: int) -> Tuple[Any, int]:
+   # `marker` has already been consumed; returns the value and the position following it
+   number = _NUMBERS.get(marker)
+   if number is not None:
+      return number.unpack_from(buf, pos)[0], pos + number.size
+   if marker == _STRING:
+      return _read_string(buf, pos)
+   if marker == _ARRAY_START:
+      return _read_array(buf, pos)
+   if marker == _OBJECT_START:
+      return _read_object(buf, pos)
+   if marker == _NULL:
+      return None, pos
+   if marker == _TRUE:
+      return True, pos
+   if marker == _FALSE:
+      return False, pos
+   if marker == _CHAR:
+      return chr(buf[pos]), pos + 1
+   if marker == _HIGH_PREC:
+      s, pos = _read_string(buf, pos)
+      return Decimal(s), pos
+   raise ValueError(f"Invalid UBJSON marker {chr(marker)!r} at {pos - 1}")
+
+def _read_container_params(buf: memoryview, pos: int) -> Tuple[Optional[int], Optional[int], int]:
+   item_type = None
+   count = None
+   if buf[pos] == _TYPE:
+      item_type = buf[pos + 1]
+      pos += 2
+   if buf[pos] == _COUNT:
+      count, pos = _read_length(buf, pos + 1)
+   return item_type, count, pos
+
+def _read_array(buf: memoryview, pos: int) -> Tuple[Any, int]:
+   item_type, count, pos = _read_container_params(buf, pos)
+   if item_type == _UINT8 and count is not None:
+      return buf[pos:pos + count], pos + count
+   out = []
+   if count is not None:
+      for _ in range(count):
+         if item_type is None:
+            marker = buf[pos]
+            pos += 1
+         else:
+            marker = item_type
+         value, pos = _read_value(buf, pos, marker)
+         out.append(value)
+      return out, pos
+   while True:
+      marker = buf[pos]
+      pos += 1
+      if marker == _ARRAY_END:
+         return out, pos
+      if marker == _NOOP:
+         continue
+      value, pos = _read_value(buf, pos, marker)
+      out.append(value)
+
+def _read_object(buf: memoryview, pos: int) -> Tuple[Any, int]:
+   item_type, count, pos = _read_container_params(buf, pos)
+   out = {}
+   n = 0
+   while count is None or n < count:
+      if count is None:
+         if buf[pos] == _NOOP:
+            pos += 1
+            continue
+         if buf[pos] == _OBJECT_END:
+            return out, pos + 1
+      key, pos = _read_string(buf, pos)
+      if item_type is None:
+         marker = buf[pos]
+         pos += 1
+      else:
+         marker = item_type
+      out[key], pos = _read_value(buf, pos, marker)
+      n += 1
+   return out, pos
@@ -151,7 +151,7 @@ def write_dggs_json_fg(out_fc: Dict[str, Any],
    sub_count = sub_zones.count
    sub_ptr = ffi.cast("uint64_t *", sub_zones.array)
    print("Building sub-zone map...")
-   sub_indices = { int(sub_ptr[i]): i for i in range(sub_count) }
+   sub_indices = dict(zip(dggal_ffi.unpack(sub_ptr, sub_count), range(sub_count)))
    Instance.delete(sub_zones)
    print("Quantizing features...")
 
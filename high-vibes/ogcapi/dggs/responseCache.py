@@ -0,0 +1,157 @@
+# ogcapi_dggs_responseCache.py
+# Caches of zone data responses and of values assembled at custom depths, validated against
+# DGGSDataStore.data_signature() and exposed to clients as ETags
+
+import os
+import hashlib
+import threading
+import ubjson
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+try:
+   from dggsStore.store import DecodedBlobCache, approx_decoded_size
+except(ImportError):
+   from ...dggsStore.store import DecodedBlobCache, approx_decoded_size
+
+class CachedResponse(NamedTuple):
+   signature: Tuple[Any, ...]
+   etag: str
+   body: bytes
+   status: int
+   mimetype: Optional[str]
+   headers: Optional[Dict[str, str]]
+
+def make_etag(key: Tuple[Any, ...], signature: Tuple[Any, ...]) -> str:
+   return '"' + hashlib.sha1(repr((key, signature)).encode("utf-8")).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+   if not if_none_match:
+      return False
+   tags = [t.strip() for t in if_none_match.split(",")]
+   return "*" in tags or etag in tags or ("W/" + etag) in tags
+
+# LRU of encoded responses bounded by their total size. Entries evicted from memory are spilled
+# to spill_dir (if set) as UBJSON files, themselves bounded by spill_max_bytes (oldest removed first).
+class ResponseCache:
+   def __init__(self, max_bytes: int = 256 * 1024 * 1024, spill_dir: Optional[str] = None,
+      spill_max_bytes: int = 4 * 1024 * 1024 * 1024, values_max_bytes: int = 256 * 1024 * 1024):
+      self.max_bytes = max_bytes
+      self.spill_dir = spill_dir
+      self.spill_max_bytes = spill_max_bytes
+      self.lock = threading.Lock()
+      self.entries: "OrderedDict[Tuple[Any, ...], CachedResponse]" = OrderedDict()
+      self.size = 0
+      self.spilled: "OrderedDict[str, int]" = OrderedDict()
+      self.spill_size = 0
+      # ValuesObjects assembled at custom depths, keyed by (collection dir, zone, depth, signature)
+      self.values = DecodedBlobCache(values_max_bytes)
+      if spill_dir:
+         os.makedirs(spill_dir, exist_ok=True)
+         # account for files spilled by previous runs (their signatures are checked when read)
+         with os.scandir(spill_dir) as it:
+            files = sorted((e.stat().st_mtime_ns, e.path, e.stat().st_size) for e in it if e.name.endswith(".ubj"))
+         for _, path, size in files:
+            self.spilled[path] = size
+            self.spill_size += size
+
+   def _spill_path(self, key: Tuple[Any, ...]) -> str:
+      return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".ubj")
+
+   def get(self, key: Tuple[Any, ...], signature: Tuple[Any, ...]) -> Optional[CachedResponse]:
+      with self.lock:
+         entry = self.entries.get(key)
+         if entry is not None:
+            if entry.signature == signature:
+               self.entries.move_to_end(key)
+               return entry
+            del self.entries[key]
+            self.size -= len(entry.body)
+      if not self.spill_dir:
+         return None
+      path = self._spill_path(key)
+      try:
+         with open(path, "rb") as f:
+            obj = ubjson.loadb(f.read())
+      except (OSError, ubjson.DecoderException):
+         return None
+      entry = CachedResponse(tuple(_as_tuple(v) for v in obj["signature"]), obj["etag"], obj["body"],
+         obj["status"], obj.get("mimetype"), obj.get("headers"))
+      if entry.signature != signature:
+         self._remove_spilled(path)
+         return None
+      self.put(key, entry)
+      return entry
+
+   def put(self, key: Tuple[Any, ...], entry: CachedResponse) -> None:
+      size = len(entry.body)
+      if size > self.max_bytes:
+         return
+      evicted = []
+      with self.lock:
+         previous = self.entries.pop(key, None)
+         if previous is not None:
+            self.size -= len(previous.body)
+         self.entries[key] = entry
+         self.size += size
+         while self.size > self.max_bytes:
+            evicted.append(self.entries.popitem(last=False))
+            self.size -= len(evicted[-1][1].body)
+      if self.spill_dir:
+         for k, e in evicted:
+            self._spill(k, e)
+
+   def _spill(self, key: Tuple[Any, ...], entry: CachedResponse) -> None:
+      path = self._spill_path(key)
+      data = ubjson.dumpb({ "signature": list(entry.signature), "etag": entry.etag, "body": entry.body,
+         "status": entry.status, "mimetype": entry.mimetype, "headers": entry.headers })
+      tmp = f"{path}.{threading.get_ident()}.tmp"
+      try:
+         with open(tmp, "wb") as f:
+            f.write(data)
+         os.replace(tmp, path)
+      except OSError:
+         return
+      removed = []
+      with self.lock:
+         self.spill_size += len(data) - self.spilled.pop(path, 0)
+         self.spilled[path] = len(data)
+         while self.spill_size > self.spill_max_bytes and len(self.spilled) > 1:
+            old_path, old_size = self.spilled.popitem(last=False)
+            self.spill_size -= old_size
+            removed.append(old_path)
+      for p in removed:
+         try:
+            os.remove(p)
+         except OSError:
+            pass
+
+   def _remove_spilled(self, path: str) -> None:
+      with self.lock:
+         self.spill_size -= self.spilled.pop(path, 0)
+      try:
+         os.remove(path)
+      except OSError:
+         pass
+
+   def clear(self) -> None:
+      with self.lock:
+         self.entries.clear()
+         self.size = 0
+      self.values.clear()
+
+def _as_tuple(v: Any) -> Any:
+   # UBJSON round-trips tuples as lists
+   return tuple(v) if isinstance(v, list) else v
+
+def cached_zone_values(cache: Optional[ResponseCache], store, zone, depth: int, signature: Tuple[Any, ...], assemble):
+   # ValuesObject of a zone at a custom depth, assembled with assemble(store, zone, depth) on a cache miss
+   if cache is None:
+      return assemble(store, zone, depth)
+   key = (store.collection_dir, int(zone), depth, signature)
+   values = cache.values.get(key)
+   if values is None:
+      values = assemble(store, zone, depth)
+      if values is not None:
+         cache.values.put(key, values, approx_decoded_size({ "values": values }, 0))
+   return values
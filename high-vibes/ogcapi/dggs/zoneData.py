@@ -16,6 +16,7 @@ except(ImportError):
    from ...fg.dggsJSONFG import read_dggs_json_fg
 
 from ..utils import *
+from .responseCache import CachedResponse, make_etag, etag_matches, cached_zone_values
 
 logger = logging.getLogger("dggs-serve.zoneData")
 
@@ -31,6 +32,8 @@ def dggs_zone_data(collectionId: str, dggrsId: str, zoneId: str):
    raw_blob: bytes | None = None
    dggs_json: object | None = None
    body_bytes: bytes | None = None
+   cache = current_app.config.get("RESPONSE_CACHE")
+   etag: str | None = None
 
    DATA_ROOT = data_root()
    store = get_store(DATA_ROOT, collectionId)
@@ -54,30 +57,46 @@ def dggs_zone_data(collectionId: str, dggrsId: str, zoneId: str):
 
       requested_depths = parse_zone_depths(request.args.get("zone-depth", str(store.depth)))
 
+      # Responses are validated against the modification times of the packages (see DGGSDataStore.data_signature())
+      signature = store.data_signature(zone)
+      cache_key = (collectionId, dggrsId, zoneId, fmt, gzip_ok, profile, tuple(requested_depths))
+      etag = make_etag(cache_key, signature)
+      if etag_matches(request.headers.get("If-None-Match"), etag):
+         return Response(status=304, headers={ "ETag": etag })
+      cached = cache.get(cache_key, signature) if cache is not None else None
+      if cached is not None:
+         return Response(cached.body, status=cached.status, mimetype=cached.mimetype,
+            headers=dict(cached.headers or {}, ETag=etag))
+
       if len(requested_depths) == 1 and requested_depths[0] == store.depth:
          pkg = store.compute_package_path_for_root_zone(zone)
          if pkg is not None:
             blob = store.read_zone_blob(pkg, zone)
             if blob is not None:
                # We can't return vector directly because we need to add attributes
-               if fmt == "ubjson":
-                  if gzip_ok:
+               # Stored blobs can only be forwarded as-is when values are stored as plain (unquantized) DGGS-JSON lists
+               # and only at the native depth
+               if fmt == "ubjson" and store.standard_values and not store.extra_depths:
+                  # (blobs of mapped archives are stored uncompressed)
+                  if gzip_ok and blob[:2] == b"\x1f\x8b":
                      raw_blob = blob
                      payload_already_gzipped = True
                   else:
                      raw_blob = decompress_blob(blob)
                else:
-                  dggs_json = decode_blob(blob)
+                  obj = decode_blob(blob)
+                  if store.extra_depths and not is_vector:
+                     obj = dict(obj, values=depth_values(obj, store.depth, standard=False) or {}, depths=[store.depth])
+                  dggs_json = standard_dggs_json(obj)
       elif not is_vector:
          collected_by_depth: CollectedValues = {}
          for d in requested_depths:
             if d == store.depth:
                pkg = store.compute_package_path_for_root_zone(zone)
-               blob = store.read_zone_blob(pkg, zone) if pkg is not None else None
-               obj = decode_blob(blob) if blob is not None else None
-               values_for_depth = obj["values"] if obj is not None else None
+               obj = store.read_and_decode_zone_blob(pkg, zone) if pkg is not None else None
+               values_for_depth = depth_values(obj, d) if obj is not None else None
             else:
-               values_for_depth = assemble_zone_at_depth(store, zone, d)
+               values_for_depth = cached_zone_values(cache, store, zone, d, signature, assemble_zone_at_depth)
             if values_for_depth is None:
                collected_by_depth = None
                break
@@ -127,9 +146,19 @@ def dggs_zone_data(collectionId: str, dggrsId: str, zoneId: str):
          if not response_headers: response_headers = { }
          response_headers["Link"] = f'<https://www.opengis.net/def/profile/ogc/0/{profile}>; rel="profile"'
 
+      # Only responses built from decoded data are cached (stored blobs are forwarded as cheaply as read from the cache)
+      if cache is not None and dggs_json is not None:
+         cache.put(cache_key, CachedResponse(signature, etag, body_bytes, response_status, payload_mimetype,
+            dict(response_headers) if response_headers else None))
+      response_headers = dict(response_headers or {}, ETag=etag)
+
    elif not body_bytes:
       body_bytes = b""
       response_status = 404
       payload_mimetype = None
 
+   if isinstance(body_bytes, memoryview):
+      # WSGI requires bytes (blob views over a memory-mapped archive are copied only here)
+      body_bytes = body_bytes.tobytes()
+
    return Response(body_bytes, status=response_status, mimetype=payload_mimetype, headers=response_headers)